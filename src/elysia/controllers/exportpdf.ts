@@ -1,5 +1,5 @@
 import Elysia from "elysia";
-import { writeFile, mkdir } from 'fs/promises';
+import { writeFile, mkdir, readFile, rename } from 'fs/promises';
 import { join, dirname } from 'path';
 import { spawn } from 'child_process';
 import { jwtMiddleware } from "@/middleware";
@@ -142,8 +142,25 @@ const generateFilename = (userIds: string[]): string => {
     return `export_list_${timestamp}_${userIds.length}.json`;
   };
   
+  // One line of to_pdf.py --progress output
+  interface PdfProgressEvent {
+    event: "start" | "sheet" | "done";
+    user_id?: string;
+    path?: string;
+    bytes?: number | null;
+    sha256?: string | null;  // hash of the PDF, a strong ETag
+    digest?: string | null;  // hash of the data the sheet was drawn from
+    reused?: boolean;
+    status?: "ok" | "error";
+    error?: string | null;
+    [key: string]: unknown;
+  }
+
   // Function to execute Python script
-  const executePythonScript = (jsonFilename: string): Promise<void> => {
+  const executePythonScript = (
+    jsonFilename: string,
+    onProgress?: (event: PdfProgressEvent) => void,
+  ): Promise<void> => {
     return new Promise((resolve, reject) => {
       const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
       
@@ -155,17 +172,36 @@ const generateFilename = (userIds: string[]): string => {
       console.log('Script path:', scriptPath);
       console.log('JSON path:', jsonPath);
       
-      const pythonProcess = spawn(pythonCommand, [scriptPath, jsonPath]);
+      // Progress events come on an extra pipe (fd 3), one JSON line per finished sheet.
+      // Deterministic output: identical data gives identical bytes, so sha256 works as an ETag
+      const pythonProcess = spawn(pythonCommand, [scriptPath, jsonPath, '--progress', 'fd:3', '--deterministic'], {
+        stdio: ['ignore', 'pipe', 'pipe', 'pipe'],
+      });
+
+      let progressBuffer = '';
+      pythonProcess.stdio[3]?.on('data', (data: Buffer) => {
+        progressBuffer += data.toString();
+        const lines = progressBuffer.split('\n');
+        progressBuffer = lines.pop() ?? '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          try {
+            onProgress?.(JSON.parse(line));
+          } catch (err) {
+            console.error('Invalid progress line from Python script:', line);
+          }
+        }
+      });
   
       let stdoutData = '';
       let stderrData = '';
   
-      pythonProcess.stdout.on('data', (data) => {
+      pythonProcess.stdout?.on('data', (data) => {
         stdoutData += data.toString();
         console.log(`Python Output: ${data}`);
       });
   
-      pythonProcess.stderr.on('data', (data) => {
+      pythonProcess.stderr?.on('data', (data) => {
         stderrData += data.toString();
         console.error(`Python Error: ${data}`);
       });
@@ -187,6 +223,43 @@ const generateFilename = (userIds: string[]): string => {
     });
   };
 
+  // With PDF_WATCHER=1 a long-running `to_pdf.py --watch` renders everything written to input/;
+  // wait for its manifest (or its failed/ entry) instead of spawning a process per export
+  const usePdfWatcher = process.env.PDF_WATCHER === '1';
+  const WATCHER_TIMEOUT_MS = 10 * 60 * 1000;
+  const WATCHER_POLL_MS = 250;
+
+  const waitForPdfWatcher = async (jsonFilename: string): Promise<PdfProgressEvent[]> => {
+    const serviceDir = join(currentDir, '..', 'external_service');
+    const stem = jsonFilename.replace(/\.json$/, '');
+    const manifestPath = join(serviceDir, 'pdf', stem, 'manifest.json');
+    const errorPath = join(serviceDir, 'input', 'failed', `${jsonFilename}.error`);
+    const deadline = Date.now() + WATCHER_TIMEOUT_MS;
+
+    const readIfExists = async (path: string): Promise<string | null> => {
+      try {
+        return await readFile(path, 'utf-8');
+      } catch (err) {
+        if ((err as NodeJS.ErrnoException).code === 'ENOENT') return null;
+        throw err;
+      }
+    };
+
+    while (Date.now() < deadline) {
+      // manifest.json is renamed into place once every sheet is done, so it is never partial
+      const manifest = await readIfExists(manifestPath);
+      if (manifest !== null) {
+        return (JSON.parse(manifest).files ?? []).map((entry: PdfProgressEvent) => ({ ...entry, event: "sheet" }));
+      }
+      const error = await readIfExists(errorPath);
+      if (error !== null) {
+        throw new Error(`PDF watcher failed on ${jsonFilename}: ${error.trim()}`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, WATCHER_POLL_MS));
+    }
+    throw new Error(`Timed out waiting for the PDF watcher to render ${jsonFilename}`);
+  };
+
 export const exportPdfController = new Elysia({ prefix: "/export-pdf" })
   .use(jwtMiddleware)
   .post("/", async ({ body, jwt, set, cookie: { auth } }: ElysiaExportContext) => {
@@ -263,15 +336,33 @@ export const exportPdfController = new Elysia({ prefix: "/export-pdf" })
       // Save JSON file
       const jsonFilePath = join(inputDir, filename);
       console.log('JSON file path:', jsonFilePath);
-      await writeFile(jsonFilePath, JSON.stringify(exportData, null, 2));
+      if (usePdfWatcher) {
+        // Write under a name the watcher ignores, then rename: it only ever sees complete files
+        const partialPath = join(inputDir, `.${filename}.partial`);
+        await writeFile(partialPath, JSON.stringify(exportData, null, 2));
+        await rename(partialPath, jsonFilePath);
+      } else {
+        await writeFile(jsonFilePath, JSON.stringify(exportData, null, 2));
+      }
 
-      // Execute Python script
-      await executePythonScript(filename);
+      // Execute Python script, or let the watcher pick the file up
+      let files: PdfProgressEvent[] = [];
+      if (usePdfWatcher) {
+        files = await waitForPdfWatcher(filename);
+      } else {
+        await executePythonScript(filename, (event) => {
+          if (event.event === "sheet") {
+            console.log(`PDF ${event.status} for ${event.user_id}: ${event.path}`);
+            files.push(event);
+          }
+        });
+      }
 
       return {
         status: "ok",
         message: "PDF generation completed successfully",
-        filename: filename
+        filename: filename,
+        files: files
       };
 
     } catch (error) {
@@ -0,0 +1,118 @@
+"""
+Batch mode for to_pdf.py: many export files, one worker pool.
+
+At month end every branch manager queues an export, and each one used to start its own
+to_pdf.py process. `python to_pdf.py A.json B.json ...` (or a spool directory such as input/)
+runs them as jobs of one batch instead: users from all jobs are rendered by a shared pool of
+--workers processes, and FairScheduler decides whose user goes next.
+
+Scheduling is weighted round robin over the jobs that still have users: in every round a job
+gets as many turns as its priority (default 1, set with --priority PATTERN=N on the input
+stem). Only a few sheets per worker are in flight at once, so a 3-user export queued next to a
+2,000-user one is finished within its first few rounds instead of after the big one. Each job
+writes its own pdf/<stem>/manifest.json as soon as its last sheet is done.
+"""
+from collections import deque
+from fnmatch import fnmatch
+from pathlib import Path
+import json
+import time
+
+DEFAULT_PRIORITY = 1
+_END = object()
+
+
+class BatchJob:
+    """One input of a batch and its bookkeeping"""
+
+    def __init__(self, name, users, priority=DEFAULT_PRIORITY):
+        self.name = name
+        self.users = users
+        self.priority = priority
+        self.entries = []
+        self.pending = 0
+        self.exhausted = False
+        self.upcoming = None
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.exhausted and self.pending == 0
+
+
+class FairScheduler:
+    """
+    Weighted round robin over jobs. next() returns (job, item) with item taken from the job's
+    `users` iterator, or None once every job is exhausted. Each job is read one item ahead, so
+    its `exhausted` flag is set as soon as its last item is handed out; iterators are otherwise
+    only advanced when the job's turn comes, so streamed and memory-mapped inputs stay lazy.
+    """
+
+    def __init__(self, jobs=()):
+        self.active = deque()
+        self.turns_left = 0
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job):
+        job.users = iter(job.users)
+        self._read_ahead(job)
+        if not job.exhausted:
+            self.active.append(job)
+
+    @staticmethod
+    def _read_ahead(job):
+        job.upcoming = next(job.users, _END)
+        job.exhausted = job.upcoming is _END
+
+    def next(self):
+        if not self.active:
+            return None
+        job = self.active[0]
+        if self.turns_left <= 0:
+            self.turns_left = max(1, job.priority)
+        item = job.upcoming
+        self._read_ahead(job)
+        self.turns_left -= 1
+        if job.exhausted:
+            self.active.popleft()
+            self.turns_left = 0
+        elif self.turns_left == 0:
+            self.active.rotate(-1)
+        return job, item
+
+
+def is_columnar_export(path):
+    """
+    Whether `path` is a columnar export (export_columnar.py) rather than a spool directory: its
+    meta.json says "kind": "export". Any other directory with a meta.json is not taken for one.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return False
+    try:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return isinstance(meta, dict) and meta.get("kind") == "export"
+
+
+def spool_inputs(directory):
+    """Inputs waiting in a spool directory, oldest first: export JSON files and columnar exports"""
+    inputs = [path for path in Path(directory).iterdir()
+              if (path.is_file() and path.suffix == ".json") or is_columnar_export(path)]
+    return sorted(inputs, key=lambda path: (path.stat().st_mtime, path.name))
+
+
+def parse_priority(value):
+    """--priority PATTERN=N, PATTERN being a glob on the input stem"""
+    pattern, _, priority = value.rpartition("=")
+    if not pattern or not priority.isdigit() or int(priority) < 1:
+        raise ValueError(f"Expected PATTERN=N with N >= 1, got {value!r}")
+    return pattern, int(priority)
+
+
+def priority_for(name, priorities):
+    """Priority of the first matching (pattern, priority), DEFAULT_PRIORITY otherwise"""
+    return next((priority for pattern, priority in priorities if fnmatch(name, pattern)), DEFAULT_PRIORITY)
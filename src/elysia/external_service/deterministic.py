@@ -0,0 +1,90 @@
+"""
+Deterministic output and sheet digests for to_pdf.py.
+
+reportlab stamps every file with the current time (CreationDate, ModDate) and seeds the
+trailer /ID with it, so two renders of the same rows differ byte for byte and no ETag, CDN
+entry or S3 dedup ever matches. With --deterministic, rl_config.invariant is set: dates are
+fixed to 2000-01-01 (or SOURCE_DATE_EPOCH when it is set) and the /ID becomes a digest of the
+document. Everything else reportlab writes (object numbers, font subset names and glyph
+order, image names, which are the MD5 of the image data) already follows the drawing order,
+so the same input gives the same bytes whatever the output path or process.
+
+Every manifest entry carries three hashes:
+
+    digest          sha256 of what the sheet is drawn from: layout, render mode, output profile,
+                    linearization (and its page threshold), header details, table rows, photo
+                    URLs (photos layout), SHEET_FORMAT and the reportlab version
+    content_digest  the same without render mode, profile and linearization: what the pages
+                    show, which is all a preview (preview.py) depends on
+    sha256          sha256 of the PDF file, usable as a strong ETag
+
+In deterministic mode equal digests give equal files, so a re-run into an existing
+pdf/<stem>/ keeps every sheet whose digest matches the previous manifest (and whose file
+still hashes to the recorded sha256) instead of rendering it again. (Long sheets rendered
+with --page-workers assign font subset codes up front: their bytes differ from a serial
+render of the same data, but they draw the same.)
+"""
+from pathlib import Path
+import hashlib
+import json
+
+from reportlab import Version as REPORTLAB_VERSION
+from reportlab import rl_config
+
+from manifest import file_sha256, load_manifest
+
+# Bump when the drawing of a sheet changes for the same data
+SHEET_FORMAT = 1
+
+
+def enable_deterministic_output():
+    """Fixed timestamps and content-derived document IDs for every canvas created from now on"""
+    rl_config.invariant = 1
+
+
+def deterministic_output_enabled():
+    return bool(rl_config.invariant)
+
+
+def sheet_digest(layout, details, rows, photos=None, segmented=False, profile=None, linearize=None):
+    """
+    Digest of everything a sheet is drawn from (see the module docstring). `linearize` is the
+    minimum page count of linearized sheets, None when the run doesn't linearize.
+    """
+    payload = json.dumps([SHEET_FORMAT, REPORTLAB_VERSION, layout, segmented, profile, linearize, details, rows,
+                          photos],
+                         ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_digest(layout, details, rows, photos=None):
+    """Digest of what a sheet's pages show, whatever segmenting, profile or linearization wrote them"""
+    payload = json.dumps([SHEET_FORMAT, REPORTLAB_VERSION, layout, details, rows, photos],
+                         ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def previous_entries(manifest_path):
+    """
+    {user_id: entry} of the ok sheets in an earlier deterministic manifest; empty when there is
+    none, or when that run wasn't deterministic (its files carry real timestamps)
+    """
+    try:
+        manifest = load_manifest(manifest_path)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("deterministic") is not True:
+        return {}
+    return {entry["user_id"]: entry for entry in manifest.get("files", [])
+            if entry.get("status") == "ok" and entry.get("digest")}
+
+
+def reusable(entry, digest, root):
+    """Whether the file of a previous manifest `entry` is still the sheet for `digest`"""
+    if entry is None or entry["digest"] != digest:
+        return False
+    path = Path(root) / entry["path"]
+    try:
+        return file_sha256(path) == entry["sha256"]
+    except OSError:
+        return False
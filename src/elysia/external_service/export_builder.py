@@ -0,0 +1,248 @@
+"""
+Python port of the export shaping done on the Bun side before to_pdf.py runs:
+getWorkingHours / getWorkingHoursExporter (src/elysia/services/working-hours.ts)
+and the per-user wrapping and calculateWorkingSummary in
+src/elysia/controllers/exportpdf.ts.
+
+It turns raw time_record documents (elasticdump NDJSON hits or their _source)
+into the exact `all_shift` JSON that exportPdfController writes to input/.
+"""
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+import json
+import math
+
+INCOMPLETE_SHIFT_MESSAGE = "This shift is incomplete and cannot be calculated for summary"
+
+
+def parse_iso(iso_string):
+    """Parse an ISO timestamp the way `new Date(isoString)` does for our data; None if invalid"""
+    if not isinstance(iso_string, str) or not iso_string:
+        return None
+    try:
+        if iso_string.endswith("Z"):
+            iso_string = iso_string[:-1] + "+00:00"
+        parsed = datetime.fromisoformat(iso_string)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def convert_to_timezone(dt, offset_hours):
+    return dt + timedelta(hours=offset_hours)
+
+
+def format_time(dt):
+    """HH:mm from the UTC fields, like formatTime in helpers.ts"""
+    return f"{dt.hour:02d}:{dt.minute:02d}"
+
+
+def format_date_time(dt):
+    """dd/mm/yyyy HH:mm from the UTC fields, like formatDateTime in helpers.ts"""
+    if dt is None:
+        return "(invalid time)"
+    return f"{dt.day:02d}/{dt.month:02d}/{dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
+
+def _js_pad(value):
+    # String(n).padStart(2, '0') leaves negative numbers like "-1" untouched
+    return str(value).rjust(2, "0")
+
+
+def calculate_duration(start_time, end_time):
+    """HH:MM:SS between two ISO timestamps, matching calculateDuration in helpers.ts"""
+    start = parse_iso(start_time)
+    end = parse_iso(end_time)
+    if start is None or end is None:
+        return None
+
+    diff_ms = int(round((end - start).total_seconds() * 1000))
+    # JavaScript's % keeps the sign of the dividend, Math.floor rounds towards -inf
+    hours = math.floor(diff_ms / 3600000)
+    minutes = math.floor(math.fmod(diff_ms, 3600000) / 60000)
+    seconds = math.floor(math.fmod(diff_ms, 60000) / 1000)
+    return f"{_js_pad(hours)}:{_js_pad(minutes)}:{_js_pad(seconds)}"
+
+
+def parse_change_log_array(json_array):
+    """Port of parseChangeLogArray: parse the JSON strings, None if any entry is malformed"""
+    if not isinstance(json_array, list):
+        return None
+    entries = []
+    try:
+        for json_string in json_array:
+            parsed = json.loads(json_string) if isinstance(json_string, str) else json_string
+            if not parsed.get("timestamp") or not parsed.get("edit_reason") or not parsed.get("data"):
+                return None
+            is_system = parsed.get("is_system")
+            parsed["is_system"] = is_system.lower() == "true" if isinstance(is_system, str) else bool(is_system)
+            entries.append(parsed)
+    except (ValueError, AttributeError):
+        return None
+    return entries
+
+
+def _format_logged_time(iso_string):
+    dt = parse_iso(iso_string)
+    return format_date_time(convert_to_timezone(dt, 7) if dt else None)
+
+
+def generate_change_description(current_log, previous_log):
+    """Port of generateChangeDescription in working-hours.ts"""
+    changes = []
+    prefix = f"[{current_log['edit_reason']} @ {format_date_time(parse_iso(current_log['timestamp']))}] "
+    current = current_log["data"]
+    previous = previous_log["data"]
+    current_start = current.get("start_time") or {}
+    previous_start = previous.get("start_time") or {}
+    current_end = current.get("end_time") or {}
+    previous_end = previous.get("end_time") or {}
+
+    if current.get("shift_reason") != previous.get("shift_reason"):
+        changes.append(f"{prefix}Shift reason was updated from '{previous.get('shift_reason')}' "
+                       f"to '{current.get('shift_reason')}'")
+    if current_start.get("shift_time") != previous_start.get("shift_time"):
+        changes.append(f"{prefix}Shift start time was updated from {_format_logged_time(previous_start.get('shift_time'))} "
+                       f"to {_format_logged_time(current_start.get('shift_time'))}")
+    if current_start.get("timestamp") != previous_start.get("timestamp"):
+        changes.append(f"{prefix}Clock-in time was updated from {_format_logged_time(previous_start.get('timestamp'))} "
+                       f"to {_format_logged_time(current_start.get('timestamp'))}")
+    if current_end.get("shift_time") != previous_end.get("shift_time"):
+        changes.append(f"{prefix}Shift end time was updated from {_format_logged_time(previous_end.get('shift_time'))} "
+                       f"to {_format_logged_time(current_end.get('shift_time'))}")
+    if current_end.get("timestamp") != previous_end.get("timestamp"):
+        changes.append(f"{prefix}Clock-out time was updated from {_format_logged_time(previous_end.get('timestamp'))} "
+                       f"to {_format_logged_time(current_end.get('timestamp'))}")
+    if current_start.get("image_url") != previous_start.get("image_url"):
+        changes.append(f"{prefix}Clock-in image was updated")
+    if current_end.get("image_url") != previous_end.get("image_url"):
+        changes.append(f"{prefix}Clock-out image was updated")
+
+    return changes
+
+
+def _official_time(iso_string):
+    dt = parse_iso(iso_string)
+    return format_time(convert_to_timezone(dt, 7)) if dt else "00:00"
+
+
+def export_shift(doc_id, source):
+    """One shift in the exported shape (ExportedShiftDetail or ExportedIncompleteShift)"""
+    if not source.get("is_complete"):
+        return {"doc_id": doc_id, "message": INCOMPLETE_SHIFT_MESSAGE}
+
+    change_log = parse_change_log_array(source.get("change_log")) or []
+    change_history = []
+    for index, log in enumerate(change_log):
+        if not log["is_system"] and index > 0:
+            change_history.extend(generate_change_description(log, change_log[index - 1]))
+
+    start_time = source.get("start_time") or {}
+    end_time = source.get("end_time") or {}
+    shift = {
+        "doc_id": doc_id,
+        "start": _official_time(start_time.get("timestamp")),
+        "end": _official_time(end_time.get("timestamp")),
+        "start_official": _official_time(start_time.get("shift_time")),
+        "end_official": _official_time(end_time.get("shift_time")),
+        "duration": calculate_duration(start_time.get("timestamp"), end_time.get("timestamp")) or "00:00",
+        "duration_official": calculate_duration(start_time.get("shift_time"), end_time.get("shift_time")) or "00:00",
+        "reason": source.get("reason") or "No reason provided",
+        "change_history": change_history,
+    }
+    # JSON.stringify drops undefined fields, so these only appear when the photo was recorded
+    if "image_url" in start_time:
+        shift["image_url_start"] = start_time["image_url"]
+    if "image_url" in end_time:
+        shift["image_url_end"] = end_time["image_url"]
+    return shift
+
+
+def group_time_records(hits, start_date=None, end_date=None):
+    """
+    Group elasticdump hits ({"_id", "_source"}) by user and date, keeping the date range filter
+    of getWorkingHours. Returns {user_id: {"org_id": .., "dates": {date: [(doc_id, source), ...]}}}
+    """
+    grouped = defaultdict(lambda: {"org_id": "", "dates": defaultdict(list)})
+    for hit in hits:
+        source = hit.get("_source")
+        if not source:
+            continue
+        date = source.get("date", "")
+        if (start_date and date < start_date) or (end_date and date > end_date):
+            continue
+        user = grouped[source.get("user_id", "")]
+        if not user["org_id"]:
+            user["org_id"] = source.get("org_id", "")
+        user["dates"][date].append((hit.get("_id", ""), source))
+    return grouped
+
+
+def build_all_shift(dates):
+    """Sorted all_shift list (dates and shifts ascending) for one user's {date: [(doc_id, source)]}"""
+    all_shift = []
+    for date in sorted(dates):
+        shifts = sorted(dates[date], key=lambda item: (item[1].get("start_time") or {}).get("shift_time") or "")
+        day = {"date": date}
+        for doc_id, source in shifts:
+            day.setdefault(source.get("shift_type", ""), []).append(export_shift(doc_id, source))
+        all_shift.append(day)
+    return all_shift
+
+
+def calculate_working_summary(all_shift):
+    """Port of calculateWorkingSummary in exportpdf.ts"""
+    if not all_shift:
+        return "0hrs/0days"
+    total_minutes = 0
+    for day in all_shift:
+        for shift_type in ("on-site", "overtime"):
+            for shift in day.get(shift_type, []) or []:
+                duration = shift.get("duration_official")
+                if duration:
+                    parts = duration.split(":")
+                    total_minutes += int(parts[0]) * 60 + int(parts[1])
+    unique_days = len({day["date"] for day in all_shift})
+    return f"{total_minutes // 60}hrs/{unique_days}days"
+
+
+def build_export(hits, users=None, start_date=None, end_date=None, user_ids=None):
+    """
+    Build the export list written by exportPdfController.
+    `users` maps user_id to Clerk-style details (name, avatarUrl, branch, email, position, status);
+    users missing from it get placeholder details. With `user_ids` there is one entry per id, in
+    that order, like the controller's map over the requested users: ids without time records
+    in the range get an empty all_shift (and still a sheet).
+    """
+    users = users or {}
+    grouped = group_time_records(hits, start_date, end_date)
+    if user_ids is None:
+        user_ids = list(grouped)
+    return [export_user(user_id, grouped[user_id]["org_id"], grouped[user_id]["dates"], users.get(user_id))
+            for user_id in dict.fromkeys(user_ids)]
+
+
+def export_user(user_id, org_id, dates, details=None):
+    """One user's export entry from their {date: [(doc_id, source)]}"""
+    all_shift = build_all_shift(dates)
+    details = details or {}
+    return {
+        "user_id": user_id,
+        "org_id": details.get("org_id", org_id),
+        "name": details.get("name", user_id),
+        "avatarUrl": details.get("avatarUrl", ""),
+        "branch": details.get("branch", ""),
+        "workingSummary": calculate_working_summary(all_shift),
+        "status": details.get("status", "offline"),
+        "email": details.get("email", ""),
+        "position": details.get("position", ""),
+        "all_shift": all_shift,
+    }
+
+
+def load_elasticdump(path):
+    """Read an elasticdump NDJSON file into a list of hits"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
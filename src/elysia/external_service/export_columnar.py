@@ -0,0 +1,318 @@
+"""
+Columnar binary form of the export list to_pdf.py renders.
+
+The JSON export repeats every key (start_official, end_official, duration_official ...) for
+every shift, and json.load turns each shift into a dict only for process_shift_data to pick
+three strings out of it. A columnar export is a directory instead:
+
+    meta.json                 "kind": "export", format version, user and shift counts, table names
+    users.npy                 structured array, one row per user: string indices for the header
+                              fields and the [shift_start, shift_start + shift_count) range
+    shifts.npy                structured array, one row per shift in export order
+    <table>.offsets.npy       uint64 offsets into <table>.blob.npy (len = strings + 1)
+    <table>.blob.npy          uint8 UTF-8 bytes of all strings back to back
+
+Shift strings are interned (a month has at most 1440 distinct "HH:MM" values), so the
+`text` table stays tiny and is decoded once per file. Everything is opened with
+np.load(mmap_mode="r"); rows for a sheet are built straight from the slice of columns
+belonging to the user, without a dict per shift.
+
+Only what the sheets show is kept: the header fields, and per shift its date, type
+(overtime / wfh / on-site), official times and duration, photo URLs and doc_id. Shifts are
+stored in the order process_shift_data visits them, so rows come out identical.
+
+Usage:
+    python export_columnar.py convert input/export_list_....json /tmp/export.cols
+    python export_columnar.py info /tmp/export.cols
+    python to_pdf.py /tmp/export.cols
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+# meta.json "kind" that tells a columnar export from any other directory (batch.is_columnar_export)
+EXPORT_KIND = "export"
+NO_INDEX = np.uint32(0xFFFFFFFF)
+
+# Visiting order of process_shift_data; later shifts of a day overwrite earlier ones
+SHIFT_TYPES = ("overtime", "wfh", "on-site")
+OVERTIME = SHIFT_TYPES.index("overtime")
+
+USER_FIELDS = ("user_id", "org_id", "name", "avatarUrl", "branch", "workingSummary", "status", "email",
+               "position", "employee_id", "department", "working_hours")
+
+USER_DTYPE = np.dtype([(field, "<u4") for field in USER_FIELDS] + [
+    ("shift_start", "<u8"),
+    ("shift_count", "<u4"),
+])
+
+SHIFT_DTYPE = np.dtype([
+    ("date", "<u4"),
+    ("shift_type", "u1"),
+    ("start_official", "<u4"),
+    ("end_official", "<u4"),
+    ("duration_official", "<u4"),
+    ("image_url_start", "<u4"),
+    ("image_url_end", "<u4"),
+    ("doc_id", "<u4"),
+])
+
+STRING_TABLES = ("user", "text", "image_url", "doc_id")
+
+
+class StringTableBuilder:
+    """Collects strings, optionally interning repeated values"""
+
+    def __init__(self, intern=True):
+        self.intern = intern
+        self.index = {}
+        self.values = []
+
+    def add(self, value):
+        if value is None:
+            return NO_INDEX
+        if self.intern:
+            existing = self.index.get(value)
+            if existing is not None:
+                return existing
+            self.index[value] = len(self.values)
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def save(self, directory, name):
+        encoded = [value.encode("utf-8") for value in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        np.save(directory / f"{name}.offsets.npy", offsets)
+        np.save(directory / f"{name}.blob.npy", blob)
+
+
+class StringTable:
+    """Read-only, memory-mapped string table; strings are decoded on access"""
+
+    def __init__(self, directory, name):
+        self.offsets = np.load(directory / f"{name}.offsets.npy", mmap_mode="r")
+        self.blob = np.load(directory / f"{name}.blob.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i == NO_INDEX:
+            return None
+        start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:stop].tobytes().decode("utf-8")
+
+    def slice(self, start, count):
+        """`count` consecutive strings starting at `start`"""
+        if count == 0:
+            return []
+        bounds = self.offsets[start:start + count + 1]
+        data = self.blob[int(bounds[0]):int(bounds[-1])].tobytes()
+        base = int(bounds[0])
+        return [data[int(a) - base:int(b) - base].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def lookup(self, value):
+        """Index of `value` (linear scan, for filters on small tables)"""
+        for i in range(len(self)):
+            if self[i] == value:
+                return i
+        return None
+
+    def decode_all(self):
+        return self.slice(0, len(self))
+
+
+def _cell(value):
+    """Shift value as to_pdf's clean_table_value would show it; None for an empty cell"""
+    if value is None or value == "null" or value == "":
+        return None
+    return str(value)
+
+
+def write_columnar_export(users, directory):
+    """Write an export list (the JSON exportPdfController writes to input/) as a columnar export"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = {name: StringTableBuilder(intern=name != "doc_id") for name in STRING_TABLES}
+
+    user_rows = []
+    shift_rows = []
+    for user in users:
+        if not isinstance(user, dict):
+            continue
+        shift_start = len(shift_rows)
+        for day in user.get("all_shift") or []:
+            if not isinstance(day, dict) or not day.get("date"):
+                continue
+            date = tables["text"].add(str(day["date"]))
+            for type_code, shift_type in enumerate(SHIFT_TYPES):
+                shifts = day.get(shift_type)
+                if not shifts or not isinstance(shifts, list):
+                    continue
+                for shift in shifts:
+                    if not isinstance(shift, dict):
+                        continue
+                    shift_rows.append((
+                        date,
+                        type_code,
+                        tables["text"].add(_cell(shift.get("start_official"))),
+                        tables["text"].add(_cell(shift.get("end_official"))),
+                        tables["text"].add(_cell(shift.get("duration_official"))),
+                        tables["image_url"].add(shift.get("image_url_start") or None),
+                        tables["image_url"].add(shift.get("image_url_end") or None),
+                        tables["doc_id"].add(shift.get("doc_id")),
+                    ))
+        user_rows.append(tuple(
+            tables["user"].add(None if user.get(field) is None else str(user[field])) for field in USER_FIELDS
+        ) + (shift_start, len(shift_rows) - shift_start))
+
+    np.save(directory / "users.npy", np.array(user_rows, dtype=USER_DTYPE))
+    np.save(directory / "shifts.npy", np.array(shift_rows, dtype=SHIFT_DTYPE))
+    for name, builder in tables.items():
+        builder.save(directory, name)
+
+    meta = {"kind": EXPORT_KIND, "version": FORMAT_VERSION, "users": len(user_rows), "shifts": len(shift_rows),
+            "tables": list(STRING_TABLES)}
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return len(user_rows), len(shift_rows)
+
+
+class ColumnarExport:
+    """Memory-mapped view of a columnar export directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("kind") != EXPORT_KIND:
+            raise ValueError(f"{self.directory} is not a columnar export (kind {meta.get('kind')!r})")
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar export version {meta.get('version')} in {self.directory}")
+        self.users = np.load(self.directory / "users.npy", mmap_mode="r")
+        self.shifts = np.load(self.directory / "shifts.npy", mmap_mode="r")
+        self.tables = {name: StringTable(self.directory, name) for name in meta["tables"]}
+        # Interned official times and dates: a few thousand short strings, decoded once
+        self.text = [""] + self.tables["text"].decode_all()
+        self.formatted_dates = {}
+
+    def __len__(self):
+        return len(self.users)
+
+    def _formatted_date(self, index):
+        formatted = self.formatted_dates.get(index)
+        if formatted is None:
+            try:
+                formatted = datetime.strptime(self.text[index + 1], "%Y-%m-%d").strftime("%d/%m/%Y")
+            except ValueError:
+                print(f"Invalid date format found: {self.text[index + 1]}")
+                formatted = False
+            self.formatted_dates[index] = formatted
+        return formatted
+
+    def shift_columns(self, i):
+        user = self.users[i]
+        start = int(user["shift_start"])
+        return self.shifts[start:start + int(user["shift_count"])]
+
+    def rows(self, i):
+        """
+        Table rows of user i, exactly as record_to_row(process_shift_data(all_shift)) would build
+        them: one per date, the last regular and overtime shift of the day winning
+        """
+        shifts = self.shift_columns(i)
+        # Text indices are shifted by one so NO_INDEX (empty cell) wraps around to text[0] == ""
+        dates = shifts["date"].tolist()
+        types = shifts["shift_type"].tolist()
+        starts = (shifts["start_official"] + np.uint32(1)).tolist()
+        ends = (shifts["end_official"] + np.uint32(1)).tolist()
+        durations = (shifts["duration_official"] + np.uint32(1)).tolist()
+
+        text = self.text
+        by_date = {}
+        for date, shift_type, start, end, duration in zip(dates, types, starts, ends, durations):
+            formatted = self._formatted_date(date)
+            if formatted is False:
+                continue
+            row = by_date.get(date)
+            if row is None:
+                row = by_date[date] = [formatted, "", "", "", "", "", "", ""]
+            if shift_type == OVERTIME:
+                row[3], row[4], row[6] = text[start], text[end], text[duration]
+            else:
+                row[1], row[2], row[5] = text[start], text[end], text[duration]
+        return [by_date[date] for date in sorted(by_date, key=lambda date: text[date + 1])]
+
+    def user_fields(self, i):
+        user = self.users[i]
+        table = self.tables["user"]
+        return {field: table[user[field]] for field in USER_FIELDS if user[field] != NO_INDEX}
+
+    def all_shift(self, i):
+        """Rebuild the user's all_shift (the fields to_pdf uses) for layouts that need it"""
+        shifts = np.asarray(self.shift_columns(i))
+        image_urls = self.tables["image_url"]
+        doc_ids = self.tables["doc_id"]
+        days = []
+        for shift in shifts:
+            date = self.text[int(shift["date"]) + 1]
+            if not days or days[-1]["date"] != date:
+                days.append({"date": date})
+            entry = {"doc_id": doc_ids[shift["doc_id"]]}
+            for field in ("start_official", "end_official", "duration_official"):
+                entry[field] = self.text[(int(shift[field]) + 1) & 0xFFFFFFFF]
+            for field in ("image_url_start", "image_url_end"):
+                if shift[field] != NO_INDEX:
+                    entry[field] = image_urls[shift[field]]
+            days[-1].setdefault(SHIFT_TYPES[shift["shift_type"]], []).append(entry)
+        return days
+
+    def iter_users(self, with_all_shift=False):
+        """
+        User dicts for process_all_users: header fields plus ready-made `rows`, and all_shift
+        only when asked for (photos layout, segment cache)
+        """
+        for i in range(len(self.users)):
+            user = self.user_fields(i)
+            user["rows"] = self.rows(i)
+            if with_all_shift:
+                user["all_shift"] = self.all_shift(i)
+            yield user
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert and inspect columnar exports for to_pdf.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert an export JSON list to a columnar export')
+    convert_parser.add_argument('input_path', help='Export JSON written by exportPdfController')
+    convert_parser.add_argument('output_dir', help='Directory to write')
+
+    info_parser = subparsers.add_parser('info', help='Open a columnar export and report its size and load time')
+    info_parser.add_argument('export_dir')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        started = time.perf_counter()
+        with open(args.input_path, "r", encoding="utf-8") as f:
+            users, shifts = write_columnar_export(json.load(f), args.output_dir)
+        print(f"Wrote {users} users, {shifts} shifts to {args.output_dir} in {time.perf_counter() - started:.2f}s")
+    else:
+        started = time.perf_counter()
+        export = ColumnarExport(args.export_dir)
+        opened = time.perf_counter() - started
+        size = sum(p.stat().st_size for p in Path(args.export_dir).iterdir())
+        print(f"{len(export)} users, {len(export.shifts)} shifts, {size / 1024 / 1024:.1f} MiB on disk, "
+              f"opened in {opened * 1000:.2f} ms")
+        for name, table in export.tables.items():
+            print(f"  {name}: {len(table)} strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Out-of-core grouping of time_record dumps for exports that don't fit in memory.
+
+export_builder.build_export groups every hit by user and date in one dict, so an elasticdump
+of time_record (testdata/es_dump format, one {"_id", "_source"} per line, in no particular
+order) has to fit in RAM. iter_user_exports instead:
+
+    1. reads the dump line by line and spills runs of at most `run_bytes` of raw lines,
+       each sorted by (user_id, date), to temporary files
+    2. k-way merges the runs (heapq.merge, at most `fan_in` files open at once; more runs are
+       merged in extra passes)
+    3. yields one export entry per user, in user_id order, from the merged stream
+
+Memory stays around `run_bytes` plus the largest single user, whatever the dump size.
+Lines are kept verbatim in the runs and only parsed again when their user is built.
+"""
+from pathlib import Path
+import itertools
+import tempfile
+import heapq
+import json
+
+from export_builder import export_user
+
+RUN_BYTES = 64 * 1024 * 1024
+FAN_IN = 64
+
+
+class SortStats:
+    def __init__(self):
+        self.records = 0
+        self.skipped = 0
+        self.runs = 0
+        self.merge_passes = 0
+        self.users = 0
+
+
+def _write_run(records, run_dir, index):
+    records.sort(key=lambda record: record[0])
+    path = Path(run_dir) / f"run-{index:05d}.tsv"
+    with path.open("w", encoding="utf-8") as f:
+        for key, line in records:
+            f.write(json.dumps(key, ensure_ascii=False))
+            f.write("\t")
+            f.write(line)
+            f.write("\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for row in f:
+            key, _, line = row.rstrip("\n").partition("\t")
+            yield tuple(json.loads(key)), line
+
+
+def spill_sorted_runs(lines, run_dir, run_bytes=RUN_BYTES, start_date=None, end_date=None, stats=None):
+    """
+    Sort elasticdump lines into runs keyed by (user_id, date), keeping getWorkingHours' date filter.
+    Returns the run file paths.
+    """
+    stats = stats or SortStats()
+    runs = []
+    records = []
+    buffered = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        source = json.loads(line).get("_source")
+        if not source:
+            stats.skipped += 1
+            continue
+        date = source.get("date", "")
+        if (start_date and date < start_date) or (end_date and date > end_date):
+            stats.skipped += 1
+            continue
+
+        records.append(((source.get("user_id", ""), date), line))
+        # Names and reasons are mostly Thai: three UTF-8 bytes per character
+        buffered += len(line.encode("utf-8"))
+        stats.records += 1
+        if buffered >= run_bytes:
+            runs.append(_write_run(records, run_dir, len(runs)))
+            records = []
+            buffered = 0
+
+    if records or not runs:
+        runs.append(_write_run(records, run_dir, len(runs)))
+    stats.runs = len(runs)
+    return runs
+
+
+def merge_runs(runs, run_dir, fan_in=FAN_IN, stats=None):
+    """Merged ((user_id, date), line) stream over all runs, merging down to `fan_in` files first"""
+    stats = stats or SortStats()
+    level = 0
+    while len(runs) > fan_in:
+        merged = []
+        for i in range(0, len(runs), fan_in):
+            group = runs[i:i + fan_in]
+            path = Path(run_dir) / f"merge-{level:02d}-{i // fan_in:05d}.tsv"
+            with path.open("w", encoding="utf-8") as f:
+                for key, line in heapq.merge(*map(_read_run, group), key=lambda record: record[0]):
+                    f.write(json.dumps(key, ensure_ascii=False))
+                    f.write("\t")
+                    f.write(line)
+                    f.write("\n")
+            for run in group:
+                run.unlink()
+            merged.append(path)
+        runs = merged
+        level += 1
+        stats.merge_passes += 1
+
+    stats.merge_passes += 1
+    return heapq.merge(*map(_read_run, runs), key=lambda record: record[0])
+
+
+def iter_user_exports(path, users=None, start_date=None, end_date=None, run_bytes=RUN_BYTES, fan_in=FAN_IN,
+                      tmp_dir=None, stats=None):
+    """
+    Yield build_export entries one user at a time from an elasticdump file of any size.
+    Temporary runs are removed when the generator finishes or is closed.
+    """
+    users = users or {}
+    stats = stats if stats is not None else SortStats()
+    with tempfile.TemporaryDirectory(prefix="time_record_sort_", dir=tmp_dir) as run_dir:
+        with open(path, "r", encoding="utf-8") as f:
+            runs = spill_sorted_runs(f, run_dir, run_bytes, start_date, end_date, stats)
+
+        merged = merge_runs(runs, run_dir, fan_in, stats)
+        for user_id, records in itertools.groupby(merged, key=lambda record: record[0][0]):
+            org_id = ""
+            dates = {}
+            for (_, date), line in records:
+                hit = json.loads(line)
+                source = hit["_source"]
+                org_id = org_id or source.get("org_id", "")
+                dates.setdefault(date, []).append((hit.get("_id", ""), source))
+            stats.users += 1
+            yield export_user(user_id, org_id, dates, users.get(user_id))
@@ -0,0 +1,256 @@
+"""
+Fallback font chain for text THSarabunNew has no glyphs for.
+
+Employee names come from Clerk and may contain emoji ("Chinathaipan 🐬") or Latin letters
+outside THSarabunNew's ~500 glyphs; drawn in THSarabunNew they come out as empty boxes.
+FontChain splits a string into runs by glyph coverage and draws each run in the first font of
+the chain that has the glyph:
+
+    1. THSarabunNew (always first; Thai and basic Latin)
+    2. every *.ttf in external_service/fallback_fonts/, sorted by name. Bundled (SIL OFL, see
+       fallback_fonts/OFL.txt): NotoEmoji-Regular.ttf, the monochrome Noto Emoji (colour emoji
+       fonts (CBDT/sbix) can't be embedded by reportlab), and NotoSans-Regular.ttf for Latin
+       Extended, Greek and Cyrillic names
+    3. DejaVuSans from the system, when installed
+
+Coverage is a bitmap over all code points, built once per font from its cmap, so a lookup
+is one byte index and a mask; segmentations are memoized per string. Fallback runs are scaled
+so their cap height matches THSarabunNew's. Code points no font covers stay in the surrounding
+run, except joiners and variation selectors, which are dropped.
+
+Fonts are embedded without TrueType hinting (see unhinted_font_data): THSarabunNew's glyph
+programs make up ~94% of every embedded subset, and PDF viewers rasterize without them (pymupdf
+renders hinted and unhinted sheets pixel-identically at 72-300 dpi). set_hinting(True)
+re-registers the chain with it.
+"""
+from functools import lru_cache
+from pathlib import Path
+import struct
+import io
+
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace, TTFontMaker, TTFontParser
+from reportlab.pdfbase import pdfmetrics
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+PRIMARY_FONT = "THSarabunNew"
+PRIMARY_FONT_PATH = SCRIPT_DIR / "THSarabunNew.ttf"
+FALLBACK_FONT_DIR = SCRIPT_DIR / "fallback_fonts"
+SYSTEM_FALLBACK_FONTS = [
+    Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+    Path("/usr/share/fonts/TTF/DejaVuSans.ttf"),
+]
+
+# Zero-width joiner, variation selectors and skin-tone modifiers only make sense inside an
+# emoji font's ligatures; on their own they would draw as boxes
+INVISIBLE_MODIFIERS = frozenset([0x200D, *range(0xFE00, 0xFE10), *range(0x1F3FB, 0x1F400)])
+
+# Tables that only feed the TrueType hinting interpreter
+HINTING_TABLES = frozenset(["cvt ", "fpgm", "prep", "hdmx", "VDMX", "LTSH"])
+
+# Composite glyph component flags
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+WE_HAVE_INSTRUCTIONS = 0x0100
+
+_hinting = False
+# Fonts registered from files here, name -> path
+_font_paths = {PRIMARY_FONT: PRIMARY_FONT_PATH}
+
+
+class CoverageBitmap:
+    """One bit per Unicode code point (139 KB), set when the font maps it to a real glyph"""
+
+    def __init__(self, code_points):
+        self.bits = bytearray(0x110000 >> 3)
+        for code_point in code_points:
+            if 0 <= code_point < 0x110000:
+                self.bits[code_point >> 3] |= 1 << (code_point & 7)
+
+    def __contains__(self, code_point):
+        return bool(self.bits[code_point >> 3] & (1 << (code_point & 7)))
+
+    @classmethod
+    def for_font(cls, font):
+        return cls(code_point for code_point, glyph in font.face.charToGlyph.items() if glyph)
+
+
+class FontChain:
+    def __init__(self, fonts):
+        """`fonts`: registered TTFonts, primary first"""
+        self.names = [font.fontName for font in fonts]
+        self.coverage = [CoverageBitmap.for_font(font) for font in fonts]
+        primary_cap_height = fonts[0].face.capHeight
+        self.scales = [primary_cap_height / font.face.capHeight if font.face.capHeight else 1.0 for font in fonts]
+
+    def font_index(self, code_point):
+        for index, coverage in enumerate(self.coverage):
+            if code_point in coverage:
+                return index
+        return None
+
+    @lru_cache(maxsize=4096)
+    def runs(self, text):
+        """((font index, text), ...) for `text`; a single primary run when THSarabunNew covers it all"""
+        if text.isascii():
+            return ((0, text),)
+        runs = []
+        buffer = []
+        current = 0
+        for char in text:
+            code_point = ord(char)
+            index = self.font_index(code_point)
+            if index is None:
+                if code_point not in INVISIBLE_MODIFIERS:
+                    buffer.append(char)
+                continue
+            if index != current:
+                if buffer:
+                    runs.append((current, "".join(buffer)))
+                buffer = []
+                current = index
+            buffer.append(char)
+        if buffer or not runs:
+            runs.append((current, "".join(buffer)))
+        return tuple(runs)
+
+    def string_width(self, text, size):
+        return sum(pdfmetrics.stringWidth(run, self.names[index], size * self.scales[index])
+                   for index, run in self.runs(text))
+
+    def draw_string(self, c, x, y, text, size):
+        """
+        drawString with fallback fonts. The primary font must already be selected at `size`;
+        text it covers is drawn exactly as before, with no extra font switches.
+        """
+        runs = self.runs(text)
+        if len(runs) == 1 and runs[0][0] == 0:
+            c.drawString(x, y, runs[0][1])
+            return
+        for index, run in runs:
+            run_size = size * self.scales[index]
+            c.setFont(self.names[index], run_size)
+            c.drawString(x, y, run)
+            x += pdfmetrics.stringWidth(run, self.names[index], run_size)
+        c.setFont(self.names[0], size)
+
+    def draw_centred_string(self, c, x, y, text, size):
+        self.draw_string(c, x - self.string_width(text, size) / 2, y, text, size)
+
+
+def strip_glyph_instructions(glyph):
+    """A `glyf` entry without its hinting instructions; outlines are left untouched"""
+    if not glyph:
+        return glyph
+    contours = struct.unpack(">h", glyph[:2])[0]
+    if contours >= 0:
+        at = 10 + 2 * contours
+        length = struct.unpack(">H", glyph[at:at + 2])[0]
+        return glyph[:at] + b"\0\0" + glyph[at + 2 + length:]
+
+    at = 10
+    while True:
+        flags = struct.unpack(">H", glyph[at:at + 2])[0]
+        size = 4 + (4 if flags & ARG_1_AND_2_ARE_WORDS else 2)
+        if flags & WE_HAVE_A_SCALE:
+            size += 2
+        elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+            size += 4
+        elif flags & WE_HAVE_A_TWO_BY_TWO:
+            size += 8
+        if not flags & MORE_COMPONENTS:
+            break
+        at += size
+    if not flags & WE_HAVE_INSTRUCTIONS:
+        return glyph
+    return glyph[:at] + struct.pack(">H", flags & ~WE_HAVE_INSTRUCTIONS) + glyph[at + 2:at + size]
+
+
+@lru_cache(maxsize=None)
+def unhinted_font_data(path):
+    """
+    The TrueType font at `path` rebuilt without hinting: glyph instructions and the
+    interpreter tables (HINTING_TABLES) removed, `loca` rewritten in the long format
+    """
+    parser = TTFontParser(str(path))
+    head = parser.get_table("head")
+    long_offsets = struct.unpack(">h", head[50:52])[0] == 1
+    glyph_count = struct.unpack(">H", parser.get_table("maxp")[4:6])[0]
+    loca = parser.get_table("loca")
+    if long_offsets:
+        offsets = struct.unpack(f">{glyph_count + 1}L", loca[:4 * (glyph_count + 1)])
+    else:
+        offsets = [offset * 2 for offset in struct.unpack(f">{glyph_count + 1}H", loca[:2 * (glyph_count + 1)])]
+
+    glyf = parser.get_table("glyf")
+    glyphs = []
+    new_offsets = [0]
+    for start, stop in zip(offsets, offsets[1:]):
+        glyph = strip_glyph_instructions(glyf[start:stop])
+        glyph += b"\0" * (-len(glyph) % 4)
+        glyphs.append(glyph)
+        new_offsets.append(new_offsets[-1] + len(glyph))
+
+    maker = TTFontMaker()
+    for tag in parser.table:
+        if tag not in HINTING_TABLES and tag not in ("glyf", "loca", "head"):
+            maker.add(tag, parser.get_table(tag))
+    maker.add("head", head[:50] + struct.pack(">h", 1) + head[52:])
+    maker.add("loca", struct.pack(f">{len(new_offsets)}L", *new_offsets))
+    maker.add("glyf", b"".join(glyphs))
+    return maker.makeStream()
+
+
+def font_source(path):
+    """What TTFont should read `path` from under the current hinting setting"""
+    return str(path) if _hinting else io.BytesIO(unhinted_font_data(path))
+
+
+def fallback_font_paths():
+    paths = sorted(FALLBACK_FONT_DIR.glob("*.ttf")) if FALLBACK_FONT_DIR.is_dir() else []
+    system = next((path for path in SYSTEM_FALLBACK_FONTS if path.exists()), None)
+    if system is not None:
+        paths.append(system)
+    return paths
+
+
+def register_font(name, path):
+    try:
+        return pdfmetrics.getFont(name)
+    except KeyError:
+        font = TTFont(name, font_source(path))
+        pdfmetrics.registerFont(font)
+        _font_paths[name] = path
+        return font
+
+
+def set_hinting(enabled):
+    """
+    Embed fonts with or without TrueType hinting from now on. reportlab won't register a face
+    twice, so the registered fonts keep their names and get their face swapped; glyph
+    coverage and metrics are the same either way.
+    """
+    global _hinting
+    if enabled == _hinting:
+        return
+    _hinting = enabled
+    for name, path in _font_paths.items():
+        try:
+            font = pdfmetrics.getFont(name)
+        except KeyError:
+            continue
+        font.face = TTFontFace(font_source(path))
+
+
+@lru_cache(maxsize=None)
+def default_font_chain():
+    """The chain used by to_pdf.py, built (and its coverage bitmaps computed) once per process"""
+    fonts = [register_font(PRIMARY_FONT, PRIMARY_FONT_PATH)]
+    for path in fallback_font_paths():
+        try:
+            fonts.append(register_font(f"Fallback-{path.stem}", path))
+        except Exception as e:
+            print(f"Skipping fallback font {path}: {e}")
+    return FontChain(fonts)
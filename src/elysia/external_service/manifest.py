@@ -0,0 +1,164 @@
+"""
+Output manifest for a to_pdf.py run.
+
+process_all_users records one entry per user and writes pdf/<stem>/manifest.json at the end
+of the run, so consumers (download routes, ETags, retries) can read what was produced instead
+of listing and stat-ing the directory:
+
+    {
+      "version": 1,
+      "input": "<stem>",
+      "layout": "standard",
+      "profile": "balanced",
+      "deterministic": true,
+      "created_at": "2025-02-15T13:59:55.164Z",
+      "files": [
+        {"user_id": "...", "name": "...", "path": "<stem>/<ab>/attendance_sheet_<user_id>.pdf",
+         "bytes": 75746, "pages": 1, "sha256": "...", "digest": "...",
+         "content_digest": "...", "reused": false,
+         "render_ms": 95.1, "status": "ok", "error": null}
+      ]
+    }
+
+`sha256` hashes the file, `digest` the data it was drawn from (deterministic.sheet_digest),
+`content_digest` only what its pages show, the key of its preview (preview.py).
+`path` is relative to pdf/; see output_store.py for the shard directories.
+
+The JSON is written to a temporary file and renamed into place. Runs can also be indexed in
+SQLite (write_sqlite_manifest), one transaction per run; its files table carries each entry's
+`digest` and the run's `profile` too, so ETag lookups don't need the JSON.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import sqlite3
+import json
+import os
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_entry(user_id, name, path, root, render_seconds, pages=None, error=None, digest=None, reused=False,
+                   content_digest=None):
+    """
+    One file entry. `path` is stored relative to `root` (the pdf/ directory); size and hash are
+    only filled in for files that were generated. `reused` marks a file kept from the previous
+    run because its digest didn't change.
+    """
+    path = Path(path)
+    entry = {
+        "user_id": user_id,
+        "name": name,
+        "path": path.relative_to(root).as_posix(),
+        "bytes": None,
+        "pages": pages,
+        "sha256": None,
+        "digest": digest,
+        "content_digest": content_digest,
+        "reused": reused,
+        "render_ms": round(render_seconds * 1000, 1),
+        "status": "error" if error else "ok",
+        "error": error,
+    }
+    if not error:
+        entry["bytes"] = path.stat().st_size
+        entry["sha256"] = file_sha256(path)
+    return entry
+
+
+def build_manifest(input_name, layout, entries, deterministic=False, profile=None):
+    return {
+        "version": MANIFEST_VERSION,
+        "input": input_name,
+        "layout": layout,
+        "profile": profile,
+        "deterministic": deterministic,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "files": entries,
+    }
+
+
+def write_json_manifest(path, manifest):
+    """Write the manifest through a temporary file and rename, so readers never see a partial one"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_sqlite_manifest(db_path, run, manifest):
+    """
+    Index a run in SQLite. `run` identifies it (the input stem); re-running the same input
+    replaces its rows. Everything happens in one transaction.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run TEXT PRIMARY KEY,
+                    input TEXT,
+                    layout TEXT,
+                    created_at TEXT
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    run TEXT NOT NULL REFERENCES runs(run),
+                    user_id TEXT NOT NULL,
+                    name TEXT,
+                    path TEXT,
+                    bytes INTEGER,
+                    pages INTEGER,
+                    sha256 TEXT,
+                    render_ms REAL,
+                    status TEXT,
+                    error TEXT,
+                    digest TEXT,
+                    profile TEXT,
+                    PRIMARY KEY (run, user_id)
+                )""")
+            conn.execute("DELETE FROM files WHERE run = ?", (run,))
+            conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)",
+                         (run, manifest["input"], manifest["layout"], manifest["created_at"]))
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run, f["user_id"], f["name"], f["path"], f["bytes"], f["pages"], f["sha256"],
+                  f["render_ms"], f["status"], f["error"], f.get("digest"), manifest.get("profile"))
+                 for f in manifest["files"]])
+    finally:
+        conn.close()
+
+
+def delete_sqlite_runs(db_path, runs):
+    """Remove `runs` (input stems) from a SQLite index, e.g. after their directories were pruned"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"runs", "files"} <= tables:
+            return
+        with conn:
+            params = [(run,) for run in runs]
+            conn.executemany("DELETE FROM files WHERE run = ?", params)
+            conn.executemany("DELETE FROM runs WHERE run = ?", params)
+    finally:
+        conn.close()
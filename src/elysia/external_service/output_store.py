@@ -0,0 +1,144 @@
+"""
+Where to_pdf.py writes sheets, and how long export directories are kept.
+
+    pdf/<stem>/manifest.json
+    pdf/<stem>/<ab>/attendance_sheet_<user_id>.pdf    <ab>: first two hex digits of sha256(user_id)
+    pdf/<stem>/.tmp/                                   sheets still being written
+
+A flat pdf/<stem>/ with tens of thousands of sheets is slow to list, back up and sync. With
+256 shards a 50,000-user export has ~200 files per directory. User ids share their prefix
+("user_2..."), so shards are chosen by hash rather than by name. Consumers find sheets through
+manifest.json or the progress events, never by listing.
+
+A sheet is rendered, optimized and linearized under .tmp/ and renamed into its shard once it
+is finished. Readers see either the previous file or the complete new one, never a
+half-written PDF. Temporary files left by a crashed render are removed by the next run of the
+same export once they are STALE_TMP_SECONDS old.
+
+Retention (--retention-days N): export directories whose manifest is older than N days are
+deleted, along with their rows in the --manifest-sqlite index. Directories without a manifest
+(a run that never finished) age by their own mtime. Pruning lists only the top level of pdf/
+and stats one file per export, so it stays cheap however many sheets there are.
+
+    python output_store.py prune --older-than 30 [--dry-run]
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import hashlib
+import shutil
+import time
+import os
+
+from manifest import MANIFEST_FILENAME, delete_sqlite_runs
+
+SHARD_CHARS = 2
+TMP_DIRNAME = ".tmp"
+STALE_TMP_SECONDS = 3600
+
+
+def shard_for(user_id):
+    return hashlib.sha256(str(user_id).encode("utf-8")).hexdigest()[:SHARD_CHARS]
+
+
+def sheet_path(output_subdir, user_id):
+    """Final path of a user's sheet in the export directory output_subdir"""
+    return Path(output_subdir) / shard_for(user_id) / f"attendance_sheet_{user_id}.pdf"
+
+
+@contextmanager
+def atomic_output(path, output_subdir):
+    """
+    Yield a temporary path in output_subdir/.tmp to write `path` to; renamed over `path` when
+    the block finishes, deleted when it raises
+    """
+    path = Path(path)
+    tmp_dir = Path(output_subdir) / TMP_DIRNAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / f"{path.stem}.{os.getpid()}{path.suffix}"
+    try:
+        yield tmp_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def remove_stale_temporaries(output_subdir, max_age=STALE_TMP_SECONDS):
+    """Delete temporary sheets of crashed renders; younger ones may belong to a running render"""
+    cutoff = time.time() - max_age
+    try:
+        entries = os.scandir(Path(output_subdir) / TMP_DIRNAME)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
+
+
+def export_mtime(directory):
+    try:
+        return os.stat(os.path.join(directory, MANIFEST_FILENAME)).st_mtime
+    except FileNotFoundError:
+        return os.stat(directory).st_mtime
+
+
+def expired_exports(output_directory, keep_days, keep=()):
+    """(stem, path) of export directories in output_directory older than keep_days"""
+    cutoff = time.time() - keep_days * 86400
+    expired = []
+    with os.scandir(output_directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in keep or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if export_mtime(entry.path) < cutoff:
+                    expired.append((entry.name, Path(entry.path)))
+            except FileNotFoundError:
+                continue
+    return sorted(expired)
+
+
+def prune_exports(output_directory, keep_days, keep=(), manifest_sqlite=None, dry_run=False):
+    """
+    Delete export directories older than keep_days, except those named in `keep` (the runs in
+    progress). Returns the stems removed.
+    """
+    removed = []
+    for stem, path in expired_exports(output_directory, keep_days, keep):
+        if not dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+        removed.append(stem)
+    if removed and manifest_sqlite and not dry_run and Path(manifest_sqlite).exists():
+        delete_sqlite_runs(manifest_sqlite, removed)
+    if removed:
+        print(f"{'Would remove' if dry_run else 'Removed'} {len(removed)} export(s) older than {keep_days:g} days")
+    return removed
+
+
+def main():
+    script_dir = Path(__file__).parent.absolute()
+    parser = argparse.ArgumentParser(description='Maintain the pdf/ output directory of to_pdf.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prune_parser = subparsers.add_parser('prune', help='Delete export directories older than --older-than days')
+    prune_parser.add_argument('output_dir', nargs='?', default=str(script_dir / 'pdf'))
+    prune_parser.add_argument('--older-than', type=float, required=True, metavar='DAYS')
+    prune_parser.add_argument('--manifest-sqlite', default=None, metavar='DB',
+                              help='Also delete the pruned runs from this SQLite index')
+    prune_parser.add_argument('--dry-run', action='store_true', help='Only list what would be deleted')
+
+    args = parser.parse_args()
+
+    removed = prune_exports(args.output_dir, args.older_than, manifest_sqlite=args.manifest_sqlite,
+                            dry_run=args.dry_run)
+    for stem in removed:
+        print(f"  {stem}")
+
+
+if __name__ == "__main__":
+    main()
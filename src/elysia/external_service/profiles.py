@@ -0,0 +1,63 @@
+"""
+Output profiles for to_pdf.py: what a run trades between render time and file size.
+
+    compression   Flate-compress page content streams and embedded fonts (rl_config.pageCompression)
+    optimize      Rewrite the finished file with qpdf: objects packed into compressed object
+                  streams, every Flate stream recompressed at level 9
+
+reportlab already stores each font and image once per file and picks one subset per 256
+glyphs, so there is no further resource sharing or subset granularity to tune in a sheet.
+
+Measured with `python testdata/bench_export.py --users 20 --periods 3 --profiles
+fast,balanced,archive --repeat 7` (60 users, 3,480 shifts, 1-3 pages per sheet) on 1 CPU, best of
+seven renders after an untimed warm-up, best of both profile orders:
+
+    profile    compression  optimize   render    PDFs
+    fast       off          off        1.09 s    3,278 KB
+    balanced   on           off        1.17 s    1,106 KB
+    archive    on           on         1.40 s      970 KB
+
+Render times vary by about 15% between runs on a shared machine; sizes are exact. The same
+command reproduces the comparison on exports of any size.
+"""
+import shutil
+import subprocess
+
+from reportlab import rl_config
+
+from linearize import _pikepdf
+
+PROFILES = {
+    "fast": {"compression": False, "optimize": False},
+    "balanced": {"compression": True, "optimize": False},
+    "archive": {"compression": True, "optimize": True},
+}
+DEFAULT_PROFILE = "balanced"
+
+
+def optimize_available():
+    return _pikepdf() is not None or shutil.which("qpdf") is not None
+
+
+def apply_output_profile(name):
+    """Make every canvas created from now on follow profile `name`; returns its settings"""
+    profile = PROFILES[name]
+    rl_config.pageCompression = 1 if profile["compression"] else 0
+    return profile
+
+
+def optimize_pdf(path):
+    """Rewrite the PDF at `path` in place with object streams and level 9 Flate streams"""
+    pikepdf = _pikepdf()
+    if pikepdf is not None:
+        pikepdf.settings.set_flate_compression_level(9)
+        with pikepdf.open(path, allow_overwriting_input=True) as pdf:
+            pdf.save(path, object_stream_mode=pikepdf.ObjectStreamMode.generate, compress_streams=True,
+                     recompress_flate=True, deterministic_id=True)
+        return
+
+    qpdf = shutil.which("qpdf")
+    if qpdf is None:
+        raise RuntimeError("The archive profile needs pikepdf (pip install pikepdf) or the qpdf command")
+    subprocess.run([qpdf, "--object-streams=generate", "--recompress-flate", "--compression-level=9",
+                    "--deterministic-id", "--replace-input", str(path)], check=True, capture_output=True)
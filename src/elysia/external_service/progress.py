@@ -0,0 +1,48 @@
+"""
+Machine-readable progress events for a to_pdf.py run.
+
+With --progress, process_all_users writes one JSON object per line as soon as something
+happens, so the caller can stream results instead of waiting for the process to exit:
+
+    {"event": "start", "input": "<stem>", "layout": "standard", "profile": "balanced", "users": 500}
+    {"event": "sheet", "index": 0, "user_id": "...", "name": "...",
+     "path": "<stem>/<ab>/attendance_sheet_<user_id>.pdf", "bytes": 75746, "pages": 1, "sha256": "...",
+     "digest": "...", "reused": false, "render_ms": 95.1, "status": "ok", "error": null}
+    {"event": "done", "ok": 499, "errors": 1, "manifest": "<stem>/manifest.json", "elapsed_ms": 48123.4}
+
+"sheet" carries the same fields as the manifest entry; `path` is relative to pdf/. `users` is
+null when the input is streamed. With --preview, "preview" events take the place of "sheet":
+user_id, name, path (relative to the preview cache), digest, cached, render_ms, status, error.
+Every line is flushed immediately.
+
+Targets: "-" (stdout, mixed with the human-readable log lines), "fd:N" (an inherited file
+descriptor, e.g. an extra pipe opened by the parent) or a file path.
+"""
+import json
+import sys
+import os
+
+
+def open_progress_stream(target):
+    if target == "-":
+        return sys.stdout
+    if target.startswith("fd:"):
+        return os.fdopen(int(target[3:]), "w", encoding="utf-8", buffering=1)
+    return open(target, "a", encoding="utf-8", buffering=1)
+
+
+class ProgressWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    @classmethod
+    def open(cls, target):
+        return cls(open_progress_stream(target))
+
+    def emit(self, event, **fields):
+        self.stream.write(json.dumps({"event": event, **fields}, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
@@ -0,0 +1,77 @@
+"""
+Per-(user, month) cache of rendered attendance segments for to_pdf.py.
+
+Exports usually overlap (Jan-Mar, then Jan-Apr) and past months never change, so each
+month's table rows are drawn once and stored under a digest of the rows they show:
+
+    <cache_dir>/<user_id>/<YYYY-MM>-<digest>.json
+
+A segment is the list of PDF content streams of that month's rows, each recorded with its
+top edge at y=0 and a fixed font subset assignment (see to_pdf.SEGMENT_CHARSET).
+generate_segmented_attendance_pdf paginates the rows of all months together and replays each
+stream at its row's position, so a segmented sheet has the same pages, header and signatures
+as a direct render of the same range. When a month's rows change its digest changes, the
+segment is drawn again and the stale file for that month is removed.
+"""
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+
+from reportlab import Version as REPORTLAB_VERSION
+
+# Bump when the row drawing changes for the same rows
+SEGMENT_FORMAT = 2
+
+
+def month_digest(records):
+    """Digest of one month's table rows"""
+    payload = json.dumps([SEGMENT_FORMAT, REPORTLAB_VERSION, records], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _safe_name(value):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value) or "_"
+
+
+class SegmentCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, user_id, month, digest):
+        return self.cache_dir / _safe_name(user_id) / f"{month}-{digest}.json"
+
+    def get_or_render(self, user_id, month, records, render):
+        """
+        Row streams of the segment for `records`, calling render() to produce them on a miss.
+        Segments are written to a temporary name and renamed, so a crashed run never leaves
+        a truncated file behind under a valid key.
+        """
+        path = self.path_for(user_id, month, month_digest(records))
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                pages = json.load(f)
+            self.hits += 1
+            return pages
+        except (OSError, ValueError):
+            pass
+
+        pages = render()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(pages, f)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.misses += 1
+
+        for stale in path.parent.glob(f"{month}-*.json"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        return pages
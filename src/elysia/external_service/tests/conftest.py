@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+
+import pytest
+from reportlab import rl_config
+
+# The external_service modules import each other as top-level modules
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+
+def make_user(user_id="user_test", days=3, first_day=date(2025, 1, 1), name="Test User"):
+    """An export list entry with one on-site shift per day, like exportPdfController writes"""
+    all_shift = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        all_shift.append({"date": day.isoformat(), "on-site": [{
+            "doc_id": f"doc-{user_id}-{offset}",
+            "start_official": "08:30",
+            "end_official": "17:30",
+            "duration_official": "09:00:00",
+        }]})
+    return {"user_id": user_id, "org_id": "org_test", "name": name, "branch": "Branch A",
+            "email": "test@example.com", "position": "", "all_shift": all_shift}
+
+
+@pytest.fixture(autouse=True)
+def restore_rl_config():
+    """Deterministic mode and output profiles change reportlab's global settings"""
+    saved = rl_config.invariant, rl_config.pageCompression
+    yield
+    rl_config.invariant, rl_config.pageCompression = saved
@@ -0,0 +1,58 @@
+import pytest
+
+from batch import BatchJob, FairScheduler, parse_priority, priority_for
+
+
+def drain(scheduler):
+    order = []
+    while (picked := scheduler.next()) is not None:
+        job, item = picked
+        order.append((job.name, item))
+    return order
+
+
+def test_weighted_round_robin_order():
+    jobs = [BatchJob("a", ["a1", "a2", "a3", "a4"], priority=2), BatchJob("b", ["b1", "b2", "b3"])]
+    assert drain(FairScheduler(jobs)) == [
+        ("a", "a1"), ("a", "a2"), ("b", "b1"),
+        ("a", "a3"), ("a", "a4"), ("b", "b2"),
+        ("b", "b3"),
+    ]
+
+
+def test_small_job_finishes_in_its_first_rounds():
+    big = BatchJob("big", (f"big{i}" for i in range(2000)))
+    small = BatchJob("small", ["s1", "s2", "s3"])
+    scheduler = FairScheduler([big, small])
+
+    handed_out = []
+    while not small.exhausted:
+        handed_out.append(scheduler.next())
+    assert len(handed_out) == 6
+    assert [item for job, item in handed_out if job is small] == ["s1", "s2", "s3"]
+    assert not big.exhausted
+
+
+def test_exhausted_flag_is_set_with_the_last_item():
+    job = BatchJob("a", ["a1", "a2"])
+    scheduler = FairScheduler([job])
+    scheduler.next()
+    assert not job.exhausted
+    scheduler.next()
+    assert job.exhausted and scheduler.next() is None
+
+
+def test_jobs_without_users_are_skipped():
+    empty = BatchJob("empty", [])
+    scheduler = FairScheduler([empty, BatchJob("a", ["a1"])])
+    assert empty.exhausted
+    assert drain(scheduler) == [("a", "a1")]
+
+
+def test_priorities():
+    priorities = [parse_priority("export_list_*_1=3"), parse_priority("*=2")]
+    assert priority_for("export_list_2025_1", priorities) == 3
+    assert priority_for("other", priorities) == 2
+    assert priority_for("other", []) == 1
+    with pytest.raises(ValueError):
+        parse_priority("export=0")
@@ -0,0 +1,77 @@
+from pathlib import Path
+import json
+
+import pytest
+
+from batch import is_columnar_export, spool_inputs
+from conftest import SERVICE_DIR, make_user
+from to_pdf import process_shift_data, record_to_row
+
+pytest.importorskip("numpy")
+from export_columnar import ColumnarExport, write_columnar_export  # noqa: E402
+
+SAMPLE_INPUTS = sorted((SERVICE_DIR / "input").glob("*.json"))
+
+
+def json_rows(user):
+    return [record_to_row(record) for record in process_shift_data(user.get("all_shift"))]
+
+
+def mixed_user():
+    """Shift types, several shifts a day, unsorted and unparseable dates, missing and null times"""
+    return {"user_id": "user_mixed", "name": "Mixed", "all_shift": [
+        {"date": "2025-03-02", "on-site": [
+            {"doc_id": "a", "start_official": "08:00", "end_official": "12:00", "duration_official": "04:00:00"},
+            {"doc_id": "b", "start_official": "13:00", "end_official": "17:30", "duration_official": "04:30:00"},
+        ], "overtime": [
+            {"doc_id": "c", "start_official": "18:00", "end_official": "20:00", "duration_official": "02:00:00"},
+        ]},
+        {"date": "2025-02-28", "wfh": [{"doc_id": "d", "start_official": "09:00"}],
+         "on-site": [{"doc_id": "e", "message": "This shift is incomplete"}]},
+        {"date": "2025-02-28", "overtime": [{"doc_id": "f", "start_official": None, "end_official": "null"}]},
+        {"date": "28/02/2025", "on-site": [{"doc_id": "g", "start_official": "07:00"}]},
+        {"date": "", "on-site": [{"doc_id": "h", "start_official": "07:00"}]},
+        {"date": "2025-03-01"},
+    ]}
+
+
+def test_columnar_export_is_recognised(tmp_path):
+    write_columnar_export([make_user("user_a")], tmp_path / "export.cols")
+
+    meta = json.loads((tmp_path / "export.cols" / "meta.json").read_text(encoding="utf-8"))
+    assert meta["kind"] == "export"
+    assert is_columnar_export(tmp_path / "export.cols")
+    assert len(ColumnarExport(tmp_path / "export.cols")) == 1
+
+
+@pytest.mark.parametrize("input_path", SAMPLE_INPUTS, ids=lambda path: Path(path).stem)
+def test_rows_match_the_json_export(tmp_path, input_path):
+    users = json.loads(input_path.read_text(encoding="utf-8"))
+    users = users if isinstance(users, list) else [users]
+    users.append(mixed_user())
+    write_columnar_export(users, tmp_path / "export.cols")
+
+    columnar = list(ColumnarExport(tmp_path / "export.cols").iter_users())
+    assert [user["rows"] for user in columnar] == [json_rows(user) for user in users]
+
+
+def test_other_directories_with_meta_json_are_not_exports(tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "meta.json").write_text(json.dumps({"version": 1}), encoding="utf-8")
+    (other / "users.npy").write_bytes(b"")
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    (spool / "export_list_a.json").write_text(json.dumps([make_user("user_a")]), encoding="utf-8")
+    nested = spool / "photos"
+    nested.mkdir()
+    (nested / "meta.json").write_text(json.dumps({"kind": "thumbnails"}), encoding="utf-8")
+    write_columnar_export([make_user("user_b")], spool / "export_list_b.cols")
+
+    assert not is_columnar_export(other)
+    assert not is_columnar_export(nested)
+    assert [path.name for path in spool_inputs(spool)] == ["export_list_a.json", "export_list_b.cols"]
+    with pytest.raises(ValueError):
+        ColumnarExport(other)
+    with pytest.raises(ValueError):
+        ColumnarExport(nested)
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import make_user
+from to_pdf import COMPACT_LAYOUT, compact_rows_per_column, generate_compact_attendance_pdf, paginate_compact
+
+pymupdf = pytest.importorskip("pymupdf")
+
+FIRST_DAY = date(2025, 1, 1)
+ROW_HEIGHT = COMPACT_LAYOUT["row_height"]
+TABLE_WIDTH = sum(COMPACT_LAYOUT["col_widths"])
+FIRST_PAGE_ROWS = compact_rows_per_column(first_page=True)
+CONTINUATION_ROWS = compact_rows_per_column()
+
+
+def column_x(column):
+    return COMPACT_LAYOUT["margin_x"] + column * (TABLE_WIDTH + COMPACT_LAYOUT["column_gap"])
+
+
+def table_top(page_index):
+    """Top of the table header row, in pymupdf's top-down coordinates"""
+    key = "first_page_header_height" if page_index == 0 else "continuation_header_height"
+    header = COMPACT_LAYOUT[key]
+    return COMPACT_LAYOUT["margin_top"] + header
+
+
+def render(tmp_path, rows):
+    path = tmp_path / "compact.pdf"
+    page_count = generate_compact_attendance_pdf(make_user(days=rows, first_day=FIRST_DAY), str(path))
+    return page_count, pymupdf.open(path)
+
+
+def row_date(i):
+    return (FIRST_DAY + timedelta(days=i)).strftime("%d/%m/%Y")
+
+
+def assert_row_at(document, i, page_index, column, slot):
+    """Row i is drawn on page_index, in `column`, `slot` rows below the table header"""
+    hits = document[page_index].search_for(row_date(i))
+    assert len(hits) == 1, f"row {i} not on page {page_index + 1}"
+    box = hits[0]
+    row_top = table_top(page_index) + (slot + 1) * ROW_HEIGHT
+    assert row_top <= (box.y0 + box.y1) / 2 <= row_top + ROW_HEIGHT
+    assert column_x(column) <= box.x0 <= column_x(column) + COMPACT_LAYOUT["col_widths"][0]
+
+
+def signature_box(document, page_index):
+    hits = document[page_index].search_for("................../")
+    return hits[0] if hits else None
+
+
+def test_capacities_follow_the_layout():
+    assert FIRST_PAGE_ROWS == 30
+    assert CONTINUATION_ROWS == 33
+
+
+@pytest.mark.parametrize("rows, pages, signature", [
+    (0, [[(0, 0)]], (0, 0, 1)),
+    (FIRST_PAGE_ROWS, [[(0, 30)]], (0, 1, 0)),
+    (FIRST_PAGE_ROWS + 1, [[(0, 30), (30, 31)]], (0, 1, 2)),
+    (2 * FIRST_PAGE_ROWS, [[(0, 30), (30, 60)], []], (1, 0, 0)),
+    (2 * FIRST_PAGE_ROWS + 1, [[(0, 30), (30, 60)], [(60, 61)]], (1, 0, 2)),
+    (2 * FIRST_PAGE_ROWS + CONTINUATION_ROWS + 1, [[(0, 30), (30, 60)], [(60, 93), (93, 94)]], (1, 1, 2)),
+])
+def test_paginate_compact(rows, pages, signature):
+    assert paginate_compact(rows) == (pages, signature)
+
+
+def test_empty_sheet(tmp_path):
+    page_count, document = render(tmp_path, 0)
+    assert page_count == document.page_count == 1
+    # Signature block right below the header row of the first column
+    box = signature_box(document, 0)
+    assert box is not None
+    assert box.x0 < column_x(1)
+    assert table_top(0) + ROW_HEIGHT <= box.y0 < table_top(0) + 3 * ROW_HEIGHT
+
+
+def test_exactly_full_column(tmp_path):
+    page_count, document = render(tmp_path, FIRST_PAGE_ROWS)
+    assert page_count == document.page_count == 1
+    assert_row_at(document, 0, 0, 0, 0)
+    assert_row_at(document, FIRST_PAGE_ROWS - 1, 0, 0, FIRST_PAGE_ROWS - 1)
+    # No room under the full column: the signature opens the second column
+    box = signature_box(document, 0)
+    assert box.x0 > column_x(1)
+    assert box.y0 < table_top(0) + 2 * ROW_HEIGHT
+
+
+def test_overflow_into_second_column(tmp_path):
+    page_count, document = render(tmp_path, FIRST_PAGE_ROWS + 1)
+    assert page_count == document.page_count == 1
+    assert_row_at(document, FIRST_PAGE_ROWS - 1, 0, 0, FIRST_PAGE_ROWS - 1)
+    assert_row_at(document, FIRST_PAGE_ROWS, 0, 1, 0)
+    box = signature_box(document, 0)
+    assert box.x0 > column_x(1)
+    assert box.y0 > table_top(0) + 2 * ROW_HEIGHT
+
+
+def test_page_break(tmp_path):
+    rows = 2 * FIRST_PAGE_ROWS + 1
+    page_count, document = render(tmp_path, rows)
+    assert page_count == document.page_count == 2
+    assert_row_at(document, 2 * FIRST_PAGE_ROWS - 1, 0, 1, FIRST_PAGE_ROWS - 1)
+    assert_row_at(document, 2 * FIRST_PAGE_ROWS, 1, 0, 0)
+    assert signature_box(document, 0) is None
+
+
+def test_signature_on_last_page(tmp_path):
+    rows = 2 * FIRST_PAGE_ROWS + CONTINUATION_ROWS + 1
+    page_count, document = render(tmp_path, rows)
+    assert page_count == document.page_count == 2
+    assert_row_at(document, rows - 1, 1, 1, 0)
+    assert signature_box(document, 0) is None
+    box = signature_box(document, 1)
+    assert box.x0 > column_x(1)
+    assert box.y0 > table_top(1) + ROW_HEIGHT
+
+
+def test_full_last_page_moves_signature_to_a_new_page(tmp_path):
+    page_count, document = render(tmp_path, 2 * FIRST_PAGE_ROWS)
+    assert page_count == document.page_count == 2
+    assert signature_box(document, 0) is None
+    assert signature_box(document, 1) is not None
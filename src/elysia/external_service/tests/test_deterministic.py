@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from conftest import make_user
+from to_pdf import process_all_users
+
+
+def sheet_paths(manifest, root):
+    return {entry["user_id"]: Path(root) / entry["path"] for entry in manifest["files"]}
+
+
+def test_deterministic_rerun_reuses_unchanged_sheets(tmp_path):
+    users = [make_user("user_a"), make_user("user_b")]
+    first = process_all_users(users, tmp_path, "export", deterministic=True)
+    second = process_all_users([make_user("user_a"), make_user("user_b", days=4)], tmp_path, "export",
+                               deterministic=True)
+
+    reused = {entry["user_id"]: entry["reused"] for entry in second["files"]}
+    assert reused == {"user_a": True, "user_b": False}
+    assert second["files"][0]["sha256"] == first["files"][0]["sha256"]
+
+
+def test_deterministic_run_does_not_reuse_non_deterministic_sheets(tmp_path):
+    process_all_users([make_user("user_a")], tmp_path, "export")
+    manifest = process_all_users([make_user("user_a")], tmp_path, "export", deterministic=True)
+
+    entry = manifest["files"][0]
+    assert entry["reused"] is False
+    data = sheet_paths(manifest, tmp_path)["user_a"].read_bytes()
+    assert b"/CreationDate (D:20000101" in data
+
+    # The same data rendered deterministically elsewhere gives the same file
+    fresh = process_all_users([make_user("user_a")], tmp_path, "fresh", deterministic=True)
+    assert fresh["files"][0]["sha256"] == entry["sha256"]
+
+
+def test_linearize_rerun_does_not_reuse_unlinearized_sheets(tmp_path):
+    pikepdf = pytest.importorskip("pikepdf")
+
+    users = [make_user("user_long", days=90)]
+    first = process_all_users(users, tmp_path, "export", deterministic=True)
+    assert first["files"][0]["pages"] >= 3
+
+    manifest = process_all_users([make_user("user_long", days=90)], tmp_path, "export", linearize=True,
+                                 deterministic=True)
+    entry = manifest["files"][0]
+    assert entry["reused"] is False
+    assert entry["digest"] != first["files"][0]["digest"]
+    with pikepdf.open(sheet_paths(manifest, tmp_path)["user_long"]) as pdf:
+        assert pdf.is_linearized
+
+    again = process_all_users([make_user("user_long", days=90)], tmp_path, "export", linearize=True,
+                              deterministic=True)
+    assert again["files"][0]["reused"] is True
+
+
+def test_digest_rows_are_not_kept_in_the_input(tmp_path):
+    users = [make_user("user_a"), make_user("user_b")]
+    process_all_users(users, tmp_path, "export", deterministic=True)
+    assert not any("rows" in user for user in users)
@@ -0,0 +1,19 @@
+import json
+
+from external_sort import spill_sorted_runs
+
+
+def thai_line(i):
+    return json.dumps({"_id": f"doc-{i}", "_source": {"user_id": f"user_{i % 3}", "date": f"2025-01-{i + 1:02d}",
+                                                      "reason": "ส่งสินค้าด่วนประจำวัน" * 4}},
+                      ensure_ascii=False)
+
+
+def test_run_size_counts_utf8_bytes(tmp_path):
+    lines = [thai_line(i) for i in range(10)]
+    line_bytes = len(lines[0].encode("utf-8"))
+    assert line_bytes > 1.5 * len(lines[0])
+
+    # Two lines' worth of bytes per run, but not of characters
+    runs = spill_sorted_runs(lines, tmp_path, run_bytes=2 * line_bytes)
+    assert len(runs) == 5
@@ -0,0 +1,43 @@
+import pytest
+from reportlab.pdfgen import canvas
+
+from fonts import FALLBACK_FONT_DIR, INVISIBLE_MODIFIERS, default_font_chain
+
+pymupdf = pytest.importorskip("pymupdf")
+
+NAMES = ["Chinathaipan 🐬", "ชื่อ-นามสกุล: Dvořák Łukasz 👍🏽", "Ελένη Смирнова"]
+
+
+def test_fallback_fonts_are_bundled():
+    bundled = {path.name for path in FALLBACK_FONT_DIR.glob("*.ttf")}
+    assert {"NotoEmoji-Regular.ttf", "NotoSans-Regular.ttf"} <= bundled
+    chain = default_font_chain()
+    assert {"Fallback-NotoEmoji-Regular", "Fallback-NotoSans-Regular"} <= set(chain.names)
+
+
+def test_every_code_point_is_covered():
+    chain = default_font_chain()
+    for name in NAMES:
+        missing = [f"U+{ord(char):04X}" for char in name
+                   if ord(char) not in INVISIBLE_MODIFIERS and chain.font_index(ord(char)) is None]
+        assert not missing, f"{name!r}: no font covers {missing}"
+
+
+def test_example_name_draws_the_emoji_from_the_emoji_font(tmp_path):
+    chain = default_font_chain()
+    runs = chain.runs("Chinathaipan 🐬")
+    assert [chain.names[index] for index, _ in runs] == ["THSarabunNew", "Fallback-NotoEmoji-Regular"]
+
+    path = tmp_path / "name.pdf"
+    c = canvas.Canvas(str(path))
+    c.setFont("THSarabunNew", 16)
+    chain.draw_string(c, 50, 700, "Chinathaipan 🐬", 16)
+    c.save()
+    with pymupdf.open(path) as document:
+        page = document[0]
+        emoji_spans = [span for span in page.get_texttrace() if "NotoEmoji" in span["font"]]
+        assert len(emoji_spans) == 1 and len(emoji_spans[0]["chars"]) == 1
+        # The glyph has ink (a real outline, not an empty .notdef)
+        pixmap = page.get_pixmap(clip=pymupdf.Rect(emoji_spans[0]["bbox"]), dpi=144,
+                                 colorspace=pymupdf.csGRAY)
+        assert min(pixmap.samples) < 128
@@ -0,0 +1,22 @@
+import sqlite3
+
+from conftest import make_user
+from to_pdf import process_all_users
+
+
+def file_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT user_id, digest, profile FROM files ORDER BY user_id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_sqlite_files_carry_digest_and_profile(tmp_path):
+    db_path = tmp_path / "manifest.sqlite"
+    manifest = process_all_users([make_user("user_a"), make_user("user_b")], tmp_path, "export",
+                                 profile="fast", manifest_sqlite=db_path)
+
+    digests = {entry["user_id"]: entry["digest"] for entry in manifest["files"]}
+    assert file_rows(db_path) == [("user_a", digests["user_a"], "fast"), ("user_b", digests["user_b"], "fast")]
+
@@ -0,0 +1,95 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from conftest import make_user
+from output_store import TMP_DIRNAME, atomic_output, prune_exports
+from to_pdf import process_all_users
+
+DAY = 86400
+
+
+def make_export(output_directory, stem, age_days, manifest=True):
+    directory = output_directory / stem
+    directory.mkdir(parents=True)
+    (directory / "ab").mkdir()
+    (directory / "ab" / "attendance_sheet_user_a.pdf").write_bytes(b"%PDF")
+    mtime = time.time() - age_days * DAY
+    if manifest:
+        (directory / "manifest.json").write_text(json.dumps({"files": []}), encoding="utf-8")
+        os.utime(directory / "manifest.json", (mtime, mtime))
+    os.utime(directory, (mtime, mtime))
+    return directory
+
+
+def test_prune_respects_age_and_keep(tmp_path):
+    make_export(tmp_path, "old", 40)
+    make_export(tmp_path, "running", 40)
+    make_export(tmp_path, "recent", 5)
+    make_export(tmp_path, ".tmp", 40)
+
+    assert prune_exports(tmp_path, 30, keep={"running"}) == ["old"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [".tmp", "recent", "running"]
+
+
+def test_directories_without_manifest_age_by_their_mtime(tmp_path):
+    make_export(tmp_path, "crashed_old", 40, manifest=False)
+    make_export(tmp_path, "crashed_recent", 5, manifest=False)
+    # A fresh manifest keeps an export whose directory is old
+    directory = make_export(tmp_path, "finished", 5)
+    old = time.time() - 40 * DAY
+    os.utime(directory, (old, old))
+
+    assert prune_exports(tmp_path, 30) == ["crashed_old"]
+    assert not (tmp_path / "crashed_old").exists()
+
+
+def test_dry_run_deletes_nothing(tmp_path):
+    db_path = tmp_path / "manifest.sqlite"
+    output_directory = tmp_path / "pdf"
+    process_all_users([make_user("user_a")], output_directory, "old", manifest_sqlite=db_path)
+    old = time.time() - 40 * DAY
+    os.utime(output_directory / "old" / "manifest.json", (old, old))
+
+    assert prune_exports(output_directory, 30, manifest_sqlite=db_path, dry_run=True) == ["old"]
+    assert (output_directory / "old" / "manifest.json").exists()
+    assert run_names(db_path) == ["old"]
+
+    assert prune_exports(output_directory, 30, manifest_sqlite=db_path) == ["old"]
+    assert not (output_directory / "old").exists()
+    assert run_names(db_path) == []
+
+
+def run_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT run FROM runs")]
+    finally:
+        conn.close()
+
+
+def test_atomic_output_removes_the_temporary_file_on_error(tmp_path):
+    path = tmp_path / "ab" / "attendance_sheet_user_a.pdf"
+    with pytest.raises(RuntimeError):
+        with atomic_output(path, tmp_path) as tmp_file:
+            tmp_file.write_bytes(b"%PDF half written")
+            raise RuntimeError("render failed")
+
+    assert not tmp_file.exists()
+    assert not path.exists()
+    assert list((tmp_path / TMP_DIRNAME).iterdir()) == []
+
+
+def test_atomic_output_replaces_the_previous_sheet(tmp_path):
+    path = tmp_path / "ab" / "attendance_sheet_user_a.pdf"
+    path.parent.mkdir()
+    path.write_bytes(b"old")
+    with atomic_output(path, tmp_path) as tmp_file:
+        tmp_file.write_bytes(b"new")
+        assert path.read_bytes() == b"old"
+
+    assert path.read_bytes() == b"new"
+    assert list((tmp_path / TMP_DIRNAME).iterdir()) == []
@@ -0,0 +1,44 @@
+import json
+import sys
+
+import pytest
+
+import to_pdf
+from conftest import make_user
+from segment_cache import SegmentCache
+from to_pdf import process_all_users, process_previews
+
+pytest.importorskip("pymupdf")
+from preview import PreviewCache  # noqa: E402
+
+
+def test_previews_are_shared_across_output_settings(tmp_path):
+    cache = PreviewCache(tmp_path / "previews")
+    first = process_previews([make_user("user_a", days=40)], "export", cache)
+    again = process_previews([make_user("user_a", days=40)], "export", cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert again[0]["digest"] == first[0]["digest"]
+
+    # Manifests of every profile, linearization and --segment-cache point at that same preview
+    runs = [
+        process_all_users([make_user("user_a", days=40)], tmp_path / "pdf", "plain"),
+        process_all_users([make_user("user_a", days=40)], tmp_path / "pdf", "fast", profile="fast"),
+        process_all_users([make_user("user_a", days=40)], tmp_path / "pdf", "linear", linearize=True),
+        process_all_users([make_user("user_a", days=40)], tmp_path / "pdf", "segmented",
+                          segment_cache=SegmentCache(tmp_path / "segments")),
+    ]
+    assert len({run["files"][0]["digest"] for run in runs}) == len(runs)
+    assert {run["files"][0]["content_digest"] for run in runs} == {first[0]["digest"]}
+
+
+def test_preview_does_not_need_the_optimizer(tmp_path, monkeypatch):
+    input_path = tmp_path / "export_list.json"
+    input_path.write_text(json.dumps([make_user("user_a")]), encoding="utf-8")
+    monkeypatch.setattr(to_pdf, "optimize_available", lambda: False)
+    monkeypatch.setattr(to_pdf, "linearize_available", lambda: False)
+    monkeypatch.setattr(sys, "argv", ["to_pdf.py", str(input_path), "--preview", "--profile", "archive",
+                                      "--linearize", "--preview-cache", str(tmp_path / "previews")])
+
+    to_pdf.main()
+
+    assert len(list((tmp_path / "previews").rglob("*.png"))) == 1
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from conftest import make_user
+from segment_cache import SegmentCache
+from to_pdf import generate_attendance_pdf, generate_segmented_attendance_pdf
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+def render_pair(tmp_path, user, cache):
+    direct, segmented = tmp_path / "direct.pdf", tmp_path / "segmented.pdf"
+    direct_pages = generate_attendance_pdf(user, str(direct))
+    segmented_pages = generate_segmented_attendance_pdf(user, str(segmented), cache)
+    assert segmented_pages == direct_pages
+    return pymupdf.open(direct), pymupdf.open(segmented)
+
+
+def assert_same_pages(direct, segmented):
+    assert segmented.page_count == direct.page_count
+    for direct_page, segmented_page in zip(direct, segmented):
+        assert segmented_page.get_text() == direct_page.get_text()
+        assert segmented_page.get_pixmap().samples == direct_page.get_pixmap().samples
+
+
+def test_short_sheet_across_months_stays_one_page(tmp_path):
+    user = make_user(days=6, first_day=date(2025, 1, 29))
+    direct, segmented = render_pair(tmp_path, user, SegmentCache(tmp_path / "cache"))
+
+    assert segmented.page_count == 1
+    assert "ลงชื่อ" in segmented[0].get_text()
+    assert_same_pages(direct, segmented)
+
+
+def test_long_sheet_paginates_across_month_boundaries(tmp_path):
+    cache = SegmentCache(tmp_path / "cache")
+    user = make_user(days=75, first_day=date(2025, 1, 10))
+    direct, segmented = render_pair(tmp_path, user, cache)
+
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert segmented.page_count > 1
+    assert "ลงชื่อ" in segmented[-1].get_text()
+    assert_same_pages(direct, segmented)
+
+
+def test_unchanged_months_are_reused(tmp_path):
+    cache = SegmentCache(tmp_path / "cache")
+    generate_segmented_attendance_pdf(make_user(days=40, first_day=date(2025, 1, 1)),
+                                      str(tmp_path / "first.pdf"), cache)
+    user = make_user(days=70, first_day=date(2025, 1, 1))
+    direct, segmented = render_pair(tmp_path, user, cache)
+
+    # January is reused, February grew and March is new
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert_same_pages(direct, segmented)
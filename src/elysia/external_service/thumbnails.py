@@ -0,0 +1,182 @@
+"""
+Clock-in/clock-out photo thumbnails for the `photos` layout of to_pdf.py.
+
+Shift photos are uploaded to the S3-compatible bucket (src/elysia/controllers/upload.ts,
+bucket "tokbud", prefix time-record/) and referenced by URL in image_url_start/image_url_end.
+They are fetched concurrently, downscaled to small JPEGs and kept in a content-addressed
+cache on disk:
+
+    <cache_dir>/thumbs/<ab>/<sha256 of the original>-<w>x<h>-q<quality>.jpg
+    <cache_dir>/urls/<ab>/<sha256 of the url>       -> sha256 of the original
+
+Upload keys are random and never rewritten, so a URL seen before resolves to its thumbnail
+without another fetch. Stores:
+    S3ImageStore         GET the URL, SigV4-signed when credentials are configured
+    DirectoryImageStore  map the URL path onto a local directory (tests, fixtures, no network)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, unquote
+from pathlib import Path
+import urllib.request
+import threading
+import hashlib
+import hmac
+import io
+import os
+
+THUMBNAIL_SIZE = (120, 90)
+THUMBNAIL_QUALITY = 70
+FETCH_WORKERS = 8
+
+
+class DirectoryImageStore:
+    """Resolve https://host/<bucket>/<key> to <root>/<bucket>/<key>, falling back to <root>/<file name>"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def fetch(self, url):
+        relative = unquote(urlsplit(url).path).lstrip("/")
+        path = self.root / relative
+        if not path.is_file():
+            path = self.root / Path(relative).name
+        with path.open("rb") as f:
+            return f.read()
+
+
+class S3ImageStore:
+    """
+    Fetch image URLs over HTTP. With an access key the request is signed (AWS SigV4, path-style,
+    unsigned payload) so private buckets work; credentials default to the usual AWS_* variables.
+    """
+
+    def __init__(self, access_key=None, secret_key=None, region=None, timeout=10):
+        self.access_key = access_key or os.environ.get("AWS_ACCESS_KEY_ID")
+        self.secret_key = secret_key or os.environ.get("AWS_SECRET_ACCESS_KEY")
+        self.region = region or os.environ.get("AWS_REGION", "us-east-1")
+        self.timeout = timeout
+
+    def sign(self, url, now=None, method="GET"):
+        parts = urlsplit(url)
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{now:%Y%m%d}/{self.region}/s3/aws4_request"
+        canonical_query = "&".join(sorted(parts.query.split("&"))) if parts.query else ""
+        canonical_request = "\n".join([
+            method, parts.path or "/", canonical_query,
+            f"host:{parts.netloc}", "x-amz-content-sha256:UNSIGNED-PAYLOAD", f"x-amz-date:{amz_date}", "",
+            "host;x-amz-content-sha256;x-amz-date", "UNSIGNED-PAYLOAD",
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (f"{now:%Y%m%d}", self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return {
+            "x-amz-date": amz_date,
+            "x-amz-content-sha256": "UNSIGNED-PAYLOAD",
+            "Authorization": f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                             f"SignedHeaders=host;x-amz-content-sha256;x-amz-date, Signature={signature}",
+        }
+
+    def fetch(self, url):
+        headers = self.sign(url) if self.access_key and self.secret_key else {}
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+
+def open_image_store(spec=None):
+    """A DirectoryImageStore for an existing directory, otherwise an S3ImageStore"""
+    if spec and Path(spec).is_dir():
+        return DirectoryImageStore(spec)
+    return S3ImageStore()
+
+
+def downscale(data, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """JPEG thumbnail of an image, EXIF-rotated and fitted inside `size`"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder skip most of the pixels of full-size camera captures
+        image.draft("RGB", (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail(size, Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+        self.cache_dir = Path(cache_dir)
+        self.size = size
+        self.quality = quality
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def thumbnail_path(self, digest):
+        width, height = self.size
+        return self.cache_dir / "thumbs" / digest[:2] / f"{digest}-{width}x{height}-q{self.quality}.jpg"
+
+    def url_index_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / "urls" / key[:2] / key
+
+    def get(self, url, store):
+        """Thumbnail path for `url`, fetching and downscaling through `store` on a miss"""
+        index_path = self.url_index_path(url)
+        try:
+            path = self.thumbnail_path(index_path.read_text().strip())
+            if path.exists():
+                self._count("hits")
+                return path
+        except OSError:
+            pass
+
+        data = store.fetch(url)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.thumbnail_path(digest)
+        if not path.exists():
+            _write_atomic(path, downscale(data, self.size, self.quality))
+        _write_atomic(index_path, digest.encode())
+        self._count("misses")
+        return path
+
+    def fetch_all(self, urls, store, max_workers=FETCH_WORKERS):
+        """
+        {url: thumbnail path} for every distinct non-empty URL, fetched concurrently.
+        URLs that can't be fetched or decoded map to None and the sheet leaves their cell empty.
+        """
+        unique = sorted({url for url in urls if url})
+
+        def get_or_none(url):
+            try:
+                return self.get(url, store)
+            except Exception as e:
+                self._count("errors")
+                print(f"Could not load photo {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(unique, pool.map(get_or_none, unique)))
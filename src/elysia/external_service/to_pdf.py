@@ -1,21 +1,32 @@
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.pdfgen import canvas
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
 from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections.abc import Iterator
+import io
 import os
 import sys
 import json
 import argparse
+import time
 from pathlib import Path
 
+from manifest import MANIFEST_FILENAME, build_manifest, manifest_entry, write_json_manifest, write_sqlite_manifest
+from linearize import LINEARIZE_MIN_PAGES, linearize_pdf, available as linearize_available
+from fonts import default_font_chain, register_font
+from deterministic import content_digest, enable_deterministic_output, previous_entries, reusable, sheet_digest
+from profiles import DEFAULT_PROFILE, PROFILES, apply_output_profile, optimize_available, optimize_pdf
+from output_store import atomic_output, prune_exports, remove_stale_temporaries, sheet_path
+from preview import PREVIEW_FORMATS, PREVIEW_WIDTH, PreviewCache, available as preview_available
+
 # Get the script's directory
 SCRIPT_DIR = Path(__file__).parent.absolute()
 
 # Update font path to be relative to the script
 THAI_FONT_PATH = str(SCRIPT_DIR / "THSarabunNew.ttf")
-pdfmetrics.registerFont(TTFont("THSarabunNew", THAI_FONT_PATH))
+register_font("THSarabunNew", THAI_FONT_PATH)
 
 def clean_value(value):
     """Handle null values and convert them to 'None' for header information"""
@@ -117,10 +128,45 @@ def process_shift_data(all_shift):
     
     return sorted_records
 
-def generate_attendance_pdf(employee_data, output_path):
-    c = canvas.Canvas(output_path, pagesize=A4)
-    width, height = A4
+TITLE = "ใบลงเวลา ประจําเดือน"
+TABLE_HEADERS = ["วันที่", "เข้า(ปกติ)", "ออก(ปกติ)", "เข้า(OT)", "ออก(OT)", "ชั่วโมงปกติ", "ชั่วโมง OT", "ลายเซ็น"]
+SIGNATURE_LINES = [
+    ("ลงชื่อ: .................................................... ผู้ตรวจสอบ", "วันที: ................../................../.................."),
+    ("ลงชื่อ: .................................................... ผู้รับรอง", "วันที: ................../................../.................."),
+]
+
+LAYOUTS = ["standard", "compact", "photos"]
+
+# Portrait A4 table geometry of the standard layout
+STANDARD_COL_WIDTHS = [70, 65, 65, 65, 65, 65, 65, 65]
+STANDARD_TABLE_X = 30
+STANDARD_ROW_HEIGHT = 25
+STANDARD_MIN_BOTTOM_MARGIN = 50
+
+# Standard layout with clock-in/clock-out thumbnails between the hours and the signature
+PHOTO_TABLE_HEADERS = TABLE_HEADERS[:7] + ["รูปเข้า", "รูปออก"] + TABLE_HEADERS[7:]
+PHOTO_COL_WIDTHS = [62, 50, 50, 50, 50, 56, 56, 52, 52, 44]
+PHOTO_SIZE = (48, 36)
+PHOTO_ROW_HEIGHT = 40
+
+# Landscape A4 with the table flowing through side-by-side columns and tighter rows
+COMPACT_LAYOUT = {
+    "pagesize": landscape(A4),
+    "margin_x": 30,
+    "margin_top": 30,
+    "margin_bottom": 30,
+    "columns": 2,
+    "column_gap": 14,
+    "col_widths": [52, 46, 46, 46, 46, 50, 50, 48],
+    "row_height": 15,
+    "header_font_size": 12,
+    "row_font_size": 11,
+    "first_page_header_height": 62,  # title + two lines of details
+    "continuation_header_height": 18,  # one line identifying the employee
+    "signature_height": 64,  # four stacked lines, fits in one column
+}
 
+def apply_static_defaults(employee_data):
     static_data = {
         "employee_id": "TH12345",
         "department": "office",
@@ -132,91 +178,622 @@ def generate_attendance_pdf(employee_data, output_path):
             if key not in employee_data or not employee_data[key]:
                 employee_data[key] = value
 
-    def draw_header_and_details():
-        c.setFont("THSarabunNew", 20)
-        c.drawCentredString(width / 2, height - 50, "ใบลงเวลา ประจําเดือน")
+def employee_details(employee_data):
+    """Header detail lines shown above the table"""
+    return [
+        f"รหัสพนักงาน: {safe_get(employee_data, 'employee_id')}",
+        f"ชื่อ-นามสกุล: {safe_get(employee_data, 'name')}",
+        f"ประจําหน่วยงาน: {safe_get(employee_data, 'department')}",
+        f"สาขา: {safe_get(employee_data, 'branch')}",
+        f"อีเมล: {safe_get(employee_data, 'email')}",
+        f"ตำแหน่งงาน: {safe_get(employee_data, 'position')}",
+        f"เวลาทํางาน: {safe_get(employee_data, 'working_hours')}"
+    ]
 
-        c.setFont("THSarabunNew", 16)
-        y_pos = height - 80
-
-        details = [
-            f"รหัสพนักงาน: {safe_get(employee_data, 'employee_id')}",
-            f"ชื่อ-นามสกุล: {safe_get(employee_data, 'name')}",
-            f"ประจําหน่วยงาน: {safe_get(employee_data, 'department')}",
-            f"สาขา: {safe_get(employee_data, 'branch')}",
-            f"อีเมล: {safe_get(employee_data, 'email')}",
-            f"ตำแหน่งงาน: {safe_get(employee_data, 'position')}",
-            f"เวลาทํางาน: {safe_get(employee_data, 'working_hours')}"
-        ]
-
-        for detail in details:
-            c.drawString(50, y_pos, detail)
-            y_pos -= 20
-
-        return y_pos - 30
-
-    headers = ["วันที่", "เข้า(ปกติ)", "ออก(ปกติ)", "เข้า(OT)", "ออก(OT)", "ชั่วโมงปกติ", "ชั่วโมง OT", "ลายเซ็น"]
-    col_widths = [70, 65, 65, 65, 65, 65, 65, 65]
-    table_x = 30
-    row_height = 25
-    min_bottom_margin = 50  # Minimum space to leave at bottom of page
+def sheet_rows(employee_data):
+    """Table rows of a sheet; users read from a columnar export come with them ready-made"""
+    if isinstance(employee_data, dict) and 'rows' in employee_data:
+        return employee_data['rows']
+    all_shift = employee_data.get('all_shift', []) if isinstance(employee_data, dict) else []
+    return [record_to_row(record) for record in process_shift_data(all_shift)]
+
+def record_to_row(record):
+    return [
+        record['date'],
+        record['regular_in'],
+        record['regular_out'],
+        record['ot_in'],
+        record['ot_out'],
+        record['duration_regular'],
+        record['duration_ot'],
+        record['signature']
+    ]
+
+def draw_header_and_details(c, employee_data, pagesize=A4):
+    """Title and employee details at the top of the first page; returns the y where the table starts"""
+    width, height = pagesize
+    c.setFont("THSarabunNew", 20)
+    c.drawCentredString(width / 2, height - 50, TITLE)
 
-    # Draw initial page
-    y_position = draw_header_and_details()
-    
-    # Draw initial table header
     c.setFont("THSarabunNew", 16)
-    y_position = draw_table_header(c, y_position, table_x, col_widths, headers, row_height)
+    y_pos = height - 80
 
+    details = employee_details(employee_data)
+    fonts = default_font_chain()
+
+    for detail in details:
+        fonts.draw_string(c, 50, y_pos, detail, 16)
+        y_pos -= 20
+
+    return y_pos - 30
+
+def paginate_standard(row_count, first_table_top, height=A4[1], row_height=STANDARD_ROW_HEIGHT,
+                      header_height=STANDARD_ROW_HEIGHT):
+    """
+    Page boundaries of the standard layout, decided before anything is drawn.
+    Returns (pages, signature_on_new_page) where pages is a list of (start, stop) row ranges.
+    A page takes rows while the next row still ends above the bottom margin; continuation pages
+    start their table 50pt below the top edge.
+    """
+    lowest_row_top = STANDARD_MIN_BOTTOM_MARGIN + row_height
+
+    pages = []
+    start = 0
+    table_top = first_table_top
+    while True:
+        y_position = table_top - header_height  # below the table header
+        fits = int((y_position - lowest_row_top) // row_height) + 1 if y_position >= lowest_row_top else 0
+        stop = min(start + fits, row_count)
+        pages.append((start, stop))
+        if stop >= row_count:
+            break
+        start = stop
+        table_top = height - 50
+
+    y_position = table_top - header_height - row_height * (stop - start)
+    signature_on_new_page = y_position < (STANDARD_MIN_BOTTOM_MARGIN + 60)  # 60 is the height needed for signatures
+    return pages, signature_on_new_page
+
+def draw_standard_row(c, row, y_position):
+    """One standard layout table row with its top edge at y_position, in the current (row) font"""
+    row_height = STANDARD_ROW_HEIGHT
+    x_position = STANDARD_TABLE_X
+    for i, value in enumerate(row):
+        c.rect(x_position, y_position - row_height, STANDARD_COL_WIDTHS[i], row_height, stroke=1, fill=0)
+        c.drawString(x_position + 5, y_position - row_height + 8, clean_table_value(value))
+        x_position += STANDARD_COL_WIDTHS[i]
+
+def draw_standard_table_page(c, rows, table_top, row_streams=None):
+    """
+    Table header and `rows` of one standard layout page, starting at table_top. `row_streams`
+    (one recorded stream per row, see render_row_streams) are replayed instead of drawing the rows.
+    """
+    row_height = STANDARD_ROW_HEIGHT
+    c.setFont("THSarabunNew", 16)
+    y_position = draw_table_header(c, table_top, STANDARD_TABLE_X, STANDARD_COL_WIDTHS, TABLE_HEADERS, row_height)
     c.setFont("THSarabunNew", 14)
 
-    all_shift = employee_data.get('all_shift', []) if isinstance(employee_data, dict) else []
-    attendance_records = process_shift_data(all_shift)
+    for i, row in enumerate(rows):
+        if row_streams is None:
+            draw_standard_row(c, row, y_position)
+        else:
+            c.saveState()
+            c.translate(0, y_position)
+            c.addLiteral(row_streams[i])
+            c.restoreState()
+        y_position -= row_height
+
+    return y_position
+
+def render_standard_pages(jobs):
+    """Worker side of render_standard_pages_parallel: content streams for [(rows, table_top), ...]"""
+    c = PageRecorder()
+    for rows, table_top in jobs:
+        draw_standard_table_page(c, rows, table_top)
+        c.showPage()
+    return c.pages
+
+def render_standard_pages_parallel(rows, pages, tops, pool):
+    """
+    Render the planned table pages in `pool` (a concurrent.futures executor), PAGES_PER_TASK
+    pages per task, and return their content streams in page order
+    """
+    jobs = [(rows[start:stop], top) for (start, stop), top in zip(pages, tops)]
+    tasks = [jobs[i:i + PAGES_PER_TASK] for i in range(0, len(jobs), PAGES_PER_TASK)]
+    return [stream for streams in pool.map(render_standard_pages, tasks) for stream in streams]
+
+def generate_attendance_pdf(employee_data, output_path, layout="standard", pool=None, thumbnails=None,
+                            first_page_only=False, row_streams=None, rows=None):
+    """
+    Render a sheet to output_path (a path or a binary file object) and return its page count.
+    With first_page_only only what the full sheet shows on its first page is drawn (preview.py).
+    `row_streams` are recorded table rows to replay (standard layout, see
+    generate_segmented_attendance_pdf), one per row of the sheet. `rows` are the sheet's table
+    rows when the caller already built them (sheet_data_digest); otherwise they are built here.
+    """
+    if layout == "compact":
+        return generate_compact_attendance_pdf(employee_data, output_path, first_page_only=first_page_only, rows=rows)
+    if layout == "photos":
+        return generate_photo_attendance_pdf(employee_data, output_path, thumbnails or {}, first_page_only)
+    if layout != "standard":
+        raise ValueError(f"Unknown layout: {layout}")
+
+    c = canvas.Canvas(output_path, pagesize=A4)
+    width, height = A4
 
-    for record in attendance_records:
-        # Check if we need a new page
-        if y_position < (min_bottom_margin + row_height):
+    apply_static_defaults(employee_data)
+
+    if rows is None:
+        rows = sheet_rows(employee_data)
+
+    # Long sheets render their table pages in `pool` and replay the streams here
+    parallel = (row_streams is None and not first_page_only and pool is not None and len(rows) >= PARALLEL_MIN_ROWS
+                and rows_fit_segment_charset(rows))
+    if parallel or row_streams is not None:
+        prime_segment_font(c)
+
+    # Draw initial page
+    table_top = draw_header_and_details(c, employee_data)
+    pages, signature_on_new_page = paginate_standard(len(rows), table_top)
+    truncated = first_page_only and (len(pages) > 1 or signature_on_new_page)
+    if truncated:
+        pages = pages[:1]
+    tops = [table_top] + [height - 50] * (len(pages) - 1)
+    streams = render_standard_pages_parallel(rows, pages, tops, pool) if parallel else None
+
+    for index, ((start, stop), top) in enumerate(zip(pages, tops)):
+        if index > 0:
             c.showPage()
-            c.setFont("THSarabunNew", 16)
-            y_position = height - 50
-            # Draw headers on new page
-            y_position = draw_table_header(c, y_position, table_x, col_widths, headers, row_height)
-            c.setFont("THSarabunNew", 14)
-
-        row = [
-            record['date'],
-            record['regular_in'],
-            record['regular_out'],
-            record['ot_in'],
-            record['ot_out'],
-            record['duration_regular'],
-            record['duration_ot'],
-            record['signature']
-        ]
-
-        x_position = table_x
-        for i, value in enumerate(row):
-            c.rect(x_position, y_position - row_height, col_widths[i], row_height, stroke=1, fill=0)
-            c.drawString(x_position + 5, y_position - row_height + 8, clean_table_value(value))
-            x_position += col_widths[i]
+        if streams:
+            c.addLiteral(streams[index])
+        else:
+            draw_standard_table_page(c, rows[start:stop], top, row_streams and row_streams[start:stop])
 
-        y_position -= row_height
+    if truncated:
+        c.save()
+        return 1
+
+    y_position = tops[-1] - (stop - start + 1) * STANDARD_ROW_HEIGHT
 
     # Draw signatures only if there's enough space, otherwise create new page
-    if y_position < (min_bottom_margin + 60):  # 60 is the height needed for signatures
+    if signature_on_new_page:
         c.showPage()
         y_position = height - 50
 
     c.setFont("THSarabunNew", 16)
-    y_position -= 30
-    c.drawString(50, y_position, "ลงชื่อ: .................................................... ผู้ตรวจสอบ")
-    c.drawString(350, y_position, "วันที: ................../................../..................")
+    for signer, signed_date in SIGNATURE_LINES:
+        y_position -= 30
+        c.drawString(50, y_position, signer)
+        c.drawString(350, y_position, signed_date)
 
-    y_position -= 30
-    c.drawString(50, y_position, "ลงชื่อ: .................................................... ผู้รับรอง")
-    c.drawString(350, y_position, "วันที: ................../................../..................")
+    page_count = c.getPageNumber()
+    c.save()
+    return page_count
 
+def collect_shift_photos(all_shift):
+    """
+    {dd/mm/yyyy: (clock-in photo URL, clock-out photo URL)} per day, from the image_url_start and
+    image_url_end of the exported shifts. Regular shifts are preferred over overtime, like the
+    regular hour columns.
+    """
+    photos = {}
+    for day in all_shift or []:
+        if not isinstance(day, dict) or not day.get('date'):
+            continue
+        try:
+            formatted_date = datetime.strptime(day['date'], '%Y-%m-%d').strftime('%d/%m/%Y')
+        except ValueError:
+            continue
+
+        shifts = []
+        for shift_type in ['on-site', 'wfh', 'overtime']:
+            if isinstance(day.get(shift_type), list):
+                shifts.extend(s for s in day[shift_type] if isinstance(s, dict))
+        photo_in = next((s['image_url_start'] for s in shifts if s.get('image_url_start')), None)
+        photo_out = next((s['image_url_end'] for s in shifts if s.get('image_url_end')), None)
+        if photo_in or photo_out:
+            photos[formatted_date] = (photo_in, photo_out)
+    return photos
+
+def generate_photo_attendance_pdf(employee_data, output_path, thumbnails, first_page_only=False):
+    """
+    Standard sheet with each day's clock-in and clock-out thumbnails.
+    `thumbnails` maps photo URLs to local JPEG thumbnails (thumbnails.ThumbnailCache.fetch_all);
+    missing photos leave their cell empty. reportlab stores each distinct image once per file,
+    so a photo reused across rows is only embedded once.
+    """
+    c = canvas.Canvas(output_path, pagesize=A4)
+    width, height = A4
+    row_height = PHOTO_ROW_HEIGHT
+    header_height = STANDARD_ROW_HEIGHT
+    photo_width, photo_height = PHOTO_SIZE
+
+    apply_static_defaults(employee_data)
+    all_shift = employee_data.get('all_shift', []) if isinstance(employee_data, dict) else []
+    records = process_shift_data(all_shift)
+    photos = collect_shift_photos(all_shift)
+
+    table_top = draw_header_and_details(c, employee_data)
+    pages, signature_on_new_page = paginate_standard(len(records), table_top, row_height=row_height,
+                                                     header_height=header_height)
+    truncated = first_page_only and (len(pages) > 1 or signature_on_new_page)
+    if truncated:
+        pages = pages[:1]
+
+    for index, (start, stop) in enumerate(pages):
+        if index > 0:
+            c.showPage()
+        top = table_top if index == 0 else height - 50
+        c.setFont("THSarabunNew", 14)
+        y_position = draw_table_header(c, top, STANDARD_TABLE_X, PHOTO_COL_WIDTHS, PHOTO_TABLE_HEADERS, header_height)
+
+        for record in records[start:stop]:
+            row = record_to_row(record)
+            photo_paths = [thumbnails.get(url) if url else None for url in photos.get(record['date'], (None, None))]
+            values = row[:7] + photo_paths + row[7:]
+
+            x_position = STANDARD_TABLE_X
+            for i, value in enumerate(values):
+                col_width = PHOTO_COL_WIDTHS[i]
+                c.rect(x_position, y_position - row_height, col_width, row_height, stroke=1, fill=0)
+                if i in (7, 8):
+                    if value:
+                        c.drawImage(str(value), x_position + (col_width - photo_width) / 2,
+                                    y_position - row_height + (row_height - photo_height) / 2,
+                                    width=photo_width, height=photo_height, preserveAspectRatio=True, anchor='c')
+                else:
+                    c.drawString(x_position + 4, y_position - row_height + (row_height - 14) / 2 + 3,
+                                 clean_table_value(value))
+                x_position += col_width
+            y_position -= row_height
+
+    if truncated:
+        c.save()
+        return 1
+
+    if signature_on_new_page:
+        c.showPage()
+        y_position = height - 50
+
+    c.setFont("THSarabunNew", 16)
+    for signer, signed_date in SIGNATURE_LINES:
+        y_position -= 30
+        c.drawString(50, y_position, signer)
+        c.drawString(350, y_position, signed_date)
+
+    page_count = c.getPageNumber()
     c.save()
+    return page_count
+
+def compact_rows_per_column(layout=COMPACT_LAYOUT, first_page=False):
+    """Data rows that fit in one table column below the page header and the table header row"""
+    _, height = layout["pagesize"]
+    header = layout["first_page_header_height"] if first_page else layout["continuation_header_height"]
+    available = height - layout["margin_top"] - header - layout["margin_bottom"]
+    return max(1, int(available // layout["row_height"]) - 1)
+
+def paginate_compact(row_count, layout=COMPACT_LAYOUT):
+    """
+    Split `row_count` table rows into pages of side-by-side columns.
+    Returns (pages, signature) where each page is a list of (start, stop) row ranges, one per
+    used column, filled top to bottom and left to right, and signature is the
+    (page_index, column, rows_above) slot for the signature block: under the last column if it
+    fits, otherwise at the top of the next free column, otherwise on an extra page.
+    """
+    pages = []
+    start = 0
+    while True:
+        per_column = compact_rows_per_column(layout, first_page=not pages)
+        page = []
+        for _ in range(layout["columns"]):
+            stop = min(start + per_column, row_count)
+            page.append((start, stop))
+            start = stop
+            if start >= row_count:
+                break
+        pages.append(page)
+        if start >= row_count:
+            break
+
+    last_page = len(pages) - 1
+    per_column = compact_rows_per_column(layout, first_page=last_page == 0)
+    signature_rows = -(-layout["signature_height"] // layout["row_height"])
+    last_start, last_stop = pages[-1][-1]
+    used_rows = last_stop - last_start
+
+    if used_rows + signature_rows <= per_column:
+        # +1 for the table header row of that column
+        signature = (last_page, len(pages[-1]) - 1, used_rows + 1)
+    elif len(pages[-1]) < layout["columns"]:
+        signature = (last_page, len(pages[-1]), 0)
+    else:
+        pages.append([])
+        signature = (last_page + 1, 0, 0)
+
+    return pages, signature
+
+def generate_compact_attendance_pdf(employee_data, output_path, layout=COMPACT_LAYOUT, first_page_only=False,
+                                    rows=None):
+    """Attendance sheet in the compact layout (see COMPACT_LAYOUT)"""
+    width, height = layout["pagesize"]
+    c = canvas.Canvas(output_path, pagesize=layout["pagesize"])
+
+    apply_static_defaults(employee_data)
+
+    col_widths = layout["col_widths"]
+    row_height = layout["row_height"]
+    table_width = sum(col_widths)
+    text_offset = (row_height - layout["row_font_size"]) / 2 + 2
+
+    if rows is None:
+        rows = sheet_rows(employee_data)
+    pages, (signature_page, signature_column, signature_rows_above) = paginate_compact(len(rows), layout)
+    truncated = first_page_only and len(pages) > 1
+    if truncated:
+        pages = pages[:1]
+    details = employee_details(employee_data)
+    fonts = default_font_chain()
+
+    def draw_first_page_header():
+        top = height - layout["margin_top"]
+        c.setFont("THSarabunNew", 16)
+        c.drawCentredString(width / 2, top - 12, TITLE)
+        c.setFont("THSarabunNew", layout["header_font_size"])
+        fonts.draw_string(c, layout["margin_x"], top - 32, "    ".join(details[:4]), layout["header_font_size"])
+        fonts.draw_string(c, layout["margin_x"], top - 48, "    ".join(details[4:]), layout["header_font_size"])
+        return top - layout["first_page_header_height"]
+
+    def draw_continuation_header(page_number):
+        top = height - layout["margin_top"]
+        c.setFont("THSarabunNew", layout["header_font_size"])
+        fonts.draw_string(c, layout["margin_x"], top - 12, f"{TITLE}  {details[1]}  {details[0]}",
+                          layout["header_font_size"])
+        c.drawRightString(width - layout["margin_x"], top - 12, f"{page_number}/{len(pages)}")
+        return top - layout["continuation_header_height"]
+
+    def draw_row(x, y, values, font_size):
+        c.setFont("THSarabunNew", font_size)
+        for i, value in enumerate(values):
+            c.rect(x, y - row_height, col_widths[i], row_height, stroke=1, fill=0)
+            c.drawString(x + 3, y - row_height + text_offset, clean_table_value(value))
+            x += col_widths[i]
+        return y - row_height
+
+    for page_index, page in enumerate(pages):
+        if page_index > 0:
+            c.showPage()
+        table_top = draw_first_page_header() if page_index == 0 else draw_continuation_header(page_index + 1)
+
+        for column, (start, stop) in enumerate(page):
+            x = layout["margin_x"] + column * (table_width + layout["column_gap"])
+            y = draw_row(x, table_top, TABLE_HEADERS, layout["header_font_size"])
+            for values in rows[start:stop]:
+                y = draw_row(x, y, values, layout["row_font_size"])
+
+    if truncated:
+        c.save()
+        return 1
+
+    # Signature block goes into the slot chosen by paginate_compact, on the last page
+    x = layout["margin_x"] + signature_column * (table_width + layout["column_gap"]) + 10
+    y = table_top - signature_rows_above * row_height
+    c.setFont("THSarabunNew", layout["header_font_size"] + 1)
+    for signer, signed_date in SIGNATURE_LINES:
+        y -= 16
+        c.drawString(x, y, signer)
+        y -= 16
+        c.drawString(x, y, signed_date)
+
+    page_count = c.getPageNumber()
+    c.save()
+    return page_count
+
+def group_records_by_month(all_shift):
+    """Split all_shift by YYYY-MM and run each month through process_shift_data, months ascending"""
+    months = defaultdict(list)
+    for shift in all_shift or []:
+        if isinstance(shift, dict) and isinstance(shift.get('date'), str):
+            months[shift['date'][:7]].append(shift)
+    return [(month, process_shift_data(months[month])) for month in sorted(months)]
+
+# Everything recorded streams draw: title, table headers, dates, times and durations
+SEGMENT_CHARSET = "".join(sorted(set(TITLE + "".join(TABLE_HEADERS) + " 0123456789:/")))
+
+# Sheets with at least this many rows render their table pages in parallel when a pool is given
+PARALLEL_MIN_ROWS = 200
+PAGES_PER_TASK = 4
+
+def prime_segment_font(c):
+    """
+    Assign the THSarabunNew subset codes of SEGMENT_CHARSET before anything else is drawn.
+    Recorded page streams refer to glyphs by these codes, so every canvas that records or
+    replays them has to start with the same assignment.
+    """
+    font = pdfmetrics.getFont("THSarabunNew")
+    font.splitString(SEGMENT_CHARSET, c._doc)
+    font.getSubsetInternalName(0, c._doc)
+
+def rows_fit_segment_charset(rows):
+    """Whether table rows only use glyphs that recorded streams can refer to"""
+    return set("".join(clean_table_value(value) for row in rows for value in row)) <= set(SEGMENT_CHARSET)
+
+class PageRecorder(canvas.Canvas):
+    """Canvas that keeps the content stream of every finished page instead of writing a file"""
+    def __init__(self, pagesize=A4):
+        super().__init__(io.BytesIO(), pagesize=pagesize)
+        self.pages = []
+        prime_segment_font(self)
+        # Any glyph outside SEGMENT_CHARSET would get a code the replaying canvas doesn't know
+        pdfmetrics.getFont("THSarabunNew").state[self._doc].frozen = 1
+
+    def showPage(self):
+        self.pages.append("\n".join(self._code))
+        super().showPage()
+
+def render_row_streams(rows):
+    """
+    Content streams of standard layout table rows, each drawn with its top edge at y=0 so it can
+    be replayed at any height of any page, for segment_cache.SegmentCache
+    """
+    c = PageRecorder()
+    c.setFont("THSarabunNew", 14)
+    streams = []
+    for row in rows:
+        start = len(c._code)
+        draw_standard_row(c, row, 0)
+        streams.append("\n".join(c._code[start:]))
+    return streams
+
+def generate_segmented_attendance_pdf(employee_data, output_path, cache, layout="standard", rows=None):
+    """
+    Standard attendance sheet whose table rows come from per-month segments: each month's rows
+    are drawn once and cached as recorded streams, then the sheet is paginated across month
+    boundaries and its header, table headers and signatures are drawn exactly like
+    generate_attendance_pdf does. Only months whose rows changed since the last export get
+    drawn again.
+    """
+    if layout != "standard":
+        raise ValueError(f"Segmented rendering only supports the standard layout, not {layout}")
+
+    all_shift = employee_data.get('all_shift', []) if isinstance(employee_data, dict) else []
+    months = [(month, [record_to_row(record) for record in records])
+              for month, records in group_records_by_month(all_shift)]
+    month_rows = [row for _, month_rows in months for row in month_rows]
+    if rows is None:
+        rows = sheet_rows(employee_data)
+    if month_rows != rows or not rows_fit_segment_charset(month_rows):
+        return generate_attendance_pdf(employee_data, output_path, layout, rows=rows)
+
+    user_id = safe_get(employee_data, 'user_id')
+    row_streams = []
+    for month, month_rows in months:
+        row_streams.extend(cache.get_or_render(user_id, month, month_rows,
+                                               lambda month_rows=month_rows: render_row_streams(month_rows)))
+    return generate_attendance_pdf(employee_data, output_path, layout, row_streams=row_streams, rows=rows)
+
+def sheet_data_digest(employee_data, layout="standard", segmented=False, profile=DEFAULT_PROFILE, linearize=False):
+    """
+    (deterministic.sheet_digest, deterministic.content_digest, table rows) of a user's sheet.
+    Pass the rows on to the renderer so they aren't built a second time; they are not stored
+    in employee_data, which the caller may keep for the whole run.
+    """
+    apply_static_defaults(employee_data)
+    rows = sheet_rows(employee_data)
+    photos = collect_shift_photos(employee_data.get('all_shift')) if layout == "photos" else None
+    details = employee_details(employee_data)
+    digest = sheet_digest(layout, details, rows, photos, segmented, profile,
+                          LINEARIZE_MIN_PAGES if linearize else None)
+    return digest, content_digest(layout, details, rows, photos), rows
+
+def sheet_photo_urls(users):
+    """Every clock-in/clock-out photo URL of `users`, for thumbnails.ThumbnailCache.fetch_all"""
+    return [url for user_data in users if isinstance(user_data, dict)
+            for pair in collect_shift_photos(user_data.get('all_shift')).values() for url in pair]
+
+def render_sheet(user_data, index, output_directory, output_subdir, layout="standard", profile=DEFAULT_PROFILE,
+                 previous=None, segment_cache=None, pool=None, thumbnails=None, linearize=False):
+    """
+    Render one user's sheet into its shard of output_subdir and return its manifest entry.
+    The file is only renamed into place once finished (output_store.atomic_output). `previous`
+    maps user ids to the entries of an earlier deterministic run; a sheet whose digest is
+    unchanged keeps its file.
+    """
+    user_id = safe_get(user_data, 'user_id', f'user_{index}')
+    output_path = sheet_path(output_subdir, user_id)
+    name = safe_get(user_data, 'name', 'Unknown User')
+
+    started = time.perf_counter()
+    digest = content = None
+    try:
+        digest, content, rows = sheet_data_digest(user_data, layout, segment_cache is not None, profile, linearize)
+        previous_entry = (previous or {}).get(user_id)
+        if (reusable(previous_entry, digest, output_directory)
+                and previous_entry["path"] == output_path.relative_to(output_directory).as_posix()):
+            print(f"Unchanged PDF for {name} at {output_path}")
+            return dict(previous_entry, name=name, reused=True, content_digest=content,
+                        render_ms=round((time.perf_counter() - started) * 1000, 1))
+        with atomic_output(output_path, output_subdir) as tmp_path:
+            if segment_cache is not None:
+                page_count = generate_segmented_attendance_pdf(user_data, str(tmp_path), segment_cache, layout,
+                                                               rows=rows)
+            else:
+                page_count = generate_attendance_pdf(user_data, str(tmp_path), layout, pool, thumbnails, rows=rows)
+            if PROFILES[profile]["optimize"]:
+                optimize_pdf(tmp_path)
+            if linearize and page_count >= LINEARIZE_MIN_PAGES:
+                linearize_pdf(tmp_path)
+        entry = manifest_entry(user_id, name, output_path, output_directory,
+                               time.perf_counter() - started, pages=page_count, digest=digest,
+                               content_digest=content)
+        print(f"Generated PDF for {name} at {output_path}")
+    except Exception as e:
+        entry = manifest_entry(user_id, name, output_path, output_directory,
+                               time.perf_counter() - started, error=str(e), digest=digest, content_digest=content)
+        print(f"Error generating PDF for {name}: {str(e)}")
+    return entry
+
+def render_preview(user_data, index, preview_cache, layout="standard", thumbnails=None):
+    """First-page preview of one user's sheet through preview_cache (preview.PreviewCache)"""
+    user_id = safe_get(user_data, 'user_id', f'user_{index}')
+    name = safe_get(user_data, 'name', 'Unknown User')
+    started = time.perf_counter()
+
+    def render_first_page():
+        out = io.BytesIO()
+        generate_attendance_pdf(user_data, out, layout, thumbnails=thumbnails, first_page_only=True, rows=rows)
+        return out.getvalue()
+
+    digest = path = None
+    cached = False
+    try:
+        _, digest, rows = sheet_data_digest(user_data, layout)
+        path, cached = preview_cache.get(digest, render_first_page)
+        error = None
+        print(f"{'Cached' if cached else 'Generated'} preview for {name} at {path}")
+    except Exception as e:
+        error = str(e)
+        print(f"Error generating preview for {name}: {error}")
+    return {
+        "user_id": user_id,
+        "name": name,
+        "path": path.relative_to(preview_cache.cache_dir).as_posix() if path else None,
+        "digest": digest,
+        "cached": cached,
+        "render_ms": round((time.perf_counter() - started) * 1000, 1),
+        "status": "error" if error else "ok",
+        "error": error,
+    }
+
+def process_previews(json_data, input_filename, preview_cache, layout="standard", image_store=None,
+                     thumbnail_cache=None, progress=None):
+    """
+    First-page previews of every user instead of their PDFs. Keys are the content_digest the
+    sheets' manifest entries get with the same layout, whatever their profile; returns one
+    entry per user.
+    """
+    # The PDF only lives in memory until it is rasterized: skip compression
+    apply_output_profile("fast")
+    if progress is not None:
+        progress.emit("start", input=input_filename, layout=layout, preview=True,
+                      users=len(json_data) if isinstance(json_data, list) else None)
+
+    entries = []
+    thumbnails = None
+    for i, user_data in enumerate(json_data):
+        if not isinstance(user_data, dict):
+            print(f"Skipping invalid user data at index {i}")
+            continue
+        if layout == "photos":
+            thumbnails = thumbnail_cache.fetch_all(sheet_photo_urls([user_data]), image_store)
+        entries.append(render_preview(user_data, i, preview_cache, layout, thumbnails))
+        if progress is not None:
+            progress.emit("preview", index=i, **entries[-1])
+
+    if progress is not None:
+        errors = sum(1 for entry in entries if entry["status"] == "error")
+        progress.emit("done", ok=len(entries) - errors, errors=errors, cached=preview_cache.hits)
+    print(f"Preview cache: {preview_cache.hits} cached, {preview_cache.misses} rendered")
+    return entries
 
 def process_all_users(json_data, output_directory="attendance_sheets"):
     if not os.path.exists(output_directory):
@@ -241,63 +818,375 @@ def process_all_users(json_data, output_directory="attendance_sheets"):
         except Exception as e:
             print(f"Error generating PDF for {safe_get(user_data, 'name', 'Unknown User')}: {str(e)}")
 
-def process_all_users(json_data, output_directory, input_filename):
+def process_all_users(json_data, output_directory, input_filename, layout="standard", segment_cache=None,
+                      page_workers=1, manifest_sqlite=None, linearize=False, image_store=None,
+                      thumbnail_cache=None, progress=None, deterministic=False, profile=DEFAULT_PROFILE):
     """
     Process all users and generate PDFs
     Args:
         json_data: List of user data
         output_directory: Path object pointing to the output directory
         input_filename: Name of the input JSON file (without extension)
+        layout: Page layout, one of LAYOUTS
+        segment_cache: Optional segment_cache.SegmentCache; table rows are then replayed from per-month segments
+        page_workers: Processes rendering the table pages of long standard sheets in parallel
+        manifest_sqlite: Optional SQLite database to index the run in, next to manifest.json
+        linearize: Rewrite sheets of LINEARIZE_MIN_PAGES+ pages as linearized (fast web view) PDFs
+        image_store: Where the photos layout fetches shift photos from (thumbnails.open_image_store)
+        thumbnail_cache: thumbnails.ThumbnailCache for the photos layout
+        progress: Optional progress.ProgressWriter; gets a JSON event per finished sheet
+        deterministic: Byte-identical output for identical data; sheets whose digest matches the
+            previous manifest of this input are kept instead of rendered again
+        profile: Output profile, one of profiles.PROFILES (compression, qpdf optimization)
+    Returns the manifest written to <output_directory>/<input_filename>/manifest.json
     """
     # Create output directory with the same name as input file
     output_subdir = output_directory / input_filename
     output_subdir.mkdir(parents=True, exist_ok=True)
+    remove_stale_temporaries(output_subdir)
     
-    if not isinstance(json_data, list):
+    # A list, or an iterator of users such as external_sort.iter_user_exports for dumps bigger than RAM
+    if not isinstance(json_data, (list, Iterator)):
         print("Error: Input data must be a list")
         return
-        
-    for i, user_data in enumerate(json_data):
-        if not isinstance(user_data, dict):
-            print(f"Skipping invalid user data at index {i}")
-            continue
-            
-        user_id = safe_get(user_data, 'user_id', f'user_{i}')
-        filename = f"attendance_sheet_{user_id}.pdf"
-        output_path = str(output_subdir / filename)
-        
-        try:
-            generate_attendance_pdf(user_data, output_path)
-            print(f"Generated PDF for {safe_get(user_data, 'name', 'Unknown User')} at {output_path}")
-        except Exception as e:
-            print(f"Error generating PDF for {safe_get(user_data, 'name', 'Unknown User')}: {str(e)}")
+    streamed = not isinstance(json_data, list)
+    run_started = time.perf_counter()
+    apply_output_profile(profile)
+    previous = {}
+    if deterministic:
+        enable_deterministic_output()
+        previous = previous_entries(output_subdir / MANIFEST_FILENAME)
+    if progress is not None:
+        progress.emit("start", input=input_filename, layout=layout, profile=profile,
+                      users=None if streamed else len(json_data))
+
+    thumbnails = None
+    if layout == "photos":
+        from thumbnails import ThumbnailCache, open_image_store
+        image_store = image_store or open_image_store()
+        thumbnail_cache = thumbnail_cache or ThumbnailCache(SCRIPT_DIR / 'thumbnail_cache')
+        if not streamed:
+            # Fetch every photo of the run up front so the downloads overlap
+            thumbnails = thumbnail_cache.fetch_all(sheet_photo_urls(json_data), image_store)
+
+    entries = []
+    pool = ProcessPoolExecutor(page_workers) if page_workers > 1 else None
+    try:
+        for i, user_data in enumerate(json_data):
+            if not isinstance(user_data, dict):
+                print(f"Skipping invalid user data at index {i}")
+                continue
+
+            if layout == "photos" and streamed:
+                thumbnails = thumbnail_cache.fetch_all(sheet_photo_urls([user_data]), image_store)
+            entries.append(render_sheet(user_data, i, output_directory, output_subdir, layout, profile, previous,
+                                        segment_cache, pool, thumbnails, linearize))
+            if progress is not None:
+                progress.emit("sheet", index=i, **entries[-1])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    manifest = build_manifest(input_filename, layout, entries, deterministic, profile)
+    write_json_manifest(output_subdir / MANIFEST_FILENAME, manifest)
+    if manifest_sqlite:
+        write_sqlite_manifest(manifest_sqlite, input_filename, manifest)
+    if progress is not None:
+        errors = sum(1 for entry in entries if entry["status"] == "error")
+        progress.emit("done", ok=len(entries) - errors, errors=errors,
+                      manifest=f"{input_filename}/{MANIFEST_FILENAME}",
+                      elapsed_ms=round((time.perf_counter() - run_started) * 1000, 1))
+    return manifest
+
+# Per-process settings of batch workers, set by init_batch_worker
+BATCH_WORKER = {}
+
+def init_batch_worker(layout, profile, deterministic, linearize, segment_cache_dir, photo_store, thumbnail_cache_dir):
+    apply_output_profile(profile)
+    if deterministic:
+        enable_deterministic_output()
+    segment_cache = image_store = thumbnail_cache = None
+    if segment_cache_dir:
+        from segment_cache import SegmentCache
+        segment_cache = SegmentCache(segment_cache_dir)
+    if layout == "photos":
+        from thumbnails import ThumbnailCache, open_image_store
+        image_store = open_image_store(photo_store)
+        thumbnail_cache = ThumbnailCache(thumbnail_cache_dir)
+    BATCH_WORKER.update(layout=layout, profile=profile, linearize=linearize, segment_cache=segment_cache,
+                        image_store=image_store, thumbnail_cache=thumbnail_cache)
+
+def render_batch_sheet(user_data, index, output_directory, output_subdir, previous):
+    """Worker side of process_batch: render_sheet with the settings of init_batch_worker"""
+    worker = BATCH_WORKER
+    thumbnails = None
+    if worker["layout"] == "photos":
+        thumbnails = worker["thumbnail_cache"].fetch_all(sheet_photo_urls([user_data]), worker["image_store"])
+    return render_sheet(user_data, index, output_directory, output_subdir, worker["layout"], worker["profile"],
+                        previous, worker["segment_cache"], None, thumbnails, worker["linearize"])
+
+def process_batch(jobs, output_directory, layout="standard", profile=DEFAULT_PROFILE, workers=1,
+                  segment_cache_dir=None, manifest_sqlite=None, linearize=False, photo_store=None,
+                  thumbnail_cache_dir=SCRIPT_DIR / 'thumbnail_cache', progress=None, deterministic=False):
+    """
+    Render several inputs as one batch (see batch.py)
+    Args:
+        jobs: batch.BatchJob per input; `name` is the output directory, `users` its user data
+        output_directory: Path object pointing to the output directory
+        workers: Processes rendering sheets, shared by all jobs
+        segment_cache_dir: Directory of a segment_cache.SegmentCache shared by the workers
+        photo_store, thumbnail_cache_dir: Photos layout sources, as for main()
+        The other arguments are the same as for process_all_users, applied to every job.
+    Returns {job name: manifest}; each job's manifest is written as soon as its last sheet is done
+    """
+    from batch import FairScheduler
+
+    run_started = time.perf_counter()
+    previous = {}
+    for job in jobs:
+        (output_directory / job.name).mkdir(parents=True, exist_ok=True)
+        remove_stale_temporaries(output_directory / job.name)
+        previous[job.name] = previous_entries(output_directory / job.name / MANIFEST_FILENAME) if deterministic else {}
+        if progress is not None:
+            progress.emit("start", input=job.name, layout=layout, profile=profile, priority=job.priority,
+                          users=len(job.users) if isinstance(job.users, list) else None)
+
+    def valid_users(job_name, users):
+        for i, user_data in enumerate(users):
+            if not isinstance(user_data, dict):
+                print(f"Skipping invalid user data at index {i} of {job_name}")
+                continue
+            yield i, user_data
+
+    for job in jobs:
+        job.users = valid_users(job.name, job.users)
+    scheduler = FairScheduler(jobs)
+
+    manifests = {}
+    def finish(job):
+        job.finished = time.perf_counter()
+        entries = [entry for _, entry in sorted(job.entries, key=lambda pair: pair[0])]
+        manifest = manifests[job.name] = build_manifest(job.name, layout, entries, deterministic, profile)
+        write_json_manifest(output_directory / job.name / MANIFEST_FILENAME, manifest)
+        if manifest_sqlite:
+            write_sqlite_manifest(manifest_sqlite, job.name, manifest)
+        errors = sum(1 for entry in entries if entry["status"] == "error")
+        print(f"Finished {job.name}: {len(entries)} sheet(s), {errors} error(s), priority {job.priority}, "
+              f"after {job.finished - run_started:.1f}s")
+        if progress is not None:
+            progress.emit("done", input=job.name, ok=len(entries) - errors, errors=errors,
+                          manifest=f"{job.name}/{MANIFEST_FILENAME}",
+                          elapsed_ms=round((job.finished - run_started) * 1000, 1))
+
+    # A couple of sheets per worker in flight: enough to keep the pool busy, few enough that a
+    # newly scheduled job's users aren't queued behind a long backlog
+    max_in_flight = workers * 2
+    in_flight = {}
+    initargs = (layout, profile, deterministic, linearize, segment_cache_dir, photo_store, thumbnail_cache_dir)
+    with ProcessPoolExecutor(workers, initializer=init_batch_worker, initargs=initargs) as pool:
+        while True:
+            while len(in_flight) < max_in_flight:
+                scheduled = scheduler.next()
+                if scheduled is None:
+                    break
+                job, (index, user_data) = scheduled
+                user_id = safe_get(user_data, 'user_id', f'user_{index}')
+                user_previous = {user_id: previous[job.name][user_id]} if user_id in previous[job.name] else None
+                future = pool.submit(render_batch_sheet, user_data, index, output_directory,
+                                     output_directory / job.name, user_previous)
+                in_flight[future] = (job, index, user_id, safe_get(user_data, 'name', 'Unknown User'))
+                job.pending += 1
+            for job in jobs:
+                if job.done and job.finished is None:
+                    finish(job)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, index, user_id, name = in_flight.pop(future)
+                job.pending -= 1
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # The worker itself failed (e.g. was killed); render_sheet reports rendering errors
+                    output_path = sheet_path(output_directory / job.name, user_id)
+                    entry = manifest_entry(user_id, name, output_path, output_directory, 0, error=str(e))
+                job.entries.append((index, entry))
+                if progress is not None:
+                    progress.emit("sheet", input=job.name, index=index, **entry)
+
+    return manifests
+
+def load_users(input_path, args):
+    """User data of one input: export JSON, columnar export directory or (--time-records) an elasticdump"""
+    if args.time_records:
+        from external_sort import iter_user_exports
+        return iter_user_exports(input_path, start_date=args.start_date, end_date=args.end_date,
+                                 run_bytes=args.sort_buffer_mb * 1024 * 1024)
+    from batch import is_columnar_export
+
+    if is_columnar_export(input_path):
+        # Columnar export (export_columnar.py): memory-mapped, rows built from the columns
+        from export_columnar import ColumnarExport
+        return ColumnarExport(input_path).iter_users(
+            with_all_shift=args.layout == 'photos' or bool(args.segment_cache))
+    # Read and parse JSON file
+    with input_path.open('r', encoding='utf-8') as f:
+        return json.load(f)
 
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Generate PDF attendance sheets from JSON data')
-    parser.add_argument('input_path', help='Path to the input JSON file')
+    parser.add_argument('input_path', nargs='*',
+                        help='Path to the input JSON file, or a columnar export directory. Several inputs, or a '
+                             'spool directory of them (e.g. input/), are rendered as one batch')
+    parser.add_argument('--time-records', action='store_true',
+                        help='Input is a raw time_record elasticdump (NDJSON); group it out of core instead of '
+                             'reading an export JSON')
+    parser.add_argument('--sort-buffer-mb', type=int, default=64, metavar='MB',
+                        help='--time-records: size of each sorted run spilled to disk')
+    parser.add_argument('--start-date', default=None, help='--time-records: first date to include (YYYY-MM-DD)')
+    parser.add_argument('--end-date', default=None, help='--time-records: last date to include (YYYY-MM-DD)')
+    parser.add_argument('--layout', choices=LAYOUTS, default='standard',
+                        help='Page layout: standard (portrait, one table), compact (landscape, two columns) '
+                             'or photos (standard with clock-in/clock-out thumbnails)')
+    parser.add_argument('--segment-cache', nargs='?', const=str(SCRIPT_DIR / 'segment_cache'), default=None,
+                        metavar='DIR',
+                        help='Draw the table rows of each month once and replay cached month segments '
+                             '(standard layout only)')
+    parser.add_argument('--page-workers', type=int, default=1, metavar='N',
+                        help=f'Render the table pages of sheets with {PARALLEL_MIN_ROWS}+ rows in N processes '
+                             '(standard layout)')
+    parser.add_argument('--manifest-sqlite', nargs='?', const=str(SCRIPT_DIR / 'pdf' / 'manifest.sqlite'),
+                        default=None, metavar='DB',
+                        help='Also index the run in this SQLite database (manifest.json is always written)')
+    parser.add_argument('--linearize', action='store_true',
+                        help=f'Write sheets of {LINEARIZE_MIN_PAGES}+ pages as linearized (fast web view) PDFs '
+                             '(needs pikepdf or qpdf)')
+    parser.add_argument('--photo-store', default=None, metavar='DIR',
+                        help='Photos layout: read photos from this directory instead of fetching the URLs')
+    parser.add_argument('--thumbnail-cache', default=str(SCRIPT_DIR / 'thumbnail_cache'), metavar='DIR',
+                        help='Photos layout: content-addressed thumbnail cache')
+    parser.add_argument('--output-dir', default=str(SCRIPT_DIR / 'pdf'), metavar='DIR',
+                        help='Directory the export directories are written to')
+    parser.add_argument('--progress', default=None, metavar='TARGET',
+                        help='Write a JSON line per finished sheet to TARGET: "-" (stdout), "fd:N" or a file')
+    parser.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help='Output profile: fast (uncompressed), balanced or archive (qpdf-optimized, smallest); '
+                             'see profiles.py for measured render times and sizes')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='Byte-identical PDFs for identical data (fixed dates and document IDs); '
+                             'unchanged sheets of a re-run are kept')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, metavar='N',
+                        help='Batch mode: processes rendering the sheets of all inputs')
+    parser.add_argument('--priority', action='append', default=[], metavar='PATTERN=N',
+                        help='Batch mode: inputs whose stem matches the glob PATTERN get N turns per scheduling '
+                             'round instead of 1 (repeatable, first match wins)')
+    parser.add_argument('--retention-days', type=float, default=None, metavar='DAYS',
+                        help='After a run, delete export directories in pdf/ older than DAYS; see output_store.py')
+    parser.add_argument('--preview', action='store_true',
+                        help='Write a small first-page image per user into --preview-cache instead of PDFs; '
+                             'see preview.py')
+    parser.add_argument('--preview-cache', default=str(SCRIPT_DIR / 'preview_cache'), metavar='DIR',
+                        help='--preview: previews are kept here, keyed by the sheet content digest')
+    parser.add_argument('--preview-width', type=int, default=PREVIEW_WIDTH, metavar='PX',
+                        help='--preview: image width in pixels')
+    parser.add_argument('--preview-format', choices=PREVIEW_FORMATS, default='png',
+                        help='--preview: image format')
+    parser.add_argument('--watch', nargs='?', const=str(SCRIPT_DIR / 'input'), default=None, metavar='DIR',
+                        help='Keep running and render every export JSON written to DIR (default input/), moving it '
+                             'to processed/ or failed/ afterwards; see watch.py')
+    parser.add_argument('--settle', type=float, default=1.0, metavar='SECONDS',
+                        help='--watch: how long a file found by a rescan must be unmodified before it is read')
+    parser.add_argument('--keep-days', type=float, default=7, metavar='DAYS',
+                        help='--watch: delete processed/ and failed/ inputs older than this')
     args = parser.parse_args()
+    if not args.input_path and not args.watch:
+        parser.error('an input path or --watch is required')
+    if args.input_path and args.watch:
+        parser.error('--watch takes no input paths')
+    if args.preview and (args.watch or len(args.input_path) > 1):
+        parser.error('--preview takes a single input')
+    if args.preview and not preview_available():
+        parser.error('--preview needs pymupdf (pip install pymupdf)')
+    if args.segment_cache and args.layout != 'standard':
+        parser.error('--segment-cache only supports the standard layout')
+    # Previews are rasterized from memory: they are never linearized or optimized
+    if args.linearize and not args.preview and not linearize_available():
+        parser.error('--linearize needs pikepdf (pip install pikepdf) or the qpdf command')
+    if PROFILES[args.profile]["optimize"] and not args.preview and not optimize_available():
+        parser.error(f'--profile {args.profile} needs pikepdf (pip install pikepdf) or the qpdf command')
+
+    if args.watch:
+        run_watch(args, Path(args.output_dir))
+        return
 
     try:
-        # Convert input path to Path object and resolve it
-        input_path = Path(args.input_path).resolve()
-        
-        if not input_path.exists():
-            print(f"Error: Input file not found: {input_path}")
-            sys.exit(1)
+        # Convert input paths to Path objects and resolve them
+        input_paths = [Path(path).resolve() for path in args.input_path]
+
+        for input_path in input_paths:
+            if not input_path.exists():
+                print(f"Error: Input file not found: {input_path}")
+                sys.exit(1)
+
+        # Set up output directory, the 'pdf' folder next to the script unless --output-dir is given
+        output_dir = Path(args.output_dir)
+
+        from batch import is_columnar_export
+
+        if len(input_paths) > 1 or (input_paths[0].is_dir() and not is_columnar_export(input_paths[0])):
+            if args.preview:
+                parser.error('--preview takes a single input')
+            run_batch(args, parser, input_paths, output_dir)
+            return
+
+        input_path = input_paths[0]
 
         # Get input filename without extension for output directory
         input_filename = input_path.stem
 
-        # Read and parse JSON file
-        with input_path.open('r', encoding='utf-8') as f:
-            json_data = json.load(f)
-
-        # Set up output directory in the 'pdf' folder next to the script
-        output_dir = SCRIPT_DIR / 'pdf'
+        json_data = load_users(input_path, args)
         
+        image_store = thumbnail_cache = None
+        if args.layout == 'photos':
+            from thumbnails import ThumbnailCache, open_image_store
+            image_store = open_image_store(args.photo_store)
+            thumbnail_cache = ThumbnailCache(args.thumbnail_cache)
+
+        cache = None
+        if args.segment_cache:
+            from segment_cache import SegmentCache
+            cache = SegmentCache(args.segment_cache)
+
+        progress = None
+        if args.progress:
+            from progress import ProgressWriter
+            progress = ProgressWriter.open(args.progress)
+
+        if args.preview:
+            preview_cache = PreviewCache(args.preview_cache, args.preview_width, args.preview_format)
+            try:
+                process_previews(json_data, input_filename, preview_cache, args.layout, image_store,
+                                 thumbnail_cache, progress)
+            finally:
+                if progress is not None:
+                    progress.close()
+            return
+
         # Process the data
-        process_all_users(json_data, output_dir, input_filename)
+        try:
+            process_all_users(json_data, output_dir, input_filename, args.layout, cache, args.page_workers,
+                              args.manifest_sqlite, args.linearize, image_store, thumbnail_cache, progress,
+                              args.deterministic, args.profile)
+        finally:
+            if progress is not None:
+                progress.close()
+        if cache is not None:
+            print(f"Segment cache: {cache.hits} reused, {cache.misses} rendered")
+        if args.retention_days is not None:
+            prune_exports(output_dir, args.retention_days, {input_filename}, args.manifest_sqlite)
         
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON file: {e}")
@@ -306,6 +1195,82 @@ def main():
         print(f"An error occurred: {e}")
         sys.exit(1)
 
+def run_batch(args, parser, input_paths, output_dir):
+    """main() for several inputs or spool directories"""
+    from batch import BatchJob, is_columnar_export, parse_priority, priority_for, spool_inputs
+
+    if args.page_workers > 1:
+        parser.error('--page-workers can\'t be combined with batch mode; use --workers')
+    try:
+        priorities = [parse_priority(value) for value in args.priority]
+    except ValueError as e:
+        parser.error(f'--priority: {e}')
+
+    inputs = []
+    for input_path in input_paths:
+        if input_path.is_dir() and not is_columnar_export(input_path):
+            inputs.extend(spool_inputs(input_path))
+        else:
+            inputs.append(input_path)
+
+    jobs = []
+    for input_path in inputs:
+        try:
+            users = load_users(input_path, args)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {input_path}: {e}")
+            continue
+        jobs.append(BatchJob(input_path.stem, users, priority_for(input_path.stem, priorities)))
+    print(f"Batch of {len(jobs)} input(s) on {args.workers} worker(s)")
+
+    progress = None
+    if args.progress:
+        from progress import ProgressWriter
+        progress = ProgressWriter.open(args.progress)
+    try:
+        process_batch(jobs, output_dir, args.layout, args.profile, args.workers, args.segment_cache,
+                      args.manifest_sqlite, args.linearize, args.photo_store, args.thumbnail_cache, progress,
+                      args.deterministic)
+    finally:
+        if progress is not None:
+            progress.close()
+    if args.retention_days is not None:
+        prune_exports(output_dir, args.retention_days, {job.name for job in jobs}, args.manifest_sqlite)
+
+def run_watch(args, output_dir):
+    """main() for --watch: render each input landing in the watched directory in this process"""
+    from watch import WatchFolder
+
+    image_store = thumbnail_cache = cache = progress = None
+    if args.layout == 'photos':
+        from thumbnails import ThumbnailCache, open_image_store
+        image_store = open_image_store(args.photo_store)
+        thumbnail_cache = ThumbnailCache(args.thumbnail_cache)
+    if args.segment_cache:
+        from segment_cache import SegmentCache
+        cache = SegmentCache(args.segment_cache)
+    if args.progress:
+        from progress import ProgressWriter
+        progress = ProgressWriter.open(args.progress)
+
+    def handle(input_path):
+        manifest = process_all_users(load_users(input_path, args), output_dir, input_path.stem, args.layout, cache,
+                                     args.page_workers, args.manifest_sqlite, args.linearize, image_store,
+                                     thumbnail_cache, progress, args.deterministic, args.profile)
+        if manifest is None:
+            raise ValueError("Input data must be a list")
+        if args.retention_days is not None:
+            prune_exports(output_dir, args.retention_days, {input_path.stem}, args.manifest_sqlite)
+
+    try:
+        WatchFolder(Path(args.watch).resolve(), handle, settle=args.settle, keep_days=args.keep_days).run()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if progress is not None:
+            progress.close()
+
 if __name__ == "__main__":
     main()
 
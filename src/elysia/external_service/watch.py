@@ -0,0 +1,239 @@
+"""
+Watch-folder mode for to_pdf.py (--watch).
+
+exportPdfController writes input/export_list_*.json and used to spawn one to_pdf.py per file.
+A long-running `python to_pdf.py --watch` keeps fonts, the output profile and imports warm
+and renders the inputs one at a time as they arrive:
+
+    input/export_list_....json     waiting; picked up on inotify IN_CLOSE_WRITE / IN_MOVED_TO,
+                                   i.e. once the writer has closed it or renamed it into place
+    input/processing/<name>        claimed with an atomic rename, being rendered
+    input/processed/<name>         rendered; pdf/<stem>/manifest.json lists the sheets
+    input/failed/<name>            unreadable input or crashed render; <name>.error says why
+
+Recovery: on start, inputs left in processing/ by a crashed watcher are moved back to input/,
+and input/ is rescanned for files that arrived while no watcher was running. Files modified
+less than --settle seconds ago wait that long first, in case their writer is still busy.
+If the kernel's event queue overflows the directory is rescanned too. A lock on
+input/.watch.lock keeps a second watcher from stealing claimed files. Without inotify
+(non-Linux) the directory is polled every --settle seconds.
+
+processed/ and failed/ entries older than --keep-days are deleted, so input/ stops growing.
+SIGTERM / SIGINT stop the watcher after the input being rendered.
+"""
+from pathlib import Path
+import ctypes.util
+import ctypes
+import fcntl
+import signal
+import select
+import struct
+import time
+import os
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = os.O_CLOEXEC
+IN_NONBLOCK = os.O_NONBLOCK
+EVENT_HEADER = struct.Struct("iIII")
+
+LOCK_FILENAME = ".watch.lock"
+PRUNE_INTERVAL = 3600
+
+
+class StopWatching(Exception):
+    """Raised by the signal handler to leave a wait; never while an input is being rendered"""
+
+
+class Inotify:
+    """Minimal inotify(7) binding: close-write and moved-to events of one directory"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout):
+        """
+        Names of the files closed after writing or moved in within `timeout` seconds;
+        None when events were lost (queue overflow) and the directory has to be rescanned
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+def inotify_available():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        return hasattr(libc, "inotify_init1")
+    except OSError:
+        return False
+
+
+class WatchFolder:
+    def __init__(self, input_dir, handle, pattern="*.json", settle=1.0, keep_days=7):
+        """
+        `handle(path)` renders one claimed input (a path in processing/) and raises on failure.
+        `pattern` selects the input files in input_dir.
+        """
+        self.input_dir = Path(input_dir)
+        self.handle = handle
+        self.pattern = pattern
+        self.settle = settle
+        self.keep_seconds = keep_days * 86400
+        self.processing_dir = self.input_dir / "processing"
+        self.processed_dir = self.input_dir / "processed"
+        self.failed_dir = self.input_dir / "failed"
+        # name -> time it may be picked up
+        self.pending = {}
+        self.stopping = False
+        self.busy = False
+        self.last_prune = 0.0
+        self.processed = self.failed = 0
+
+    def wants(self, name):
+        return not name.startswith(".") and Path(name).match(self.pattern)
+
+    def recover(self):
+        """Put inputs a crashed watcher had claimed back into the input directory"""
+        for path in sorted(self.processing_dir.iterdir()):
+            print(f"Recovering {path.name} from an interrupted run")
+            os.replace(path, self.input_dir / path.name)
+
+    def scan(self):
+        now = time.time()
+        for path in self.input_dir.iterdir():
+            if path.is_file() and self.wants(path.name):
+                try:
+                    ready = path.stat().st_mtime + self.settle
+                except FileNotFoundError:
+                    continue
+                self.pending.setdefault(path.name, max(ready, now))
+
+    def prune(self):
+        """Delete processed/ and failed/ entries older than keep_days"""
+        cutoff = time.time() - self.keep_seconds
+        for directory in (self.processed_dir, self.failed_dir):
+            for path in directory.iterdir():
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                except FileNotFoundError:
+                    continue
+        self.last_prune = time.time()
+
+    def destination(self, directory, name):
+        """`name` in `directory`, suffixed with a timestamp when an earlier input had that name"""
+        path = directory / name
+        if path.exists():
+            path = directory / f"{Path(name).stem}.{time.strftime('%Y%m%d%H%M%S')}{Path(name).suffix}"
+        return path
+
+    def process(self, name):
+        source = self.input_dir / name
+        claimed = self.processing_dir / name
+        try:
+            os.replace(source, claimed)
+        except FileNotFoundError:
+            return
+        started = time.perf_counter()
+        try:
+            self.handle(claimed)
+        except Exception as e:
+            target = self.destination(self.failed_dir, name)
+            os.replace(claimed, target)
+            target.with_name(target.name + ".error").write_text(f"{type(e).__name__}: {e}\n", encoding="utf-8")
+            self.failed += 1
+            print(f"Failed {name} after {time.perf_counter() - started:.1f}s: {e}")
+            return
+        os.replace(claimed, self.destination(self.processed_dir, name))
+        self.processed += 1
+        print(f"Processed {name} in {time.perf_counter() - started:.1f}s")
+
+    def stop(self, *_):
+        self.stopping = True
+        if not self.busy:
+            raise StopWatching()
+
+    def run(self):
+        for directory in (self.processing_dir, self.processed_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        lock = open(self.input_dir / LOCK_FILENAME, "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise RuntimeError(f"Another watcher is already running on {self.input_dir}")
+
+        previous_handlers = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        # Watch before the first scan, so nothing that lands in between is missed
+        notifier = Inotify(self.input_dir) if inotify_available() else None
+        try:
+            self.recover()
+            self.scan()
+            print(f"Watching {self.input_dir} ({'inotify' if notifier else 'polling'}), "
+                  f"{len(self.pending)} input(s) waiting")
+            while not self.stopping:
+                if time.time() - self.last_prune >= PRUNE_INTERVAL:
+                    self.prune()
+
+                now = time.time()
+                ready = sorted((at, name) for name, at in self.pending.items() if at <= now)
+                if ready:
+                    name = ready[0][1]
+                    del self.pending[name]
+                    self.busy = True
+                    try:
+                        self.process(name)
+                    finally:
+                        self.busy = False
+                    continue
+
+                idle = self.settle if notifier is None else PRUNE_INTERVAL
+                timeout = max(0, min([at - now for at in self.pending.values()] + [idle]))
+                if notifier is None:
+                    time.sleep(timeout)
+                    self.scan()
+                    continue
+                names = notifier.read(timeout)
+                if names is None:
+                    self.scan()
+                    continue
+                for name in names:
+                    if self.wants(name) and (self.input_dir / name).is_file():
+                        # Closed or renamed into place: complete, no need to wait
+                        self.pending[name] = time.time()
+        except StopWatching:
+            pass
+        finally:
+            if notifier is not None:
+                notifier.close()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            lock.close()
+        print(f"Watcher stopped: {self.processed} processed, {self.failed} failed")
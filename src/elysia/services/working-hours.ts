@@ -313,7 +313,9 @@ export async function getWorkingHoursExporter(
                         duration: calculateDuration(shiftDetail.start_time.timestamp, shiftDetail.end_time!.timestamp) || "00:00",
                         duration_official: calculateDuration(shiftDetail.start_time.shift_time, shiftDetail.end_time!.shift_time) || "00:00",
                         reason: shiftDetail.reason || "No reason provided", // Added reason with fallback
-                        change_history: changeHistory
+                        change_history: changeHistory,
+                        image_url_start: shiftDetail.start_time.image_url,
+                        image_url_end: shiftDetail.end_time?.image_url
                     };
 
                     // Group by shift type
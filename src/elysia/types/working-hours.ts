@@ -87,6 +87,8 @@ export interface ExportedShiftDetail {
     duration_official: string;
     reason: string;
     change_history: string[];
+    image_url_start?: string;
+    image_url_end?: string;
 }
 
 export interface ExportedIncompleteShift {
@@ -0,0 +1,195 @@
+"""
+End-to-end export benchmark: time_record docs -> all_shift export JSON -> to_pdf.py.
+
+Loads testdata/es_dump/time_record.json (or a columnar fixture directory written
+by time_record_fixture.py), scales it by cloning users and shifting
+dates forward by whole fixture periods, then runs each phase of the real pipeline
+and reports where the time goes:
+
+    load       parse the elasticdump NDJSON / open the columnar fixture
+    scale      clone users/dates (benchmark setup, not part of the pipeline)
+    build      group by user/date and shape shifts (getWorkingHours + getWorkingHoursExporter)
+    serialize  JSON.stringify(exportData, null, 2) + write to input/
+    parse      json.load in to_pdf.py main()
+    render     process_all_users -> one PDF per user
+
+With --profiles the render phase runs for each output profile (profiles.py) on the same
+export and reports each one's time and total PDF size; only the first counts towards the
+pipeline total. Before anything is timed every profile renders one sheet untimed, so imports,
+font registration and optimizer start-up aren't charged to whichever profile comes first;
+render times are then the best of --repeat runs.
+
+Usage:
+    python bench_export.py --users 50 --periods 12
+    python bench_export.py --users 20 --profiles fast,balanced,archive --repeat 5
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import contextlib
+import argparse
+import tempfile
+import json
+import time
+import sys
+import io
+import os
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+EXTERNAL_SERVICE_DIR = SCRIPT_DIR.parent / "src" / "elysia" / "external_service"
+sys.path.insert(0, str(EXTERNAL_SERVICE_DIR))
+
+from export_builder import build_export  # noqa: E402
+from time_record_fixture import load_hits  # noqa: E402
+
+TIME_RECORD_DUMP = SCRIPT_DIR / "es_dump" / "time_record.json"
+
+
+def _shift_iso(iso_string, delta):
+    if not iso_string:
+        return iso_string
+    shifted = datetime.strptime(iso_string, "%Y-%m-%dT%H:%M:%S.%fZ") + delta
+    return shifted.strftime("%Y-%m-%dT%H:%M:%S.") + f"{shifted.microsecond // 1000:03d}Z"
+
+
+def _shift_time_info(info, delta):
+    if not info:
+        return info
+    shifted = dict(info)
+    shifted["shift_time"] = _shift_iso(info.get("shift_time"), delta)
+    shifted["timestamp"] = _shift_iso(info.get("timestamp"), delta)
+    return shifted
+
+
+def scale_hits(hits, users=1, periods=1):
+    """
+    Clone every user `users` times and repeat the fixture `periods` times, each period
+    shifted forward by the fixture's span of dates. change_log strings are kept as-is.
+    """
+    dates = sorted({hit["_source"]["date"] for hit in hits})
+    span = (datetime.strptime(dates[-1], "%Y-%m-%d") - datetime.strptime(dates[0], "%Y-%m-%d")).days + 1
+
+    scaled = []
+    for period in range(periods):
+        delta = timedelta(days=span * period)
+        shifted = []
+        for hit in hits:
+            source = dict(hit["_source"])
+            if period:
+                source["date"] = (datetime.strptime(source["date"], "%Y-%m-%d") + delta).strftime("%Y-%m-%d")
+                source["start_time"] = _shift_time_info(source.get("start_time"), delta)
+                source["end_time"] = _shift_time_info(source.get("end_time"), delta)
+            shifted.append((hit["_id"], source))
+
+        for clone in range(users):
+            for doc_id, source in shifted:
+                cloned = dict(source)
+                if clone:
+                    cloned["user_id"] = f"{source['user_id']}_c{clone}"
+                scaled.append({"_id": f"{doc_id}_p{period}_c{clone}", "_source": cloned})
+    return scaled
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name, pipeline=True):
+        started = time.perf_counter()
+        yield
+        self.record(name, time.perf_counter() - started, pipeline)
+
+    def record(self, name, seconds, pipeline=True):
+        self.phases.append((name, seconds, pipeline))
+
+    def report(self):
+        pipeline_total = sum(seconds for _, seconds, pipeline in self.phases if pipeline)
+        width = max(10, *(len(name) for name, _, _ in self.phases))
+        print(f"{'phase':<{width}} {'seconds':>9} {'share':>7}")
+        for name, seconds, pipeline in self.phases:
+            share = f"{seconds / pipeline_total * 100:6.1f}%" if pipeline and pipeline_total else "      -"
+            print(f"{name:<{width}} {seconds:9.3f} {share}")
+        print(f"{'pipeline':<{width}} {pipeline_total:9.3f}")
+
+
+def run_benchmark(users=1, periods=1, output_dir=None, render=True, input_path=TIME_RECORD_DUMP, profiles=None,
+                  repeat=1):
+    timer = PhaseTimer()
+
+    with timer.phase("load"):
+        hits = load_hits(input_path)
+
+    with timer.phase("scale", pipeline=False):
+        hits = scale_hits(hits, users, periods)
+
+    with timer.phase("build"):
+        export = build_export(hits)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(output_dir) if output_dir else Path(tmp)
+        input_dir = work_dir / "input"
+        input_dir.mkdir(parents=True, exist_ok=True)
+        export_path = input_dir / f"bench_export_{users}u_{periods}p.json"
+
+        with timer.phase("serialize"):
+            with export_path.open("w", encoding="utf-8") as f:
+                f.write(json.dumps(export, indent=2, ensure_ascii=False))
+
+        with timer.phase("parse"):
+            with export_path.open("r", encoding="utf-8") as f:
+                json_data = json.load(f)
+
+        pdf_sizes = []
+        if render:
+            import to_pdf
+
+            def render_export(users_data, output_name, profile):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    to_pdf.process_all_users(users_data, work_dir / "pdf", output_name,
+                                             profile=profile or to_pdf.DEFAULT_PROFILE)
+
+            for profile in profiles or [None]:
+                render_export(json_data[:1], f"warmup_{profile}", profile)
+
+            for index, profile in enumerate(profiles or [None]):
+                name = f"render/{profile}" if profile else "render"
+                output_name = f"{export_path.stem}_{profile}" if profile else export_path.stem
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    render_export(json_data, output_name, profile)
+                    seconds = time.perf_counter() - started
+                    best = seconds if best is None else min(best, seconds)
+                timer.record(name, best, pipeline=index == 0)
+                pdf_dir = work_dir / "pdf" / output_name
+                pdf_sizes.append((profile, sum(p.stat().st_size for p in pdf_dir.rglob("*.pdf"))))
+
+        shifts = sum(len(day.get(t, [])) for user in export for day in user["all_shift"] for t in ("on-site", "overtime"))
+        print(f"{len(export)} users, {len(hits)} docs, {shifts} exported shifts, "
+              f"input JSON {os.path.getsize(export_path) / 1024:.0f} KiB"
+              + "".join(f", PDFs{f' ({profile})' if profile else ''} {size / 1024:.0f} KiB"
+                        for profile, size in pdf_sizes))
+
+    timer.report()
+    return timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the export pipeline from es_dump to PDFs')
+    parser.add_argument('--users', type=int, default=10, help='Copies of each fixture user')
+    parser.add_argument('--periods', type=int, default=3, help='Copies of the fixture date range')
+    parser.add_argument('--input', default=str(TIME_RECORD_DUMP), help='time_record elasticdump file or fixture directory')
+    parser.add_argument('--output-dir', default=None, help='Keep the export JSON and PDFs here')
+    parser.add_argument('--no-render', action='store_true', help='Skip the PDF rendering phase')
+    parser.add_argument('--profiles', default=None,
+                        help='Comma-separated output profiles to render and compare, e.g. fast,balanced,archive')
+    parser.add_argument('--repeat', type=int, default=3, help='Render each profile N times and keep the best time')
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(",") if args.profiles else None
+    run_benchmark(args.users, args.periods, args.output_dir, render=not args.no_render, input_path=args.input,
+                  profiles=profiles, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Load driver for POST /api/export-pdf.
+
+exportPdfController does everything inside the request: Clerk users, getBulkLatestUserStatus,
+getWorkingHoursExporter per user, JSON written to external_service/input/ and a python
+to_pdf.py process it waits for. This script plays several managers exporting at once:
+
+    - each request picks a random set of user ids (--sizes users per request) and a random
+      date range (--range-days long, inside --from/--to)
+    - requests run at each level of --concurrency in turn, --requests per level
+    - a sampler thread records, every --sample-interval seconds, how many to_pdf.py
+      processes are running and the size and file count of input/ and pdf/
+
+Per level it reports latency percentiles, errors, the peak and mean number of to_pdf.py
+processes and how much input/ and pdf/ grew. Process counts come from /proc, so the driver
+has to run on the same host as the app (or use --stub). --out appends every sample as a
+JSON line.
+
+With --stub the stub server's export route is used, fed with testdata/es_dump/time_record.json
+cloned to --stub-users copies of each user; it spawns the real to_pdf.py with the controller's
+flags, writing input/ and pdf/ under a temporary directory instead of external_service/. The
+directory is removed at the end unless --keep-files is given.
+
+Usage:
+    python export_load.py --stub --concurrency 1,2,4 --requests 8 --sizes 1,5,20
+    python export_load.py --base-url http://localhost:3000/api --user-ids @managers_users.txt \\
+        --from 2025-01-01 --to 2025-03-31 --concurrency 1,4,8 --requests 20
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import threading
+import tempfile
+import argparse
+import random
+import json
+import time
+import sys
+import os
+
+from insert_test_shift import DEFAULT_USER_ID, create_session
+from soak_test import LatencyHistogram
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+EXTERNAL_SERVICE_DIR = SCRIPT_DIR.parent / "src" / "elysia" / "external_service"
+INPUT_DIR = EXTERNAL_SERVICE_DIR / "input"
+PDF_DIR = EXTERNAL_SERVICE_DIR / "pdf"
+TIME_RECORD_DUMP = SCRIPT_DIR / "es_dump" / "time_record.json"
+
+
+def count_processes(marker="to_pdf.py"):
+    """Number of running processes with `marker` in their command line"""
+    count = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if marker.encode() in f.read():
+                    count += 1
+        except OSError:
+            continue
+    return count
+
+
+def directory_usage(root):
+    """(bytes, files) under root"""
+    total = files = 0
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    continue
+    return total, files
+
+
+class Sampler:
+    """Background sampling of to_pdf.py processes and input/ + pdf/ usage"""
+
+    def __init__(self, interval=0.25, out=None, input_dir=INPUT_DIR, pdf_dir=PDF_DIR):
+        self.interval = interval
+        self.out = out
+        self.input_dir = input_dir
+        self.pdf_dir = pdf_dir
+        self.samples = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.level = None
+
+    def sample(self):
+        input_bytes, input_files = directory_usage(self.input_dir)
+        pdf_bytes, pdf_files = directory_usage(self.pdf_dir)
+        sample = {
+            "time": time.time(),
+            "level": self.level,
+            "processes": count_processes(),
+            "input_bytes": input_bytes,
+            "input_files": input_files,
+            "pdf_bytes": pdf_bytes,
+            "pdf_files": pdf_files,
+        }
+        with self.lock:
+            self.samples.append(sample)
+        if self.out:
+            self.out.write(json.dumps(sample) + "\n")
+        return sample
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="export-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def since(self, started):
+        with self.lock:
+            return [sample for sample in self.samples if sample["time"] >= started]
+
+
+class ExportLoad:
+    def __init__(self, base_url, user_ids, sizes, range_days, date_from, date_to, session, seed=None):
+        self.url = f"{base_url}/export-pdf"
+        self.user_ids = user_ids
+        self.sizes = sizes
+        self.range_days = range_days
+        self.date_from = date_from
+        self.date_to = date_to
+        self.session = session
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def next_body(self):
+        with self.lock:
+            size = min(self.rng.choice(self.sizes), len(self.user_ids))
+            user_ids = self.rng.sample(self.user_ids, size)
+            days = self.rng.choice(self.range_days)
+            latest_start = max(self.date_from, self.date_to - timedelta(days=days - 1))
+            start = self.date_from + timedelta(days=self.rng.randint(0, (latest_start - self.date_from).days))
+        end = min(start + timedelta(days=days - 1), self.date_to)
+        return {"user_ids": user_ids, "start_date": f"{start:%Y-%m-%d}", "end_date": f"{end:%Y-%m-%d}"}
+
+    def export_one(self, _):
+        body = self.next_body()
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=body, timeout=600)
+            status = response.status_code
+            if status == 200 and response.json().get("status") != "ok":
+                status = "failed"
+        except Exception as e:
+            status = type(e).__name__
+        return time.perf_counter() - started, status, len(body["user_ids"])
+
+    def run_level(self, concurrency, requests):
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="export") as executor:
+            return list(executor.map(self.export_one, range(requests)))
+
+
+def report_level(concurrency, results, elapsed, samples, baseline):
+    latency = LatencyHistogram()
+    errors = {}
+    for seconds, status, _ in results:
+        latency.record(seconds * 1000)
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+    processes = [sample["processes"] for sample in samples] or [0]
+    last = samples[-1] if samples else baseline
+    users = sum(size for _, _, size in results)
+    print(f"concurrency={concurrency}: {len(results)} requests ({users} users) in {elapsed:.1f}s, "
+          f"{len(results) / elapsed:.2f} req/s, errors={errors or 0}")
+    print(f"  latency ms {latency.summary()}")
+    print(f"  to_pdf.py processes: peak {max(processes)}, mean {sum(processes) / len(processes):.1f}")
+    print(f"  input/ +{(last['input_bytes'] - baseline['input_bytes']) / 1024:.0f} KB "
+          f"({last['input_files'] - baseline['input_files']:+d} files), "
+          f"pdf/ +{(last['pdf_bytes'] - baseline['pdf_bytes']) / 1024:.0f} KB "
+          f"({last['pdf_files'] - baseline['pdf_files']:+d} files)")
+
+
+def parse_int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def parse_user_ids(value):
+    if value.startswith("@"):
+        with open(value[1:], "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return [part for part in value.split(",") if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load driver for POST /api/export-pdf')
+    parser.add_argument('--base-url', default="http://localhost:3000/api", help='Base URL of the app API')
+    parser.add_argument('--manager-id', default=DEFAULT_USER_ID, help='User the dev session is opened for')
+    parser.add_argument('--user-ids', default=None, help='Comma-separated user ids, or @file with one per line')
+    parser.add_argument('--from', dest='date_from', default=None, help='Earliest start date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', default=None, help='Latest end date (YYYY-MM-DD)')
+    parser.add_argument('--sizes', type=parse_int_list, default=[1, 5, 20], help='Users per request, e.g. 1,5,20')
+    parser.add_argument('--range-days', type=parse_int_list, default=[7, 31], help='Date range lengths in days')
+    parser.add_argument('--concurrency', type=parse_int_list, default=[1, 2, 4], help='Concurrency levels')
+    parser.add_argument('--requests', type=int, default=8, help='Requests per concurrency level')
+    parser.add_argument('--sample-interval', type=float, default=0.25, help='Sampling interval in seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default=None, help='Append samples as JSON lines to this file')
+    parser.add_argument('--stub', action='store_true', help='Run against the in-process stub server')
+    parser.add_argument('--stub-users', type=int, default=20, help='Copies of each fixture user for --stub')
+    parser.add_argument('--keep-files', action='store_true', help='--stub: keep the temporary directory with the generated inputs and PDFs')
+    args = parser.parse_args()
+
+    def run(base_url, user_ids, date_from, date_to, input_dir=INPUT_DIR, pdf_dir=PDF_DIR):
+        session = create_session(pool_maxsize=max(args.concurrency), retries=0)
+        response = session.get(f"{base_url}/dev-session/{args.manager_id}")
+        if response.status_code != 200:
+            raise Exception(f"Failed to authenticate. Status code: {response.status_code}")
+
+        load = ExportLoad(base_url, user_ids, args.sizes, args.range_days,
+                          datetime.strptime(date_from, "%Y-%m-%d"), datetime.strptime(date_to, "%Y-%m-%d"),
+                          session, args.seed)
+        out = open(args.out, "a", encoding="utf-8") if args.out else None
+        sampler = Sampler(args.sample_interval, out, input_dir, pdf_dir)
+        print(f"{len(user_ids)} users, {date_from} to {date_to}")
+        sampler.start()
+        try:
+            for concurrency in args.concurrency:
+                sampler.level = concurrency
+                baseline = sampler.sample()
+                started = time.perf_counter()
+                results = load.run_level(concurrency, args.requests)
+                elapsed = time.perf_counter() - started
+                samples = sampler.since(baseline["time"]) + [sampler.sample()]
+                report_level(concurrency, results, elapsed, samples, baseline)
+        finally:
+            sampler.stop()
+            session.close()
+            if out:
+                out.close()
+
+    if args.stub:
+        sys.path.insert(0, str(EXTERNAL_SERVICE_DIR))
+        from export_builder import load_elasticdump
+        from bench_export import scale_hits
+        from stub_server import StubServer
+
+        hits = scale_hits(load_elasticdump(TIME_RECORD_DUMP), users=args.stub_users)
+        dates = sorted(hit["_source"]["date"] for hit in hits)
+        export_root = tempfile.mkdtemp(prefix="export-load-") if args.keep_files else None
+        with StubServer(export_root=export_root) as stub:
+            for hit in hits:
+                stub.store.put("time_record", hit["_id"], hit["_source"])
+            user_ids = args.user_ids and parse_user_ids(args.user_ids) or \
+                sorted({hit["_source"]["user_id"] for hit in hits})
+            run(stub.api_url, user_ids, args.date_from or dates[0], args.date_to or dates[-1],
+                stub.export_root / "input", stub.export_root / "pdf")
+            print("Stub stats:", stub.stats.snapshot())
+        if export_root:
+            print(f"Kept the generated inputs and PDFs in {export_root}")
+    else:
+        if not args.user_ids or not args.date_from or not args.date_to:
+            parser.error("--user-ids, --from and --to are required without --stub")
+        run(args.base_url, parse_user_ids(args.user_ids), args.date_from, args.date_to)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Vectorized geofence checks for clock-in/clock-out coordinates.
+
+Distances use the haversine formula on a sphere with geolib's earth radius
+(6378137 m), so they agree with the `getDistance` call in
+src/elysia/controllers/distance.ts to within a metre at branch-scale distances.
+
+Everything works on NumPy arrays: millions of (lat, lon) points are scored
+against every organization geofence in fixed-size chunks, without per-point
+Python loops.
+
+Usage:
+    python geofence.py                      # check the seeder's locations and the es_dump records
+    python geofence.py --radius 300 --records path/to/time_record.json
+"""
+from pathlib import Path
+import argparse
+import json
+import numpy as np
+
+EARTH_RADIUS_M = 6378137.0
+DEFAULT_RADIUS_M = 500.0
+
+# Upper bound on points x fences evaluated per chunk (~8 bytes each, a few temporaries)
+CHUNK_CELLS = 2_000_000
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+ORGANIZATION_DUMP = SCRIPT_DIR / "es_dump" / "organization.json"
+TIME_RECORD_DUMP = SCRIPT_DIR / "es_dump" / "time_record.json"
+
+
+class Geofences:
+    """Organization locations as parallel arrays (one entry per org)"""
+
+    def __init__(self, ids, names, lat, lon, codes=None):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.codes = list(codes) if codes is not None else [""] * len(self.ids)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.index = {org_id: i for i, org_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def indices_for(self, org_ids):
+        """Map org ids to fence indices (-1 for orgs without a location)"""
+        return np.fromiter((self.index.get(org_id, -1) for org_id in org_ids), dtype=np.int64, count=len(org_ids))
+
+
+def load_geofences(path=ORGANIZATION_DUMP):
+    """Load organization locations from an elasticdump NDJSON file"""
+    ids, names, codes, lat, lon = [], [], [], [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            source = json.loads(line).get("_source", {})
+            location = source.get("location")
+            if not location:
+                continue
+            ids.append(source.get("id", ""))
+            names.append(source.get("name", ""))
+            codes.append(source.get("code", ""))
+            lat.append(location["lat"])
+            lon.append(location["lon"])
+    return Geofences(ids, names, lat, lon, codes)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres; all arguments broadcast against each other"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    sin_dlat = np.sin((lat2 - lat1) * 0.5)
+    sin_dlon = np.sin((lon2 - lon1) * 0.5)
+    a = sin_dlat * sin_dlat + np.cos(lat1) * np.cos(lat2) * sin_dlon * sin_dlon
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_geofence(lats, lons, fences, chunk_cells=CHUNK_CELLS):
+    """
+    Find the closest fence for every point.
+    Returns (fence_index, distance_m) arrays with one entry per point.
+    """
+    lats = np.asarray(lats, dtype=np.float64).ravel()
+    lons = np.asarray(lons, dtype=np.float64).ravel()
+    n = lats.shape[0]
+    nearest = np.empty(n, dtype=np.int64)
+    distance = np.empty(n, dtype=np.float64)
+    if n == 0 or len(fences) == 0:
+        nearest.fill(-1)
+        distance.fill(np.inf)
+        return nearest, distance
+
+    # Precompute the fence-side terms once
+    fence_lat = np.radians(fences.lat)[None, :]
+    fence_lon = np.radians(fences.lon)[None, :]
+    cos_fence_lat = np.cos(fence_lat)
+
+    step = max(1, chunk_cells // len(fences))
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        lat = np.radians(lats[start:stop])[:, None]
+        lon = np.radians(lons[start:stop])[:, None]
+        sin_dlat = np.sin((fence_lat - lat) * 0.5)
+        sin_dlon = np.sin((fence_lon - lon) * 0.5)
+        a = sin_dlat * sin_dlat + np.cos(lat) * cos_fence_lat * sin_dlon * sin_dlon
+        # arcsin(sqrt(a)) is monotonic in a, so pick the minimum before converting to metres
+        idx = np.argmin(a, axis=1)
+        best = np.take_along_axis(a, idx[:, None], axis=1)[:, 0]
+        nearest[start:stop] = idx
+        distance[start:stop] = 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(best, 0.0, 1.0)))
+
+    return nearest, distance
+
+
+def distance_to_assigned(lats, lons, fence_indices, fences):
+    """
+    Distance from each point to its own organization's fence (what distance.ts checks).
+    Points whose fence index is -1 get +inf.
+    """
+    fence_indices = np.asarray(fence_indices, dtype=np.int64)
+    known = fence_indices >= 0
+    safe = np.where(known, fence_indices, 0)
+    distance = haversine(lats, lons, fences.lat[safe], fences.lon[safe]) if len(fences) else \
+        np.full(fence_indices.shape, np.inf)
+    return np.where(known, distance, np.inf)
+
+
+def classify(lats, lons, fences, radius_m=DEFAULT_RADIUS_M, fence_indices=None):
+    """
+    Score points against the fences.
+    With fence_indices, each point is checked against its own org; otherwise against the nearest fence.
+    Returns (inside, fence_index, distance_m).
+    """
+    if fence_indices is None:
+        fence_indices, distance = nearest_geofence(lats, lons, fences)
+    else:
+        fence_indices = np.asarray(fence_indices, dtype=np.int64)
+        distance = distance_to_assigned(lats, lons, fence_indices, fences)
+    return distance <= radius_m, fence_indices, distance
+
+
+def offset_points(lat, lon, distance_m, bearing_rad):
+    """Move points by distance_m along bearing_rad (vectorized destination-point formula)"""
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    angular = np.asarray(distance_m, dtype=np.float64) / EARTH_RADIUS_M
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angular) + np.cos(lat1) * np.sin(angular) * np.cos(bearing_rad))
+    lon2 = lon1 + np.arctan2(np.sin(bearing_rad) * np.sin(angular) * np.cos(lat1),
+                             np.cos(angular) - np.sin(lat1) * np.sin(lat2))
+    return np.degrees(lat2), np.degrees(lon2)
+
+
+def generate_fenced_locations(fences, count, inside_ratio=0.9, radius_m=DEFAULT_RADIUS_M,
+                              outside_max_m=20_000.0, fence_indices=None, rng=None):
+    """
+    Generate `count` points around the fences with a controlled in/out mix.
+    Inside points are uniform over the fence disk; outside points fall in the ring
+    (radius_m * 1.05, outside_max_m]. Returns (lat, lon, inside) arrays.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if fence_indices is None:
+        fence_indices = rng.integers(0, len(fences), size=count)
+    inside = rng.random(count) < inside_ratio
+
+    # sqrt of a uniform sample gives a uniform density over the disk area
+    inner = radius_m * np.sqrt(rng.random(count)) * 0.98
+    outer = rng.uniform(radius_m * 1.05, max(outside_max_m, radius_m * 1.1), size=count)
+    distance = np.where(inside, inner, outer)
+    bearing = rng.uniform(0.0, 2.0 * np.pi, size=count)
+
+    lat, lon = offset_points(fences.lat[fence_indices], fences.lon[fence_indices], distance, bearing)
+    return np.round(lat, 6), np.round(lon, 6), inside
+
+
+def generate_fenced_location_pairs(fences, count, inside_ratio=0.9, radius_m=DEFAULT_RADIUS_M,
+                                   org_id=None, seed=None):
+    """
+    Clock-in/clock-out pairs in the seeder's ((in_lat, in_lon), (out_lat, out_lon)) format.
+    Clock-out drifts up to ~50 m from clock-in, like generate_location_pairs in insert_test_shift.py.
+    """
+    rng = np.random.default_rng(seed)
+    fence_indices = None
+    if org_id is not None:
+        fence_indices = np.full(count, fences.index[org_id], dtype=np.int64)
+
+    in_lat, in_lon, _ = generate_fenced_locations(fences, count, inside_ratio, radius_m,
+                                                  fence_indices=fence_indices, rng=rng)
+    out_lat, out_lon = offset_points(in_lat, in_lon, rng.uniform(0, 50, size=count),
+                                     rng.uniform(0.0, 2.0 * np.pi, size=count))
+    out_lat, out_lon = np.round(out_lat, 6), np.round(out_lon, 6)
+
+    return [((float(a), float(b)), (float(c), float(d)))
+            for a, b, c, d in zip(in_lat, in_lon, out_lat, out_lon)]
+
+
+def load_time_record_locations(path=TIME_RECORD_DUMP):
+    """
+    Read clock-in/clock-out coordinates from a time_record elasticdump NDJSON file.
+    Returns a dict of arrays: doc_id, user_id, org_id, date, in_lat, in_lon, out_lat, out_lon
+    (missing clock-outs are NaN).
+    """
+    columns = {key: [] for key in ("doc_id", "user_id", "org_id", "date", "in_lat", "in_lon", "out_lat", "out_lon")}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            hit = json.loads(line)
+            source = hit.get("_source", {})
+            start = source.get("start_time") or {}
+            end = source.get("end_time") or {}
+            columns["doc_id"].append(hit.get("_id", ""))
+            columns["user_id"].append(source.get("user_id", ""))
+            columns["org_id"].append(source.get("org_id", ""))
+            columns["date"].append(source.get("date", ""))
+            columns["in_lat"].append(start.get("lat", np.nan))
+            columns["in_lon"].append(start.get("lon", np.nan))
+            columns["out_lat"].append(end.get("lat", np.nan))
+            columns["out_lon"].append(end.get("lon", np.nan))
+
+    for key in ("in_lat", "in_lon", "out_lat", "out_lon"):
+        columns[key] = np.asarray(columns[key], dtype=np.float64)
+    return columns
+
+
+def flag_offsite_clock_ins(records, fences, radius_m=DEFAULT_RADIUS_M):
+    """
+    Check each record's clock-in and clock-out against its own organization's fence.
+    Returns (in_distance, out_distance, offsite) where offsite is True when either end is
+    outside the radius (a missing clock-out does not count as off-site).
+    """
+    fence_indices = fences.indices_for(records["org_id"])
+    in_distance = distance_to_assigned(records["in_lat"], records["in_lon"], fence_indices, fences)
+    out_distance = distance_to_assigned(records["out_lat"], records["out_lon"], fence_indices, fences)
+    missing_out = np.isnan(records["out_lat"])
+    offsite = (in_distance > radius_m) | (~missing_out & (out_distance > radius_m))
+    return in_distance, np.where(missing_out, np.nan, out_distance), offsite
+
+
+def summarize_pairs(label, location_pairs, fences, radius_m):
+    pairs = np.asarray(location_pairs, dtype=np.float64).reshape(-1, 4)
+    lats = np.concatenate([pairs[:, 0], pairs[:, 2]])
+    lons = np.concatenate([pairs[:, 1], pairs[:, 3]])
+    inside, nearest, distance = classify(lats, lons, fences, radius_m)
+    print(f"{label}: {inside.sum()}/{inside.size} points within {radius_m:.0f} m of a branch "
+          f"(median distance to nearest branch {np.median(distance) / 1000:.1f} km)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check clock-in/clock-out locations against organization geofences')
+    parser.add_argument('--radius', type=float, default=DEFAULT_RADIUS_M, help='Geofence radius in metres')
+    parser.add_argument('--organizations', default=str(ORGANIZATION_DUMP), help='organization elasticdump file')
+    parser.add_argument('--records', default=str(TIME_RECORD_DUMP), help='time_record elasticdump file')
+    parser.add_argument('--show', type=int, default=10, help='Number of off-site records to list')
+    args = parser.parse_args()
+
+    fences = load_geofences(args.organizations)
+    print(f"Loaded {len(fences)} geofences")
+
+    from insert_test_shift import regular_location, ot_location
+    summarize_pairs("regular_location", regular_location, fences, args.radius)
+    summarize_pairs("ot_location", ot_location, fences, args.radius)
+
+    records = load_time_record_locations(args.records)
+    in_distance, out_distance, offsite = flag_offsite_clock_ins(records, fences, args.radius)
+    print(f"{Path(args.records).name}: {offsite.sum()}/{offsite.size} records off-site")
+    for i in np.flatnonzero(offsite)[:args.show]:
+        print(f"  {records['doc_id'][i]} {records['date'][i]} {records['user_id'][i]}: "
+              f"in {in_distance[i] / 1000:.2f} km, out {out_distance[i] / 1000:.2f} km")
+
+
+if __name__ == "__main__":
+    main()
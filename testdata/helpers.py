@@ -0,0 +1,60 @@
+"""
+Python ports of the time-record helpers in src/elysia/utils/helpers.ts, shared by the stub
+server and the correction engine (shift_corrections.py) so neither depends on the other.
+"""
+from datetime import datetime, timedelta, timezone
+import json
+
+
+def to_iso(dt):
+    """Format a datetime the way JavaScript's toISOString() does"""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def parse_iso(iso_string):
+    return datetime.strptime(iso_string, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+
+
+def convert_to_timezone(iso_string, offset_hours):
+    """Python port of convertToTimezone in src/elysia/utils/helpers.ts"""
+    return to_iso(parse_iso(iso_string) + timedelta(hours=offset_hours))
+
+
+def create_change_log_json(is_system, edit_reason, lat, lon, start_time_info, end_time_info=None, shift_reason="",
+                           current_time=None):
+    """
+    Python port of createChangeLogJSON in src/elysia/utils/helpers.ts.
+    current_time (UTC ISO string) defaults to now; pass it to backdate seeded edits.
+    """
+    current_time = current_time or to_iso(datetime.now(timezone.utc))
+    change_log = {
+        "is_system": str(is_system).lower(),
+        "timestamp": convert_to_timezone(current_time, 7),
+        "edit_reason": edit_reason or "",
+        "lat": lat,
+        "lon": lon,
+        "data": {
+            "shift_reason": shift_reason or "",
+            "start_time": {
+                "shift_time": start_time_info["shift_time"],
+                "timestamp": start_time_info["timestamp"],
+                "image_url": start_time_info["image_url"],
+                "lat": start_time_info["lat"],
+                "lon": start_time_info["lon"],
+            },
+            "end_time": {
+                "shift_time": end_time_info["shift_time"],
+                "timestamp": end_time_info["timestamp"],
+                "image_url": end_time_info["image_url"],
+                "lat": end_time_info["lat"],
+                "lon": end_time_info["lon"],
+            } if end_time_info else {
+                "shift_time": "",
+                "timestamp": "",
+                "image_url": "",
+                "lat": 0,
+                "lon": 0,
+            },
+        },
+    }
+    return json.dumps(change_log, separators=(",", ":"))
@@ -2,7 +2,11 @@ from datetime import datetime, timedelta
 import random
 from elasticsearch import Elasticsearch
 import requests
-from typing import List, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, Future
+import argparse
+from typing import Callable, Dict, List, Tuple, Optional
 
 
 def add_time_variation(base_time, is_clock_in=True):
@@ -361,13 +365,49 @@ correct_regular = [
 
 
 
+DEFAULT_USER_ID = "user_2riGJ090dbQNR41ccdBjkzvA3f6"
+
+
+def create_session(pool_maxsize: int = 2,
+                   retries: int = 3,
+                   backoff_factor: float = 0.1) -> requests.Session:
+    """
+    Create a keep-alive session that retries, with exponential backoff, only requests the
+    server never processed: connection errors and 429/503 answers. Clock-in POSTs are not
+    idempotent, so read timeouts and other 5xx answers (the document may already be written)
+    are never retried.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        other=0,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset(["GET", "POST", "PUT"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 class TimeRecordAPI:
-    def __init__(self, base_url: str = "http://localhost:3000/api"):
+    def __init__(self,
+                 base_url: str = "http://localhost:3000/api",
+                 user_id: str = DEFAULT_USER_ID,
+                 verbose: bool = True,
+                 session: Optional[requests.Session] = None):
         self.base_url = base_url
+        self.user_id = user_id
+        self.verbose = verbose
         self.clock_in_url = f"{base_url}/time-record-2/clock-in"
         self.clock_out_url = f"{base_url}/time-record-2/clock-out"
-        self.auth_url = f"{base_url}/dev-session/user_2riGJ090dbQNR41ccdBjkzvA3f6"
-        self.session = requests.Session()
+        self.auth_url = f"{base_url}/dev-session/{user_id}"
+        self.session = session or requests.Session()
         self._setup_auth()
         
     def _setup_auth(self):
@@ -381,7 +421,8 @@ class TimeRecordAPI:
                 raise Exception(f"Failed to authenticate. Status code: {response.status_code}")
             
             # Debug: Print cookies to verify
-            print("Cookies after auth:", self.session.cookies.get_dict())
+            if self.verbose:
+                print("Cookies after auth:", self.session.cookies.get_dict())
             
         except Exception as e:
             raise Exception(f"Authentication failed: {str(e)}")
@@ -391,7 +432,8 @@ class TimeRecordAPI:
                 shift_time: str,
                 lat: float,
                 lon: float,
-                reason: Optional[str] = None) -> str:
+                reason: Optional[str] = None,
+                image_url: str = "https://storage.example.com/clock-in-sample.jpg") -> str:
         """
         Send clock-in request to the API
         Returns: document_id on success, raises Exception on failure
@@ -399,7 +441,7 @@ class TimeRecordAPI:
         payload = {
             "shift_type": shift_type,
             "shift_time": shift_time,
-            "image_url": "https://storage.example.com/clock-in-sample.jpg",
+            "image_url": image_url,
             "lat": lat,
             "lon": lon
         }
@@ -408,9 +450,10 @@ class TimeRecordAPI:
             payload["reason"] = reason
 
         # Debug: Print request details
-        print(f"\nMaking clock-in request to {self.clock_in_url}")
-        print("Cookies being sent:", self.session.cookies.get_dict())
-        print("Payload:", payload)
+        if self.verbose:
+            print(f"\nMaking clock-in request to {self.clock_in_url}")
+            print("Cookies being sent:", self.session.cookies.get_dict())
+            print("Payload:", payload)
 
         response = self.session.post(
             self.clock_in_url, 
@@ -419,8 +462,9 @@ class TimeRecordAPI:
         )
 
         # Debug: Print response details
-        print(f"Response status code: {response.status_code}")
-        print(f"Response body: {response.text}")
+        if self.verbose:
+            print(f"Response status code: {response.status_code}")
+            print(f"Response body: {response.text}")
 
         if response.status_code != 200:
             raise Exception(f"Clock-in failed with status {response.status_code}: {response.text}")
@@ -435,7 +479,8 @@ class TimeRecordAPI:
                  doc_id: str,
                  shift_time: str,
                  lat: float,
-                 lon: float) -> str:
+                 lon: float,
+                 image_url: str = "https://storage.example.com/clock-out-sample.jpg") -> str:
         """
         Send clock-out request to the API
         Returns: document_id on success, raises Exception on failure
@@ -443,15 +488,16 @@ class TimeRecordAPI:
         payload = {
             "doc_id": doc_id,
             "shift_time": shift_time,
-            "image_url": "https://storage.example.com/clock-out-sample.jpg",
+            "image_url": image_url,
             "lat": lat,
             "lon": lon
         }
 
         # Debug: Print request details
-        print(f"\nMaking clock-out request to {self.clock_out_url}")
-        print("Cookies being sent:", self.session.cookies.get_dict())
-        print("Payload:", payload)
+        if self.verbose:
+            print(f"\nMaking clock-out request to {self.clock_out_url}")
+            print("Cookies being sent:", self.session.cookies.get_dict())
+            print("Payload:", payload)
 
         response = self.session.post(
             self.clock_out_url, 
@@ -460,8 +506,9 @@ class TimeRecordAPI:
         )
 
         # Debug: Print response details
-        print(f"Response status code: {response.status_code}")
-        print(f"Response body: {response.text}")
+        if self.verbose:
+            print(f"Response status code: {response.status_code}")
+            print(f"Response body: {response.text}")
 
         if response.status_code != 200:
             raise Exception(f"Clock-out failed with status {response.status_code}: {response.text}")
@@ -472,16 +519,80 @@ class TimeRecordAPI:
         else:
             raise Exception(f"Clock-out failed: {data.get('message', 'Unknown error')}")
 
+class SessionPool:
+    """
+    One authenticated TimeRecordAPI per simulated user, sharing a thread-pool dispatcher.
+    Sessions are authenticated concurrently once and then reused, so every call goes out
+    on an already-open keep-alive connection with the user's auth cookie.
+    """
+
+    def __init__(self,
+                 user_ids: List[str],
+                 base_url: str = "http://localhost:3000/api",
+                 max_workers: int = 32,
+                 retries: int = 3,
+                 backoff_factor: float = 0.1,
+                 verbose: bool = False):
+        self.base_url = base_url
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-pool")
+        self.apis: Dict[str, TimeRecordAPI] = {}
+
+        def authenticate(user_id: str) -> TimeRecordAPI:
+            return TimeRecordAPI(
+                base_url=base_url,
+                user_id=user_id,
+                verbose=verbose,
+                session=create_session(retries=retries, backoff_factor=backoff_factor)
+            )
+
+        futures = {user_id: self.executor.submit(authenticate, user_id) for user_id in dict.fromkeys(user_ids)}
+        failed = []
+        for user_id, future in futures.items():
+            try:
+                self.apis[user_id] = future.result()
+            except Exception as e:
+                failed.append(f"{user_id}: {e}")
+
+        if failed:
+            self.close()
+            raise Exception(f"Failed to authenticate {len(failed)} user(s): {'; '.join(failed[:5])}")
+
+    @property
+    def user_ids(self) -> List[str]:
+        return list(self.apis)
+
+    def submit(self, user_id: str, fn: Callable[[TimeRecordAPI], object]) -> Future:
+        """Run fn(api) for the given user on the dispatcher"""
+        return self.executor.submit(fn, self.apis[user_id])
+
+    def map_users(self, fn: Callable[[TimeRecordAPI], object]) -> Dict[str, object]:
+        """Run fn(api) for every user concurrently and collect the results by user_id"""
+        futures = {user_id: self.submit(user_id, fn) for user_id in self.apis}
+        return {user_id: future.result() for user_id, future in futures.items()}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for api in self.apis.values():
+            api.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 def process_time_records(
     location_pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]],
     shift_reasons: List[str],
     shifts: List[Tuple[Tuple[str, str], Tuple[str, str]]],
-    shift_type: str
+    shift_type: str,
+    api: Optional[TimeRecordAPI] = None
 ) -> List[Tuple[str, str, str]]:
     """
     Process time records for multiple shifts and return modified timestamps
     """
-    api = TimeRecordAPI()
+    api = api or TimeRecordAPI()
     edit_regular_timestamp = []
 
     for (locations, reason, shift) in zip(location_pairs, shift_reasons, shifts):
@@ -516,16 +627,37 @@ def process_time_records(
     return edit_regular_timestamp
 
 
-def update_shift_timestamps(timestamp_updates: List[Tuple[str, str, str]]):
+def process_time_records_for_users(
+    pool: SessionPool,
+    location_pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]],
+    shift_reasons: List[str],
+    shifts: List[Tuple[Tuple[str, str], Tuple[str, str]]],
+    shift_type: str
+) -> Dict[str, List[Tuple[str, str, str]]]:
+    """
+    Run the same shift schedule for every user in the pool concurrently.
+    Returns {user_id: [(doc_id, actual_in, actual_out), ...]}
+    """
+    return pool.map_users(lambda api: process_time_records(
+        location_pairs=location_pairs,
+        shift_reasons=shift_reasons,
+        shifts=shifts,
+        shift_type=shift_type,
+        api=api
+    ))
+
+
+def update_shift_timestamps(timestamp_updates: List[Tuple[str, str, str]], es_url: str = "http://localhost:9200"):
     """
     Update start_time.timestamp and end_time.timestamp for documents in the time_record index.
     
     Args:
         timestamp_updates: List of tuples containing (document_id, start_timestamp, end_timestamp)
                          Timestamps should be in ISO format with milliseconds (e.g., "2025-02-01T08:00:00.123Z")
+        es_url: Elasticsearch URL
     """
     # Initialize Elasticsearch client
-    es = Elasticsearch(["http://localhost:9200"])
+    es = Elasticsearch([es_url])
     
     # Process each update
     for doc_id, start_timestamp, end_timestamp in timestamp_updates:
@@ -563,19 +695,131 @@ def update_shift_timestamps(timestamp_updates: List[Tuple[str, str, str]]):
 
 
 
-results_regular = process_time_records(
-    location_pairs=regular_location,
-    shift_reasons=regular_reasons,
-    shifts=regular_shifts,
-    shift_type='on-site'
-)
+def fenced_locations(inside_ratio: float,
+                     radius_m: float,
+                     org_id: str = "org_2riGCGwJV4T5JwxLOFajkNqc03U",
+                     seed: Optional[int] = None):
+    """
+    Replacement for regular_location/ot_location placed around the org's geofence,
+    with `inside_ratio` of clock-ins inside `radius_m` and the rest off-site.
+    """
+    from geofence import load_geofences, generate_fenced_location_pairs
+    fences = load_geofences()
+    regular = generate_fenced_location_pairs(fences, len(regular_shifts), inside_ratio, radius_m, org_id, seed)
+    ot = generate_fenced_location_pairs(fences, len(ot_shifts), inside_ratio, radius_m, org_id,
+                                        None if seed is None else seed + 1)
+    return regular, ot
+
+
+def seed_users(user_ids: List[str],
+               base_url: str = "http://localhost:3000/api",
+               es_url: str = "http://localhost:9200",
+               max_workers: int = 32,
+               locations: Optional[Tuple[list, list]] = None) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+    """
+    Seed the regular and OT shifts for many users at once through a SessionPool.
+    Returns the combined (doc_id, actual_in, actual_out) lists for regular and OT shifts.
+    """
+    regular_locations, ot_locations = locations or (regular_location, ot_location)
+
+    with SessionPool(user_ids, base_url=base_url, max_workers=max_workers) as pool:
+        regular_by_user = process_time_records_for_users(
+            pool, regular_locations, regular_reasons, regular_shifts, 'on-site'
+        )
+        ot_by_user = process_time_records_for_users(
+            pool, ot_locations, ot_reasons, ot_shifts, 'overtime'
+        )
+
+    results_regular = [result for results in regular_by_user.values() for result in results]
+    results_ot = [result for results in ot_by_user.values() for result in results]
+
+    update_shift_timestamps(results_regular, es_url=es_url)
+    update_shift_timestamps(results_ot, es_url=es_url)
+
+    return results_regular, results_ot
+
+
+def seed(base_url: str = "http://localhost:3000/api",
+         es_url: str = "http://localhost:9200",
+         verbose: bool = True,
+         locations: Optional[Tuple[list, list]] = None) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+    """
+    Clock in/out the regular and OT shifts, then backdate their actual timestamps in Elasticsearch.
+    Returns the (doc_id, actual_in, actual_out) lists for regular and OT shifts.
+    """
+    api = TimeRecordAPI(base_url=base_url, verbose=verbose)
+    regular_locations, ot_locations = locations or (regular_location, ot_location)
+
+    results_regular = process_time_records(
+        location_pairs=regular_locations,
+        shift_reasons=regular_reasons,
+        shifts=regular_shifts,
+        shift_type='on-site',
+        api=api
+    )
+
+    results_ot = process_time_records(
+        location_pairs=ot_locations,
+        shift_reasons=ot_reasons,
+        shifts=ot_shifts,
+        shift_type='overtime',
+        api=api
+    )
+
+    update_shift_timestamps(results_regular, es_url=es_url)
+    update_shift_timestamps(results_ot, es_url=es_url)
+
+    return results_regular, results_ot
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed test shifts through the time-record API')
+    parser.add_argument('--base-url', default="http://localhost:3000/api", help='Base URL of the app API')
+    parser.add_argument('--es-url', default="http://localhost:9200", help='Elasticsearch URL')
+    parser.add_argument('--stub', action='store_true',
+                        help='Run against an in-process stub server instead of the real services')
+    parser.add_argument('--quiet', action='store_true', help='Suppress per-request debug output')
+    parser.add_argument('--users', type=int, default=0,
+                        help='Seed this many simulated users concurrently instead of the single dev user')
+    parser.add_argument('--workers', type=int, default=32, help='Dispatcher threads for --users')
+    parser.add_argument('--inside-ratio', type=float, default=None,
+                        help='Generate locations around the branch geofence with this fraction inside it')
+    parser.add_argument('--radius', type=float, default=500.0, help='Geofence radius in metres for --inside-ratio')
+    parser.add_argument('--apply-corrections', action='store_true',
+                        help='Apply the correct_ot/correct_regular edits after seeding (single-user mode)')
+    args = parser.parse_args()
+    if args.apply_corrections and args.users:
+        parser.error('--apply-corrections only works in single-user mode: the edits target the dev user\'s '
+                     'seeded shifts, not --users')
+
+    locations = None
+    if args.inside_ratio is not None:
+        locations = fenced_locations(args.inside_ratio, args.radius)
+
+    def run(base_url, es_url):
+        if args.users:
+            user_ids = [f"user_load_{i:05d}" for i in range(args.users)]
+            seed_users(user_ids, base_url, es_url, max_workers=args.workers, locations=locations)
+        else:
+            results_regular, results_ot = seed(base_url, es_url, verbose=not args.quiet, locations=locations)
+            if args.apply_corrections:
+                from shift_corrections import apply_corrections, seeded_corrections
+                es = Elasticsearch([es_url])
+                updated, rejected, failed = apply_corrections(es, seeded_corrections(results_regular, results_ot))
+                print(f"Applied corrections to {updated} documents, {len(rejected)} corrections rejected, "
+                      f"{len(failed)} documents failed")
+                es.close()
+
+    if args.stub:
+        from stub_server import StubServer
+        with StubServer() as stub:
+            from shift_corrections import register_stub_script
+            register_stub_script(stub.store)
+            run(stub.api_url, stub.es_url)
+            print("Stub stats:", stub.stats.snapshot())
+    else:
+        run(args.base_url, args.es_url)
 
-results_ot = process_time_records(
-    location_pairs=ot_location,
-    shift_reasons=ot_reasons,
-    shifts=ot_shifts,
-    shift_type='overtime'
-)
 
-update_shift_timestamps(results_regular)
-update_shift_timestamps(results_ot)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
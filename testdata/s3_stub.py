@@ -0,0 +1,201 @@
+"""
+Local stand-in for the S3-compatible bucket behind uploads.stamford.dev (seaweedfs in
+docker-compose), so photo fetches and uploads can be exercised without network.
+
+Objects live under a directory, path-style like the real endpoint:
+
+    GET  /<bucket>/<key>    -> <root>/<bucket>/<key>
+    HEAD /<bucket>/<key>
+    PUT  /<bucket>/<key>    (plain or presigned; signatures are not checked)
+
+Usage:
+    with S3Stub(root="/tmp/s3", latency=0.02) as s3:
+        url = s3.object_url("tokbud", "time-record/abc")
+        ...
+
+or standalone:
+    python s3_stub.py --root /tmp/s3 --port 8333 --seed-images
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+from pathlib import Path
+import threading
+import argparse
+import hashlib
+import shutil
+import time
+import os
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+IMAGES_DIR = SCRIPT_DIR / "images"
+CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".gif": "image/gif"}
+
+
+class S3StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gets = 0
+        self.puts = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.not_found = 0
+
+    def record(self, method, size=0, found=True):
+        with self.lock:
+            if not found:
+                self.not_found += 1
+            elif method == "PUT":
+                self.puts += 1
+                self.bytes_in += size
+            else:
+                self.gets += 1
+                self.bytes_out += size
+
+    def snapshot(self):
+        with self.lock:
+            return {"gets": self.gets, "puts": self.puts, "bytes_in": self.bytes_in,
+                    "bytes_out": self.bytes_out, "not_found": self.not_found}
+
+
+class S3StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TokbudS3Stub/1.0"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def object_path(self):
+        key = unquote(urlsplit(self.path).path).lstrip("/")
+        path = (self.server.root / key).resolve()
+        if not key or self.server.root not in path.parents:
+            return None
+        return path
+
+    def send_error_xml(self, status, code):
+        body = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code></Error>".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = self.object_path()
+        if path is None or not path.is_file():
+            self.server.stats.record(self.command, found=False)
+            self.send_error_xml(404, "NoSuchKey")
+            return
+        data = path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES.get(path.suffix.lower(), "application/octet-stream"))
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", f"\"{hashlib.md5(data).hexdigest()}\"")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+            self.server.stats.record(self.command, len(data))
+
+    do_HEAD = do_GET
+
+    def do_PUT(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        path = self.object_path()
+        if path is None:
+            self.send_error_xml(400, "InvalidURI")
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.server.stats.record("PUT", len(data))
+        self.send_response(200)
+        self.send_header("ETag", f"\"{hashlib.md5(data).hexdigest()}\"")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class S3StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+class S3Stub:
+    def __init__(self, root, host="127.0.0.1", port=0, latency=0.0, verbose=False):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.stats = S3StubStats()
+        self.httpd = S3StubHTTPServer((host, port), S3StubHandler)
+        self.httpd.root = self.root
+        self.httpd.latency = latency
+        self.httpd.verbose = verbose
+        self.httpd.stats = self.stats
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def object_url(self, bucket, key):
+        return f"{self.url}/{bucket}/{key}"
+
+    def put_file(self, bucket, key, source):
+        """Place an object directly on disk (no HTTP round trip)"""
+        path = self.root / bucket / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, path)
+        return self.object_url(bucket, key)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="s3-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a directory as a path-style S3 bucket endpoint')
+    parser.add_argument('--root', required=True, help='Directory holding <bucket>/<key> objects')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8333)
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay per request in seconds')
+    parser.add_argument('--seed-images', action='store_true',
+                        help='Copy testdata/images into tokbud/time-record/ before serving')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    stub = S3Stub(args.root, args.host, args.port, args.latency, args.verbose)
+    if args.seed_images:
+        for image in sorted(IMAGES_DIR.iterdir()):
+            print(stub.put_file("tokbud", f"time-record/{image.name}", image))
+    print(f"S3 stub serving {stub.root} on {stub.url}")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
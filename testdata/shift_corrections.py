@@ -0,0 +1,405 @@
+"""
+Batched shift corrections for time_record documents.
+
+A correction is the body of PUT /api/time-record-2/edit (document_id, edit_reason,
+lat, lon and any of shift_reason, image_url_start/end, official_start/end_time,
+start_time/end_time). The edit endpoint applies one correction per request with
+a GET and a full change_log rewrite; here corrections are validated with the same
+rules, turned into change_log entries client-side, grouped per document and applied
+with one scripted update per document through the _bulk API.
+
+Usage:
+    python shift_corrections.py --stub --docs 2000 --corrections 10000
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import argparse
+import random
+import copy
+import time
+import re
+
+from elasticsearch import Elasticsearch
+
+from helpers import create_change_log_json, to_iso, convert_to_timezone
+
+TIME_RECORD_INDEX = "time_record"
+UTC_DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$")
+
+# Replaces the edited top-level fields and appends the new change_log entries
+# without shipping the existing change_log back and forth
+APPLY_CORRECTIONS_SCRIPT = (
+    "for (entry in params.doc.entrySet()) { ctx._source[entry.getKey()] = entry.getValue(); } "
+    "ctx._source.change_log.addAll(params.change_log);"
+)
+
+
+class Correction:
+    """One admin edit, with the same fields as the /time-record-2/edit request body"""
+
+    TIME_FIELDS = ("official_start_time", "official_end_time", "start_time", "end_time")
+
+    def __init__(self,
+                 document_id: str,
+                 edit_reason: str,
+                 lat: float = 0.0,
+                 lon: float = 0.0,
+                 shift_reason: Optional[str] = None,
+                 image_url_start: Optional[str] = None,
+                 image_url_end: Optional[str] = None,
+                 official_start_time: Optional[str] = None,
+                 official_end_time: Optional[str] = None,
+                 start_time: Optional[str] = None,
+                 end_time: Optional[str] = None,
+                 edited_at: Optional[str] = None):
+        self.document_id = document_id
+        self.edit_reason = edit_reason
+        self.lat = lat
+        self.lon = lon
+        self.shift_reason = shift_reason
+        self.image_url_start = image_url_start
+        self.image_url_end = image_url_end
+        self.official_start_time = official_start_time
+        self.official_end_time = official_end_time
+        self.start_time = start_time
+        self.end_time = end_time
+        # UTC time the edit was made; defaults to now like the endpoint
+        self.edited_at = edited_at
+
+    def __repr__(self):
+        changed = {k: v for k, v in vars(self).items() if v is not None and k not in ("document_id", "edit_reason")}
+        return f"Correction({self.document_id!r}, {self.edit_reason!r}, {changed})"
+
+
+def apply_correction(source: dict, correction: Correction) -> str:
+    """
+    Validate a correction against the current document and apply it in place, mirroring
+    the checks in the /time-record-2/edit handler. Returns the new change_log entry.
+    Raises ValueError with the endpoint's error message when the edit would be rejected.
+    """
+    for key in Correction.TIME_FIELDS:
+        value = getattr(correction, key)
+        if value and not UTC_DATETIME_RE.match(value):
+            raise ValueError(f"Invalid {key} format. Expected format: 2024-01-25T08:30:45.123Z")
+
+    c = correction
+    edits_start = c.official_start_time or c.start_time or c.image_url_start
+    edits_end = c.official_end_time or c.end_time or c.image_url_end
+
+    if edits_start and not source.get("start_time"):
+        raise ValueError("Cannot edit start time: No start time record exists")
+    if edits_end and not source.get("end_time"):
+        raise ValueError("Cannot edit end time: No end time record exists")
+    if c.shift_reason and not source.get("reason"):
+        raise ValueError("Cannot edit shift reason: No 'reason' record exists")
+
+    # Time sequence validation (ISO strings in the same format compare chronologically)
+    new_start = c.official_start_time or c.start_time
+    new_end = c.official_end_time or c.end_time
+    if new_start and new_end:
+        if new_end <= new_start:
+            raise ValueError(f"End time ({new_end}) must be after start time ({new_start})")
+    elif new_start:
+        if source.get("end_time") and source["end_time"]["shift_time"] <= new_start:
+            raise ValueError(f"New start time ({new_start}) must be before existing end time "
+                             f"({source['end_time']['shift_time']})")
+    elif new_end:
+        if new_end <= source["start_time"]["shift_time"]:
+            raise ValueError(f"New end time ({new_end}) must be after existing start time "
+                             f"({source['start_time']['shift_time']})")
+
+    if edits_start:
+        start_time_info = dict(source["start_time"])
+        if c.official_start_time:
+            start_time_info["shift_time"] = c.official_start_time
+        if c.start_time:
+            start_time_info["timestamp"] = c.start_time
+        if c.image_url_start:
+            start_time_info["image_url"] = c.image_url_start
+        source["start_time"] = start_time_info
+
+    if edits_end:
+        end_time_info = dict(source["end_time"])
+        if c.official_end_time:
+            end_time_info["shift_time"] = c.official_end_time
+        if c.end_time:
+            end_time_info["timestamp"] = c.end_time
+        if c.image_url_end:
+            end_time_info["image_url"] = c.image_url_end
+        source["end_time"] = end_time_info
+
+    if c.shift_reason is not None:
+        source["reason"] = c.shift_reason
+
+    return create_change_log_json(
+        False, c.edit_reason, c.lat, c.lon,
+        source["start_time"], source.get("end_time"), source.get("reason", ""),
+        current_time=c.edited_at
+    )
+
+
+def fetch_sources(es: Elasticsearch, doc_ids: List[str], index: str = TIME_RECORD_INDEX,
+                  chunk_size: int = 1000) -> Dict[str, dict]:
+    """Fetch current _source for the given ids with _mget, chunk_size ids per request"""
+    sources = {}
+    unique_ids = list(dict.fromkeys(doc_ids))
+    for start in range(0, len(unique_ids), chunk_size):
+        response = es.mget(index=index, ids=unique_ids[start:start + chunk_size])
+        for doc in response["docs"]:
+            if doc.get("found"):
+                sources[doc["_id"]] = doc["_source"]
+    return sources
+
+
+def build_bulk_operations(corrections: List[Correction], sources: Dict[str, dict],
+                          index: str = TIME_RECORD_INDEX) -> Tuple[List[dict], List[Tuple[Correction, str]]]:
+    """
+    Apply corrections, in order, to copies of the sources and emit one scripted update per document.
+    Returns (operations, rejected) where rejected holds (correction, error message) pairs.
+    """
+    pending: "OrderedDict[str, dict]" = OrderedDict()
+    rejected = []
+
+    for correction in corrections:
+        doc_id = correction.document_id
+        if doc_id not in pending:
+            if doc_id not in sources:
+                rejected.append((correction, "Time record not found"))
+                continue
+            pending[doc_id] = {"source": copy.deepcopy(sources[doc_id]), "fields": set(), "change_log": []}
+
+        state = pending[doc_id]
+        try:
+            entry = apply_correction(state["source"], correction)
+        except ValueError as e:
+            rejected.append((correction, str(e)))
+            continue
+
+        if correction.official_start_time or correction.start_time or correction.image_url_start:
+            state["fields"].add("start_time")
+        if correction.official_end_time or correction.end_time or correction.image_url_end:
+            state["fields"].add("end_time")
+        if correction.shift_reason is not None:
+            state["fields"].add("reason")
+        state["change_log"].append(entry)
+
+    operations = []
+    for doc_id, state in pending.items():
+        if not state["change_log"]:
+            continue
+        operations.append({"update": {"_index": index, "_id": doc_id}})
+        operations.append({"script": {
+            "lang": "painless",
+            "source": APPLY_CORRECTIONS_SCRIPT,
+            "params": {
+                "doc": {field: state["source"][field] for field in sorted(state["fields"])},
+                "change_log": state["change_log"]
+            }
+        }})
+
+    return operations, rejected
+
+
+def apply_corrections(es: Elasticsearch,
+                      corrections: List[Correction],
+                      index: str = TIME_RECORD_INDEX,
+                      sources: Optional[Dict[str, dict]] = None,
+                      chunk_size: int = 500) -> Tuple[int, List[Tuple[Correction, str]], List[Tuple[str, str]]]:
+    """
+    Apply corrections through the _bulk API, chunk_size documents per request.
+    `sources` may be passed when the current documents are already known; otherwise they are fetched.
+    Returns (number of documents updated, rejected, failed): rejected holds (correction, error message)
+    pairs for corrections that were never sent, failed holds (doc_id, error message) pairs for
+    documents whose update Elasticsearch refused. A document combines all of its corrections,
+    so the two lists count different things.
+    """
+    if sources is None:
+        sources = fetch_sources(es, [c.document_id for c in corrections], index)
+
+    operations, rejected = build_bulk_operations(corrections, sources, index)
+    failed = []
+    updated = 0
+
+    step = chunk_size * 2  # action line + script body per document
+    for start in range(0, len(operations), step):
+        response = es.bulk(operations=operations[start:start + step])
+        for item in response["items"]:
+            result = item["update"]
+            if result.get("status", 500) < 300:
+                updated += 1
+            else:
+                failed.append((result["_id"], str(result.get("error"))))
+
+    return updated, rejected, failed
+
+
+def register_stub_script(store):
+    """Teach a stub_server.StubStore to execute APPLY_CORRECTIONS_SCRIPT"""
+    def handler(source, params):
+        source.update(params.get("doc", {}))
+        source.setdefault("change_log", []).extend(params.get("change_log", []))
+    store.register_script(APPLY_CORRECTIONS_SCRIPT, handler)
+
+
+def seeded_corrections(results_regular: List[Tuple[str, str, str]],
+                       results_ot: List[Tuple[str, str, str]]) -> List[Correction]:
+    """
+    The edits described next to correct_ot/correct_regular in insert_test_shift.py,
+    resolved to the doc ids returned by the seeder (matched on the actual clock-in time).
+    """
+    from insert_test_shift import correct_ot, correct_regular
+
+    doc_by_actual_in = {actual_in: doc_id for doc_id, actual_in, _ in results_regular + results_ot}
+
+    def doc_for(shift):
+        ((_, _), (actual_in, _)) = shift
+        return doc_by_actual_in.get(actual_in)
+
+    planned = [
+        (doc_for(correct_ot[0]), dict(edit_reason="Correct clock-out time", end_time="2025-03-01T10:45:00.000Z")),
+        (doc_for(correct_ot[0]), dict(edit_reason="Correct shift reasons",
+                                      shift_reason="Urgent shipment processing for today")),
+        (doc_for(correct_ot[1]), dict(edit_reason="Correct clock-in and clock-out images",
+                                      image_url_start="https://storage.example.com/clock-in-corrected.jpg",
+                                      image_url_end="https://storage.example.com/clock-out-corrected.jpg")),
+        (doc_for(correct_regular[0]), dict(edit_reason="Correct clock-in time", start_time="2025-03-19T02:45:00.000Z")),
+        (doc_for(correct_regular[1]), dict(edit_reason="Correct shift reason", shift_reason="Managing cargo")),
+        (doc_for(correct_regular[2]), dict(edit_reason="Correct shift time", end_time="2025-03-31T06:30:00.000Z")),
+    ]
+
+    return [Correction(document_id=doc_id, lat=13.746744, lon=100.527471, **fields)
+            for doc_id, fields in planned if doc_id]
+
+
+EDIT_REASONS = [
+    "Correct shift time",
+    "Correct clock-in time",
+    "Correct clock-out time",
+    "Correct shift reason",
+    "Forgot to clock out",
+    "Wrong photo uploaded",
+]
+
+
+def random_corrections(sources: Dict[str, dict], count: int, seed: Optional[int] = None) -> List[Correction]:
+    """Generate `count` valid-looking corrections spread over the given documents"""
+    rng = random.Random(seed)
+    doc_ids = [doc_id for doc_id, source in sources.items() if source.get("end_time")]
+    corrections = []
+
+    for i in range(count):
+        doc_id = rng.choice(doc_ids)
+        source = sources[doc_id]
+        kind = rng.randrange(5)
+        fields = {}
+
+        if kind == 0:
+            shift_start = datetime.strptime(source["start_time"]["shift_time"], "%Y-%m-%dT%H:%M:%S.%fZ")
+            fields["start_time"] = to_iso(shift_start + timedelta(minutes=rng.randint(-10, 10)))
+        elif kind == 1:
+            shift_end = datetime.strptime(source["end_time"]["shift_time"], "%Y-%m-%dT%H:%M:%S.%fZ")
+            fields["end_time"] = to_iso(shift_end + timedelta(minutes=rng.randint(-10, 10)))
+        elif kind == 2:
+            fields["shift_reason"] = f"{source.get('reason') or 'Shift'} (corrected #{i})"
+        elif kind == 3:
+            fields["image_url_start"] = f"https://storage.example.com/time-record/corrected-in-{i}.jpg"
+            fields["image_url_end"] = f"https://storage.example.com/time-record/corrected-out-{i}.jpg"
+        else:
+            fields["start_time"] = source["start_time"]["shift_time"]
+            fields["end_time"] = source["end_time"]["shift_time"]
+
+        corrections.append(Correction(
+            document_id=doc_id,
+            edit_reason=rng.choice(EDIT_REASONS),
+            lat=round(13.7 + rng.random() * 0.1, 6),
+            lon=round(100.5 + rng.random() * 0.1, 6),
+            **fields
+        ))
+
+    return corrections
+
+
+def synthetic_sources(count: int, seed: Optional[int] = None) -> Dict[str, dict]:
+    """Completed time_record documents built from the seeder's regular shifts"""
+    from insert_test_shift import regular_shifts, regular_location, regular_reasons
+
+    rng = random.Random(seed)
+    sources = {}
+    for i in range(count):
+        ((official_in, official_out), (actual_in, actual_out)) = regular_shifts[i % len(regular_shifts)]
+        ((in_lat, in_lon), (out_lat, out_lon)) = regular_location[i % len(regular_location)]
+        reason = regular_reasons[i % len(regular_reasons)]
+        start_time = {"shift_time": official_in, "timestamp": actual_in,
+                      "image_url": "https://storage.example.com/clock-in-sample.jpg", "lat": in_lat, "lon": in_lon}
+        end_time = {"shift_time": official_out, "timestamp": actual_out,
+                    "image_url": "https://storage.example.com/clock-out-sample.jpg", "lat": out_lat, "lon": out_lon}
+        sources[f"bench_{i:07d}"] = {
+            "date": convert_to_timezone(official_in, 7).split("T")[0],
+            "user_id": f"user_load_{rng.randrange(max(1, count // 30)):05d}",
+            "org_id": "org_2riGCGwJV4T5JwxLOFajkNqc03U",
+            "shift_type": "on-site",
+            "is_complete": True,
+            "reason": reason,
+            "start_time": start_time,
+            "end_time": end_time,
+            "change_log": [
+                create_change_log_json(True, "[SYSTEM] regular clock-in", in_lat, in_lon, start_time,
+                                       shift_reason=reason),
+                create_change_log_json(True, "[SYSTEM] regular clock-out", out_lat, out_lon, start_time,
+                                       end_time, reason),
+            ],
+        }
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply batches of shift corrections through the ES bulk API')
+    parser.add_argument('--es-url', default="http://localhost:9200", help='Elasticsearch URL')
+    parser.add_argument('--stub', action='store_true', help='Run against an in-process stub server')
+    parser.add_argument('--docs', type=int, default=1000, help='Synthetic documents to index before correcting')
+    parser.add_argument('--corrections', type=int, default=5000, help='Number of corrections to apply')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Documents per bulk request')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    def run(es_url):
+        es = Elasticsearch([es_url])
+        sources = synthetic_sources(args.docs, args.seed)
+
+        operations = []
+        for doc_id, source in sources.items():
+            operations.append({"index": {"_index": TIME_RECORD_INDEX, "_id": doc_id}})
+            operations.append(source)
+        for start in range(0, len(operations), args.chunk_size * 2):
+            es.bulk(operations=operations[start:start + args.chunk_size * 2])
+
+        corrections = random_corrections(sources, args.corrections, args.seed)
+
+        started = time.perf_counter()
+        updated, rejected, failed = apply_corrections(es, corrections, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+
+        print(f"Sent {len(corrections) - len(rejected)} of {len(corrections)} corrections as "
+              f"{updated + len(failed)} document updates in {elapsed:.2f}s "
+              f"({len(corrections) / elapsed:.0f} corrections/s)")
+        print(f"  corrections: {len(rejected)} rejected before sending")
+        print(f"  documents: {updated} updated, {len(failed)} failed")
+        for correction, message in rejected[:5]:
+            print(f"  rejected {correction!r}: {message}")
+        for doc_id, message in failed[:5]:
+            print(f"  failed {doc_id}: {message}")
+        es.close()
+
+    if args.stub:
+        from stub_server import StubServer
+        with StubServer() as stub:
+            register_stub_script(stub.store)
+            run(stub.es_url)
+            print("Stub stats:", stub.stats.snapshot())
+    else:
+        run(args.es_url)
+
+
+if __name__ == "__main__":
+    main()
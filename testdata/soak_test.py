@@ -0,0 +1,419 @@
+"""
+Open-loop soak test for the time-record API.
+
+insert_test_shift.py fires requests back-to-back (closed loop): a slow response delays the
+next request, so queueing never builds up and the server sees a load it can keep up with.
+This script instead schedules clock-in/clock-out arrivals from a day profile and sends each
+one at its scheduled time whether or not earlier requests have finished:
+
+    - the day is split into windows (morning burst, lunch, evening clock-outs, OT ...), each
+      with an expected number of events per user; arrivals inside a window are a Poisson
+      process at that rate (exponential gaps), so bursts and quiet spells come out naturally
+    - clock-ins go to users who are not clocked in, clock-outs close one of the open records
+      of the same shift type, with the shift_time of the simulated wall clock
+    - the simulated clock can run faster than real time (--speed) to compress a day
+
+Latency is measured from the scheduled send time, not from when a worker got around to it,
+so client-side backlog shows up in the numbers instead of hiding it (coordinated omission);
+the time spent inside the HTTP call alone is reported as `service`. Every --interval seconds
+a line is printed (and appended to --out as JSON) with request and error counts by status,
+latency percentiles, requests in flight and the client's RSS, so trends over hours (latency
+creeping up, errors appearing, memory growing) are visible.
+
+Usage:
+    python soak_test.py --stub --users 200 --speed 60 --days 1
+    python soak_test.py --base-url http://localhost:3000/api --users 500 --duration 14400 --out soak.jsonl
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+import threading
+import argparse
+import random
+import math
+import json
+import time
+
+from insert_test_shift import SessionPool, generate_location_pairs
+
+BANGKOK = timezone(timedelta(hours=7))
+
+# Windows in Bangkok local time. per_user is the expected number of events per user in the
+# window; a clock-out window only closes records opened with the same shift_type.
+DAY_PROFILE = [
+    {"start": "07:00", "end": "08:15", "event": "clock-in", "shift_type": "on-site", "per_user": 0.35},
+    {"start": "08:15", "end": "08:45", "event": "clock-in", "shift_type": "on-site", "per_user": 0.55},
+    {"start": "08:45", "end": "10:00", "event": "clock-in", "shift_type": "on-site", "per_user": 0.07},
+    {"start": "12:00", "end": "13:00", "event": "clock-out", "shift_type": "on-site", "per_user": 0.05},
+    {"start": "16:30", "end": "17:00", "event": "clock-out", "shift_type": "on-site", "per_user": 0.15},
+    {"start": "17:00", "end": "17:45", "event": "clock-out", "shift_type": "on-site", "per_user": 0.55},
+    {"start": "17:45", "end": "19:00", "event": "clock-out", "shift_type": "on-site", "per_user": 0.2},
+    {"start": "18:00", "end": "18:30", "event": "clock-in", "shift_type": "overtime", "per_user": 0.15},
+    {"start": "20:00", "end": "22:00", "event": "clock-out", "shift_type": "overtime", "per_user": 0.15},
+]
+
+
+def load_profile(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def day_arrivals(profile, day, users, rng):
+    """
+    Scheduled (time, event, shift_type) arrivals for one local day, sorted by time.
+    Each window is a homogeneous Poisson process with rate users * per_user / window length.
+    """
+    midnight = datetime.combine(day, datetime.min.time(), tzinfo=BANGKOK)
+    arrivals = []
+    for window in profile:
+        start = _minutes(window["start"]) * 60
+        length = _minutes(window["end"]) * 60 - start
+        rate = users * window["per_user"] / length
+        if rate <= 0:
+            continue
+        offset = rng.expovariate(rate)
+        while offset < length:
+            arrivals.append((midnight + timedelta(seconds=start + offset), window["event"], window["shift_type"]))
+            offset += rng.expovariate(rate)
+    arrivals.sort(key=lambda arrival: arrival[0])
+    return arrivals
+
+
+def iter_arrivals(profile, start, users, rng):
+    """Arrivals from `start` (an aware datetime) onwards, one day at a time, forever"""
+    day = start.astimezone(BANGKOK).date()
+    while True:
+        for arrival in day_arrivals(profile, day, users, rng):
+            if arrival[0] >= start:
+                yield arrival
+        day += timedelta(days=1)
+
+
+def to_utc_iso(dt):
+    dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (~5% resolution from 0.1 ms upwards) with cheap merging"""
+
+    BASE = 1.05
+    MIN_MS = 0.1
+
+    def __init__(self):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        index = 0 if ms <= self.MIN_MS else math.ceil(math.log(ms / self.MIN_MS, self.BASE))
+        self.buckets[index] += 1
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] += count
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, in ms"""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(min(self.MIN_MS * self.BASE ** index, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def summary(self):
+        return {"p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+                "p999": self.percentile(99.9), "max": round(self.max_ms, 2)}
+
+
+class IntervalStats:
+    def __init__(self):
+        self.sent = defaultdict(int)
+        self.ok = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+
+    def merge(self, other):
+        for target, source in ((self.sent, other.sent), (self.ok, other.ok), (self.errors, other.errors)):
+            for key, count in source.items():
+                target[key] += count
+        self.latency.merge(other.latency)
+        self.service.merge(other.service)
+
+
+def client_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class SoakTest:
+    """
+    Open-loop driver. A scheduler thread walks the arrival stream and hands each request to a
+    large thread pool at its due time; workers never throttle the scheduler.
+    """
+
+    def __init__(self, pool, profile, start, speed=1.0, seed=None, max_in_flight=1000):
+        self.pool = pool
+        self.profile = profile
+        self.start = start
+        self.speed = speed
+        self.rng = random.Random(seed)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="soak")
+        self.locations = generate_location_pairs()
+        self.lock = threading.Lock()
+        self.idle = list(pool.user_ids)
+        self.open_records = defaultdict(list)  # shift_type -> [(user_id, doc_id, shift_time)]
+        self.pending_clock_outs = {}  # doc_id -> shift_type while the clock-out is in flight
+        self.in_flight = 0
+        self.max_lag_ms = 0.0
+        self.skipped = defaultdict(int)
+        self.interval = IntervalStats()
+        self.total = IntervalStats()
+
+    def simulated_now(self, wall_start, now=None):
+        return self.start + timedelta(seconds=((now or time.monotonic()) - wall_start) * self.speed)
+
+    def take_interval(self):
+        with self.lock:
+            interval, self.interval = self.interval, IntervalStats()
+            in_flight = self.in_flight
+            max_lag_ms, self.max_lag_ms = self.max_lag_ms, 0.0
+            skipped = dict(self.skipped)
+            self.skipped.clear()
+            open_records = sum(len(records) for records in self.open_records.values())
+        self.total.merge(interval)
+        return interval, {"in_flight": in_flight, "scheduler_lag_ms": round(max_lag_ms, 1),
+                          "skipped": skipped, "open_records": open_records}
+
+    def _finish(self, route, due, sent_at, status):
+        done = time.monotonic()
+        with self.lock:
+            self.in_flight -= 1
+            if status == 200:
+                self.interval.ok[route] += 1
+            else:
+                self.interval.errors[f"{route}:{status}"] += 1
+            self.interval.latency.record((done - due) * 1000)
+            self.interval.service.record((done - sent_at) * 1000)
+
+    def _post(self, api, url, payload):
+        try:
+            response = api.session.post(url, json=payload)
+            if response.status_code == 200 and response.json().get("status") != "success":
+                return "failed", None
+            return response.status_code, response.json() if response.status_code == 200 else None
+        except Exception as e:
+            return type(e).__name__, None
+
+    def clock_in(self, user_id, shift_type, shift_time, location, due):
+        api = self.pool.apis[user_id]
+        lat, lon = location
+        sent_at = time.monotonic()
+        status, data = self._post(api, api.clock_in_url, {
+            "shift_type": shift_type,
+            "shift_time": shift_time,
+            "image_url": "https://storage.example.com/clock-in-sample.jpg",
+            "lat": lat,
+            "lon": lon,
+        })
+        with self.lock:
+            if status == 200:
+                self.open_records[shift_type].append((user_id, data["data"]["document_id"], shift_time))
+            else:
+                self.idle.append(user_id)
+        self._finish("clock-in", due, sent_at, status)
+
+    def clock_out(self, user_id, doc_id, shift_time, location, due):
+        api = self.pool.apis[user_id]
+        lat, lon = location
+        sent_at = time.monotonic()
+        status, _ = self._post(api, api.clock_out_url, {
+            "doc_id": doc_id,
+            "shift_time": shift_time,
+            "image_url": "https://storage.example.com/clock-out-sample.jpg",
+            "lat": lat,
+            "lon": lon,
+        })
+        with self.lock:
+            shift_type = self.pending_clock_outs.pop(doc_id)
+            # After a server or network error the record is still open; a user would try again
+            if status != 200 and (not isinstance(status, int) or status >= 500):
+                self.open_records[shift_type].append((user_id, doc_id, shift_time))
+            else:
+                self.idle.append(user_id)
+        self._finish("clock-out", due, sent_at, status)
+
+    def dispatch(self, when, event, shift_type, due):
+        """Pick a user for the arrival and submit its request; arrivals with no eligible user are skipped"""
+        shift_time = to_utc_iso(when)
+        with self.lock:
+            if event == "clock-in":
+                if not self.idle:
+                    self.skipped[event] += 1
+                    return
+                user_id = self.idle.pop(self.rng.randrange(len(self.idle)))
+                location = self.rng.choice(self.locations)[0]
+                task = (self.clock_in, user_id, shift_type, shift_time, location, due)
+            else:
+                records = self.open_records[shift_type]
+                # Never send an end time before the start time of the record
+                eligible = [i for i, record in enumerate(records) if record[2] < shift_time]
+                if not eligible:
+                    self.skipped[event] += 1
+                    return
+                user_id, doc_id, _ = records.pop(self.rng.choice(eligible))
+                self.pending_clock_outs[doc_id] = shift_type
+                location = self.rng.choice(self.locations)[1]
+                task = (self.clock_out, user_id, doc_id, shift_time, location, due)
+            self.in_flight += 1
+            self.interval.sent[event] += 1
+        self.executor.submit(*task)
+
+    def run(self, duration=None, until=None, interval=10.0, report=None, stop=None):
+        """
+        Send arrivals until `duration` wall seconds have passed or the simulated clock reaches
+        `until`, calling report(interval_stats, gauges) every `interval` seconds.
+        """
+        stop = stop or threading.Event()
+        wall_start = time.monotonic()
+
+        def reporter():
+            while not stop.wait(interval):
+                report(*self.take_interval())
+
+        reporter_thread = threading.Thread(target=reporter, name="soak-report", daemon=True)
+        reporter_thread.start()
+        try:
+            for when, event, shift_type in iter_arrivals(self.profile, self.start, len(self.idle), self.rng):
+                if until and when >= until:
+                    break
+                due = wall_start + (when - self.start).total_seconds() / self.speed
+                if duration and due - wall_start >= duration:
+                    break
+                delay = due - time.monotonic()
+                if delay > 0 and stop.wait(delay):
+                    break
+                with self.lock:
+                    self.max_lag_ms = max(self.max_lag_ms, (time.monotonic() - due) * 1000)
+                self.dispatch(when, event, shift_type, due)
+        except KeyboardInterrupt:
+            print("Interrupted, waiting for requests in flight")
+        finally:
+            self.executor.shutdown(wait=True)
+            stop.set()
+            reporter_thread.join()
+            report(*self.take_interval())
+        return self.total
+
+
+def format_line(elapsed, simulated, stats, gauges):
+    sent = sum(stats.sent.values())
+    errors = sum(stats.errors.values())
+    latency = stats.latency.summary()
+    error_text = " ".join(f"{key}={count}" for key, count in sorted(stats.errors.items()))
+    return (f"[{elapsed:8.0f}s sim {simulated:%a %H:%M}] sent={sent} ok={sum(stats.ok.values())} "
+            f"err={errors} ({100 * errors / sent if sent else 0:.1f}%) "
+            f"p50={latency['p50']} p99={latency['p99']} max={latency['max']} ms "
+            f"in_flight={gauges['in_flight']} open={gauges['open_records']} lag={gauges['scheduler_lag_ms']}ms "
+            f"rss={gauges['rss_mb']}MB {error_text}").rstrip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop soak test with diurnal clock-in/clock-out arrivals')
+    parser.add_argument('--base-url', default="http://localhost:3000/api", help='Base URL of the app API')
+    parser.add_argument('--stub', action='store_true', help='Run against an in-process stub server')
+    parser.add_argument('--stub-latency', type=float, default=0.005, help='Stub base latency in seconds')
+    parser.add_argument('--stub-error-rate', type=float, default=0.0, help='Stub error rate')
+    parser.add_argument('--users', type=int, default=100, help='Simulated users')
+    parser.add_argument('--profile', default=None, help='JSON day profile (list of windows, see DAY_PROFILE)')
+    parser.add_argument('--start', default=None,
+                        help='Simulated start, Bangkok time "YYYY-MM-DD HH:MM" (default: today 06:30)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Simulated seconds per wall-clock second')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many wall-clock seconds')
+    parser.add_argument('--days', type=float, default=None, help='Stop after this many simulated days')
+    parser.add_argument('--interval', type=float, default=10.0, help='Reporting interval in wall-clock seconds')
+    parser.add_argument('--max-in-flight', type=int, default=1000, help='Sender threads (requests in flight)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for arrivals and user choice')
+    parser.add_argument('--out', default=None, help='Append one JSON line per interval to this file')
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile) if args.profile else DAY_PROFILE
+    if args.start:
+        start = datetime.strptime(args.start, "%Y-%m-%d %H:%M").replace(tzinfo=BANGKOK)
+    else:
+        start = datetime.now(BANGKOK).replace(hour=6, minute=30, second=0, microsecond=0)
+    until = start + timedelta(days=args.days) if args.days else None
+    if not args.duration and not until:
+        until = start + timedelta(days=1)
+
+    def run(base_url, stub=None):
+        user_ids = [f"user_soak_{i:05d}" for i in range(args.users)]
+        with SessionPool(user_ids, base_url=base_url, max_workers=min(64, args.users), retries=0) as pool:
+            soak = SoakTest(pool, profile, start, args.speed, args.seed, args.max_in_flight)
+            wall_start = time.monotonic()
+            out = open(args.out, "a", encoding="utf-8") if args.out else None
+
+            def report(stats, gauges):
+                now = time.monotonic()
+                gauges["rss_mb"] = client_rss_mb()
+                simulated = soak.simulated_now(wall_start, now)
+                print(format_line(now - wall_start, simulated, stats, gauges), flush=True)
+                if out:
+                    out.write(json.dumps({
+                        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        "elapsed_s": round(now - wall_start, 1),
+                        "simulated": simulated.isoformat(timespec="seconds"),
+                        "sent": dict(stats.sent),
+                        "ok": dict(stats.ok),
+                        "errors": dict(stats.errors),
+                        "latency_ms": stats.latency.summary(),
+                        "service_ms": stats.service.summary(),
+                        **gauges,
+                        **({"stub": stub.stats.snapshot()} if stub else {}),
+                    }) + "\n")
+                    out.flush()
+
+            try:
+                total = soak.run(args.duration, until, args.interval, report)
+            finally:
+                if out:
+                    out.close()
+
+        sent = sum(total.sent.values())
+        errors = sum(total.errors.values())
+        print(f"Total: sent={sent} ok={sum(total.ok.values())} errors={errors} "
+              f"({100 * errors / sent if sent else 0:.2f}%) {dict(total.errors)}")
+        print(f"Latency (from schedule) ms: {total.latency.summary()}")
+        print(f"Service time ms:            {total.service.summary()}")
+
+    if args.stub:
+        from stub_server import StubServer
+        with StubServer(latency=args.stub_latency, error_rate=args.stub_error_rate, seed=args.seed) as stub:
+            run(stub.api_url, stub)
+            print("Stub stats:", stub.stats.snapshot())
+    else:
+        run(args.base_url)
+
+
+if __name__ == "__main__":
+    main()
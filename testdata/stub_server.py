@@ -0,0 +1,672 @@
+"""
+In-process stand-in for the endpoints the seeder talks to, so client-side
+throughput, pooling and retry behaviour can be measured without the Next app
+or Elasticsearch running.
+
+Implements:
+    GET  /api/dev-session/<user_id>
+    POST /api/time-record-2/clock-in
+    POST /api/time-record-2/clock-out
+    POST /api/upload  (presigned PUT URL on `upload_url`, e.g. an S3Stub)
+    POST /api/export-pdf  (builds the export from stored time_record docs and runs to_pdf.py
+                           under `export_root`, a temporary directory by default)
+    POST /<index>/_update/<id>
+    POST /_bulk  (and /<index>/_bulk)
+    POST /_mget  (and /<index>/_mget)
+
+Usage:
+    stub = StubServer(latency=0.005, error_rate=0.01).start()
+    api = TimeRecordAPI(base_url=stub.api_url)
+    ...
+    stub.stop()
+
+or standalone:
+    python stub_server.py --port 3000 --latency 0.01 --error-rate 0.02
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from http.cookies import SimpleCookie
+from datetime import datetime, timezone
+from collections import defaultdict
+from pathlib import Path
+import subprocess
+import threading
+import tempfile
+import shutil
+import random
+import argparse
+import json
+import time
+import uuid
+import sys
+import os
+import re
+
+from helpers import create_change_log_json, to_iso, convert_to_timezone
+
+ES_PRODUCT_HEADER = ("X-Elastic-Product", "Elasticsearch")
+UTC_DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$")
+MAX_MEDIA_SIZE = 1024 * 1024 * 10
+ACCEPTED_CONTENT_TYPE = ["image/png", "image/jpeg", "image/jpg", "image/gif"]
+EXTERNAL_SERVICE_DIR = Path(__file__).parent.absolute().parent / "src" / "elysia" / "external_service"
+
+
+def merge_doc(target, partial):
+    """Recursive merge matching Elasticsearch partial-document update semantics"""
+    for key, value in partial.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_doc(target[key], value)
+        else:
+            target[key] = value
+
+
+class ScriptError(Exception):
+    """An _update script the stub has no Python implementation for (ES answers script_exception)"""
+
+
+class StubStore:
+    """Thread-safe document store keyed by (index, id)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.docs = {}
+        self.sessions = {}
+        self.script_handlers = {}
+
+    def put(self, index, doc_id, source):
+        with self.lock:
+            self.docs[(index, doc_id)] = source
+
+    def get(self, index, doc_id):
+        with self.lock:
+            return self.docs.get((index, doc_id))
+
+    def update(self, index, doc_id, body):
+        """
+        Apply an _update body ({"doc": ...} or {"script": ...}) to a stored document.
+        Returns the ES result string, or None when the document is missing. Raises ScriptError
+        for a script no handler is registered for; the document is left unchanged.
+        """
+        with self.lock:
+            source = self.docs.get((index, doc_id))
+            if source is None:
+                return None
+            if "doc" in body:
+                merge_doc(source, body["doc"])
+            elif "script" in body:
+                script = body["script"]
+                handler = self.script_handlers.get(script.get("id") or script.get("source"))
+                if handler is None:
+                    raise ScriptError(f"No stub implementation for script {script.get('id') or script.get('source')!r}")
+                handler(source, script.get("params", {}))
+            return "updated"
+
+    def register_script(self, key, handler):
+        """Register a Python implementation for a painless script (by id or source)"""
+        self.script_handlers[key] = handler
+
+    def hits(self, index):
+        """Snapshot of an index as elasticdump-style {"_id", "_source"} hits"""
+        with self.lock:
+            return [{"_id": doc_id, "_source": source} for (idx, doc_id), source in self.docs.items() if idx == index]
+
+    def count(self, index=None):
+        with self.lock:
+            return sum(1 for (idx, _) in self.docs if index is None or idx == index)
+
+
+class StubConfig:
+    """
+    Injected latency and failure behaviour.
+
+    latency: base delay in seconds added to every request
+    jitter: extra uniformly-distributed delay in seconds
+    error_rate: probability a request is answered with `error_status`
+    route_overrides: {route_name: {"latency": .., "jitter": .., "error_rate": ..}}
+        where route_name is one of dev-session, clock-in, clock-out, upload, export-pdf, update, bulk, mget
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, route_overrides=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.route_overrides = route_overrides or {}
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+    def setting(self, route, name):
+        return self.route_overrides.get(route, {}).get(name, getattr(self, name))
+
+    def delay_for(self, route):
+        with self.random_lock:
+            extra = self.random.uniform(0, self.setting(route, "jitter"))
+        return self.setting(route, "latency") + extra
+
+    def should_fail(self, route):
+        rate = self.setting(route, "error_rate")
+        if rate <= 0:
+            return False
+        with self.random_lock:
+            return self.random.random() < rate
+
+
+class StubStats:
+    """Per-route request counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.connections = 0
+
+    def record(self, route, failed):
+        with self.lock:
+            self.requests[route] += 1
+            if failed:
+                self.errors[route] += 1
+
+    def new_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "connections": self.connections,
+            }
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TokbudStub/1.0"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # keep-alive request stalls on delayed ACK
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", re.compile(r"^/api/dev-session/(?P<user_id>[^/]+)$"), "dev-session"),
+        ("POST", re.compile(r"^/api/time-record-2/clock-in$"), "clock-in"),
+        ("POST", re.compile(r"^/api/time-record-2/clock-out$"), "clock-out"),
+        ("POST", re.compile(r"^/api/upload/?$"), "upload"),
+        ("POST", re.compile(r"^/api/export-pdf/?$"), "export-pdf"),
+        ("POST", re.compile(r"^/(?P<index>[^/_][^/]*)/_update/(?P<doc_id>[^/]+)$"), "update"),
+        ("POST", re.compile(r"^(/(?P<index>[^/_][^/]*))?/_bulk$"), "bulk"),
+        ("PUT", re.compile(r"^(/(?P<index>[^/_][^/]*))?/_bulk$"), "bulk"),
+        ("POST", re.compile(r"^(/(?P<index>[^/_][^/]*))?/_mget$"), "mget"),
+        ("GET", re.compile(r"^(/(?P<index>[^/_][^/]*))?/_mget$"), "mget"),
+    ]
+
+    def setup(self):
+        super().setup()
+        self.server.stats.new_connection()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def dispatch(self, method):
+        path = self.path.split("?", 1)[0]
+        body = self.read_body()
+
+        for route_method, pattern, route in self.ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            self.send_json(404, {"status": "error", "message": f"No stub route for {method} {path}"})
+            return
+
+        config = self.server.config
+        delay = config.delay_for(route)
+        if delay > 0:
+            time.sleep(delay)
+
+        failed = config.should_fail(route)
+        self.server.stats.record(route, failed)
+        if failed:
+            self.send_json(config.error_status, {"status": "error", "message": "Injected failure"},
+                           es=route in ("update", "bulk", "mget"))
+            return
+
+        handler = getattr(self, "handle_" + route.replace("-", "_"))
+        handler(body, **{k: v for k, v in match.groupdict().items() if v is not None})
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, payload, es=False, extra_headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if es:
+            self.send_header(*ES_PRODUCT_HEADER)
+        for header in extra_headers or []:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_text(self, status, text, extra_headers=None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain;charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for header in extra_headers or []:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def current_user(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        token = cookie["auth"].value if "auth" in cookie else None
+        return self.server.store.sessions.get(token)
+
+    def parse_json(self, body):
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return None
+
+    # -------------------- App routes -------------------- #
+
+    def handle_dev_session(self, body, user_id):
+        token = uuid.uuid4().hex
+        self.server.store.sessions[token] = user_id
+        self.send_text(200, f"session for user {user_id} granted",
+                       extra_headers=[("Set-Cookie", f"auth={token}; Path=/; HttpOnly")])
+
+    def handle_clock_in(self, body):
+        user_id = self.current_user()
+        if not user_id:
+            self.send_json(401, {"status": "error", "message": "Unauthorized"})
+            return
+
+        payload = self.parse_json(body)
+        if payload is None:
+            self.send_json(400, {"status": "error", "message": "Invalid JSON body"})
+            return
+
+        missing = [f for f in ("shift_time", "image_url", "lat", "lon") if f not in payload]
+        if missing:
+            self.send_json(400, {"status": "error", "message": f"Missing mandatory fields: {', '.join(missing)}"})
+            return
+
+        if not UTC_DATETIME_RE.match(payload["shift_time"]):
+            self.send_json(400, {"status": "error",
+                                 "message": "Invalid shift_time format. Expected format: 2024-01-25T08:30:45.123Z"})
+            return
+
+        start_time_info = {
+            "shift_time": payload["shift_time"],
+            "timestamp": to_iso(datetime.now(timezone.utc)),
+            "image_url": payload["image_url"],
+            "lat": payload["lat"],
+            "lon": payload["lon"],
+        }
+        reason = payload.get("reason") or ""
+        doc_id = uuid.uuid4().hex[:20]
+        self.server.store.put(self.server.time_record_index, doc_id, {
+            "date": convert_to_timezone(payload["shift_time"], 7).split("T")[0],
+            "user_id": user_id,
+            "org_id": self.server.org_id,
+            "shift_type": payload.get("shift_type") or "",
+            "is_complete": False,
+            "reason": reason,
+            "start_time": start_time_info,
+            "end_time": None,
+            "change_log": [
+                create_change_log_json(True, "[SYSTEM] regular clock-in", payload["lat"], payload["lon"],
+                                       start_time_info, shift_reason=reason)
+            ],
+        })
+        self.send_json(200, {"status": "success", "data": {"document_id": doc_id}})
+
+    def handle_clock_out(self, body):
+        user_id = self.current_user()
+        if not user_id:
+            self.send_json(401, {"status": "error", "message": "Unauthorized"})
+            return
+
+        payload = self.parse_json(body)
+        if payload is None:
+            self.send_json(400, {"status": "error", "message": "Invalid JSON body"})
+            return
+
+        missing = [f for f in ("doc_id", "shift_time", "image_url", "lat", "lon") if f not in payload]
+        if missing:
+            self.send_json(400, {"status": "error", "message": f"Missing mandatory fields: {', '.join(missing)}"})
+            return
+
+        store = self.server.store
+        index = self.server.time_record_index
+        source = store.get(index, payload["doc_id"])
+        if source is None:
+            self.send_json(404, {"status": "error", "message": "Time record not found"})
+            return
+        if source["user_id"] != user_id:
+            self.send_json(403, {"status": "error", "message": "You are not authorized to update this record"})
+            return
+        if source["is_complete"]:
+            self.send_json(400, {"status": "error", "message": "This time record is already completed"})
+            return
+        if payload["shift_time"] <= source["start_time"]["shift_time"]:
+            self.send_json(400, {"status": "error",
+                                 "message": f"End time ({payload['shift_time']}) must be after start time "
+                                            f"({source['start_time']['shift_time']})"})
+            return
+
+        end_time_info = {
+            "shift_time": payload["shift_time"],
+            "timestamp": to_iso(datetime.now(timezone.utc)),
+            "image_url": payload["image_url"],
+            "lat": payload["lat"],
+            "lon": payload["lon"],
+        }
+        change_log_entry = create_change_log_json(True, "[SYSTEM] regular clock-out", payload["lat"], payload["lon"],
+                                                  source["start_time"], end_time_info, source["reason"])
+        store.update(index, payload["doc_id"], {"doc": {
+            "end_time": end_time_info,
+            "is_complete": True,
+            "change_log": source["change_log"] + [change_log_entry],
+        }})
+        self.send_json(200, {"status": "success", "data": {"doc_id": payload["doc_id"]}})
+
+    def handle_upload(self, body):
+        """Mirror of src/elysia/controllers/upload.ts; the URL is shaped like a presigned one but not signed"""
+        if not self.current_user():
+            self.send_text(401, "requires user token")
+            return
+
+        payload = self.parse_json(body)
+        if payload is None or not all(f in payload for f in ("fileKey", "contentType", "contentSize")):
+            self.send_json(422, {"status": "error", "message": "Invalid body"})
+            return
+        if not payload["fileKey"]:
+            self.send_text(400, "File key is missing")
+            return
+        if payload["contentSize"] > MAX_MEDIA_SIZE:
+            self.send_text(400, "Media is too big")
+            return
+        if payload["contentType"] not in ACCEPTED_CONTENT_TYPE:
+            self.send_text(400, "Unsupported media type")
+            return
+
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        signed_url = (f"{self.server.upload_url}/tokbud/time-record/{payload['fileKey']}"
+                      f"?X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Date={amz_date}&X-Amz-Expires=300"
+                      f"&X-Amz-SignedHeaders=content-length%3Bhost&x-id=PutObject")
+        self.send_json(200, {"signedUrl": signed_url})
+
+    def handle_export_pdf(self, body):
+        """
+        Mirror of exportPdfController: shape the export from the stored time_record docs
+        (export_builder), write it to <export_root>/input/ and wait for to_pdf.py, run with the
+        controller's flags, all within the request. Sheets go to <export_root>/pdf/.
+        """
+        if not self.current_user():
+            self.send_json(401, {"status": "error", "message": "Unauthorized"})
+            return
+
+        payload = self.parse_json(body) or {}
+        user_ids, start_date, end_date = payload.get("user_ids"), payload.get("start_date"), payload.get("end_date")
+        if not user_ids or not start_date or not end_date:
+            self.send_json(400, {"status": "error", "message": "Missing required fields: user_ids, start_date, "
+                                                              "and end_date are required"})
+            return
+
+        if str(EXTERNAL_SERVICE_DIR) not in sys.path:
+            sys.path.insert(0, str(EXTERNAL_SERVICE_DIR))
+        from export_builder import build_export
+
+        wanted = set(user_ids)
+        hits = [hit for hit in self.server.store.hits(self.server.time_record_index)
+                if hit["_source"].get("user_id") in wanted]
+        export_data = build_export(hits, start_date=start_date, end_date=end_date, user_ids=user_ids)
+
+        now = datetime.now()
+        filename = (f"export_list_{now:%Y_%m_%d_%H_%M_%S}_{now.microsecond // 1000:03d}_{len(user_ids)}.json")
+        input_dir = self.server.export_root / "input"
+        input_dir.mkdir(parents=True, exist_ok=True)
+        (input_dir / filename).write_text(json.dumps(export_data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        returncode, stdout, stderr, files = self.run_to_pdf(input_dir / filename)
+        if returncode == 0 or ("Generated PDF" in stdout and not stderr.strip()):
+            self.send_json(200, {"status": "ok", "message": "PDF generation completed successfully",
+                                 "filename": filename, "files": files})
+        else:
+            self.send_json(500, {"status": "error", "message": stderr or "Python script execution failed"})
+
+    def run_to_pdf(self, json_path):
+        """
+        to_pdf.py with exportPdfController's flags: progress events on an extra pipe and
+        deterministic output. The controller maps the pipe to fd 3; here it keeps the number
+        os.pipe() gave it. Returns (returncode, stdout, stderr, sheet events).
+        """
+        read_fd, write_fd = os.pipe()
+        command = [sys.executable, str(EXTERNAL_SERVICE_DIR / "to_pdf.py"), str(json_path),
+                   "--progress", f"fd:{write_fd}", "--deterministic",
+                   "--output-dir", str(self.server.export_root / "pdf")]
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       pass_fds=(write_fd,))
+        finally:
+            os.close(write_fd)
+
+        files = []
+
+        def read_progress():
+            with open(read_fd, "r", encoding="utf-8") as progress:
+                for line in progress:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if event.get("event") == "sheet":
+                        files.append(event)
+
+        reader = threading.Thread(target=read_progress, name="to-pdf-progress", daemon=True)
+        reader.start()
+        stdout, stderr = process.communicate()
+        reader.join()
+        return process.returncode, stdout, stderr, files
+
+    # -------------------- Elasticsearch routes -------------------- #
+
+    def handle_update(self, body, index, doc_id):
+        payload = self.parse_json(body)
+        if payload is None:
+            self.send_json(400, {"error": {"type": "parse_exception"}, "status": 400}, es=True)
+            return
+
+        try:
+            result = self.server.store.update(index, doc_id, payload)
+        except ScriptError as e:
+            self.send_json(400, {"error": {"type": "script_exception", "reason": str(e)}, "status": 400}, es=True)
+            return
+        if result is None:
+            self.send_json(404, {
+                "error": {"type": "document_missing_exception", "reason": f"[{doc_id}]: document missing"},
+                "status": 404,
+            }, es=True)
+            return
+
+        self.send_json(200, {"_index": index, "_id": doc_id, "result": result,
+                             "_shards": {"total": 1, "successful": 1, "failed": 0}}, es=True)
+
+    def handle_bulk(self, body, index=None):
+        started = time.perf_counter()
+        lines = [line for line in body.decode("utf-8").split("\n") if line.strip()]
+        items = []
+        errors = False
+        store = self.server.store
+
+        i = 0
+        while i < len(lines):
+            action_line = json.loads(lines[i])
+            (action, meta), = action_line.items()
+            target_index = meta.get("_index", index)
+            doc_id = meta.get("_id") or uuid.uuid4().hex[:20]
+
+            if action == "delete":
+                i += 1
+                with store.lock:
+                    existed = store.docs.pop((target_index, doc_id), None) is not None
+                items.append({action: {"_index": target_index, "_id": doc_id,
+                                       "status": 200 if existed else 404,
+                                       "result": "deleted" if existed else "not_found"}})
+                continue
+
+            source = json.loads(lines[i + 1]) if i + 1 < len(lines) else {}
+            i += 2
+
+            if action in ("index", "create"):
+                store.put(target_index, doc_id, source)
+                items.append({action: {"_index": target_index, "_id": doc_id, "status": 201, "result": "created"}})
+            elif action == "update":
+                try:
+                    result = store.update(target_index, doc_id, source)
+                except ScriptError as e:
+                    errors = True
+                    items.append({action: {"_index": target_index, "_id": doc_id, "status": 400,
+                                           "error": {"type": "script_exception", "reason": str(e)}}})
+                    continue
+                if result is None:
+                    errors = True
+                    items.append({action: {"_index": target_index, "_id": doc_id, "status": 404,
+                                           "error": {"type": "document_missing_exception",
+                                                     "reason": f"[{doc_id}]: document missing"}}})
+                else:
+                    items.append({action: {"_index": target_index, "_id": doc_id, "status": 200, "result": result}})
+
+        took = int((time.perf_counter() - started) * 1000)
+        self.send_json(200, {"took": took, "errors": errors, "items": items}, es=True)
+
+
+    def handle_mget(self, body, index=None):
+        payload = self.parse_json(body)
+        if payload is None:
+            self.send_json(400, {"error": {"type": "parse_exception"}, "status": 400}, es=True)
+            return
+
+        requests = payload.get("docs") or [{"_id": doc_id} for doc_id in payload.get("ids", [])]
+        docs = []
+        for request in requests:
+            target_index = request.get("_index", index)
+            source = self.server.store.get(target_index, request["_id"])
+            if source is None:
+                docs.append({"_index": target_index, "_id": request["_id"], "found": False})
+            else:
+                docs.append({"_index": target_index, "_id": request["_id"], "found": True,
+                             "_source": json.loads(json.dumps(source))})
+        self.send_json(200, {"docs": docs}, es=True)
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+class StubServer:
+    """
+    Serves both the app API (/api/...) and the Elasticsearch endpoints on one port.
+    Point TimeRecordAPI at `api_url` and the Elasticsearch client at `es_url`.
+
+    export_root: where POST /api/export-pdf writes its input/ and pdf/ directories. Defaults to
+        a temporary directory that stop() removes; a given directory is left in place.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, route_overrides=None, seed=None, org_id="org_2riGCGwJV4T5JwxLOFajkNqc03U",
+                 time_record_index="time_record", upload_url="https://uploads.stamford.dev", verbose=False,
+                 export_root=None):
+        self.config = StubConfig(latency, jitter, error_rate, error_status, route_overrides, seed)
+        self.store = StubStore()
+        self.stats = StubStats()
+        self.httpd = StubHTTPServer((host, port), StubRequestHandler)
+        self.httpd.config = self.config
+        self.httpd.store = self.store
+        self.httpd.stats = self.stats
+        self.httpd.org_id = org_id
+        self.httpd.time_record_index = time_record_index
+        self.httpd.upload_url = upload_url.rstrip("/")
+        self.httpd.verbose = verbose
+        self.owns_export_root = export_root is None
+        self.export_root = Path(export_root or tempfile.mkdtemp(prefix="stub-export-"))
+        self.httpd.export_root = self.export_root
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/api"
+
+    @property
+    def es_url(self):
+        return self.url
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+        if self.owns_export_root:
+            shutil.rmtree(self.export_root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the time-record/Elasticsearch stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base latency per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency per request in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    parser.add_argument('--export-root', default=None,
+                        help='Directory for the input/ and pdf/ of POST /api/export-pdf (default: a temporary one)')
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                        args.error_status, verbose=args.verbose, export_root=args.export_root)
+    print(f"Stub server listening on {server.url} (api: {server.api_url}, es: {server.es_url}, "
+          f"exports: {server.export_root})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        if server.owns_export_root:
+            shutil.rmtree(server.export_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Columnar binary form of time_record elasticdump fixtures.
+
+A fixture is a directory:
+
+    meta.json                 format version, record count, table names
+    records.npy               NumPy structured array, one row per document
+    <table>.offsets.npy       uint64 offsets into <table>.blob.npy (len = strings + 1)
+    <table>.blob.npy          uint8 UTF-8 bytes of all strings back to back
+
+Categorical and free-text fields (ids, reasons, image urls, shift types) are
+stored once in a string table and referenced by uint32 index. change_log keeps
+its raw JSON strings in the `change_log` table; each record points at a
+contiguous [change_log_start, change_log_start + change_log_count) range, so
+the JSON inside JSON is only decoded for the records that actually need it.
+Any other _source keys (e.g. stray dotted fields left by partial updates) are
+kept as a JSON object in the `extra` table so conversion is lossless.
+
+Everything is opened with np.load(mmap_mode="r"), so loading a fixture with
+millions of shifts is a handful of mmap calls.
+
+Usage:
+    python time_record_fixture.py convert es_dump/time_record.json /tmp/time_record.trf --users 100 --periods 12
+    python time_record_fixture.py info /tmp/time_record.trf
+"""
+from pathlib import Path
+import argparse
+import json
+import time
+import sys
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+sys.path.insert(0, str(SCRIPT_DIR.parent / "src" / "elysia" / "external_service"))
+
+# Same string table layout as the columnar exports to_pdf.py reads
+from export_columnar import NO_INDEX, StringTable, StringTableBuilder  # noqa: E402
+
+FORMAT_VERSION = 1
+
+RECORD_DTYPE = np.dtype([
+    ("doc_id", "<u4"),
+    ("user_id", "<u4"),
+    ("org_id", "<u4"),
+    ("date", "<M8[D]"),
+    ("shift_type", "u1"),
+    ("is_complete", "?"),
+    ("has_end", "?"),
+    ("start_shift_time", "<M8[ms]"),
+    ("start_timestamp", "<M8[ms]"),
+    ("end_shift_time", "<M8[ms]"),
+    ("end_timestamp", "<M8[ms]"),
+    ("start_lat", "<f8"),
+    ("start_lon", "<f8"),
+    ("end_lat", "<f8"),
+    ("end_lon", "<f8"),
+    ("reason", "<u4"),
+    ("start_image_url", "<u4"),
+    ("end_image_url", "<u4"),
+    ("change_log_start", "<u8"),
+    ("change_log_count", "<u4"),
+    ("extra", "<u4"),
+])
+
+STRING_TABLES = ("doc_id", "user_id", "org_id", "shift_type", "reason", "image_url", "change_log", "extra")
+
+# _source keys with a column of their own; anything else is kept as JSON in the `extra` table
+KNOWN_SOURCE_KEYS = {"date", "reason", "start_time", "shift_type", "user_id", "org_id", "change_log",
+                     "end_time", "is_complete"}
+
+
+def _to_ms(iso_string):
+    if not iso_string:
+        return np.datetime64("NaT", "ms")
+    return np.datetime64(iso_string.rstrip("Z"), "ms")
+
+
+def _from_ms(values):
+    """datetime64[ms] array -> list of JS-style ISO strings ("" for NaT)"""
+    strings = np.datetime_as_string(values, unit="ms")
+    return ["" if s == "NaT" else s + "Z" for s in strings]
+
+
+def write_fixture(hits, directory):
+    """Write an iterable of elasticdump hits ({"_id", "_source"}) as a columnar fixture"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = {name: StringTableBuilder(intern=name not in ("doc_id", "change_log", "extra")) for name in STRING_TABLES}
+
+    rows = []
+    change_log_total = 0
+    for hit in hits:
+        source = hit.get("_source") or {}
+        start = source.get("start_time") or {}
+        end = source.get("end_time")
+        change_log = source.get("change_log") or []
+
+        change_log_start = change_log_total
+        for entry in change_log:
+            tables["change_log"].add(entry if isinstance(entry, str) else json.dumps(entry, separators=(",", ":")))
+        change_log_total += len(change_log)
+
+        extra = {key: value for key, value in source.items() if key not in KNOWN_SOURCE_KEYS}
+
+        rows.append((
+            tables["doc_id"].add(hit.get("_id", "")),
+            tables["user_id"].add(source.get("user_id", "")),
+            tables["org_id"].add(source.get("org_id", "")),
+            np.datetime64(source["date"], "D") if source.get("date") else np.datetime64("NaT", "D"),
+            tables["shift_type"].add(source.get("shift_type", "")),
+            bool(source.get("is_complete")),
+            end is not None,
+            _to_ms(start.get("shift_time")),
+            _to_ms(start.get("timestamp")),
+            _to_ms((end or {}).get("shift_time")),
+            _to_ms((end or {}).get("timestamp")),
+            start.get("lat", np.nan),
+            start.get("lon", np.nan),
+            (end or {}).get("lat", np.nan),
+            (end or {}).get("lon", np.nan),
+            tables["reason"].add(source.get("reason")),
+            tables["image_url"].add(start.get("image_url")),
+            tables["image_url"].add((end or {}).get("image_url")),
+            change_log_start,
+            len(change_log),
+            tables["extra"].add(json.dumps(extra, separators=(",", ":"))) if extra else NO_INDEX,
+        ))
+
+    if len(tables["shift_type"].values) > 255:
+        raise ValueError("More than 255 distinct shift types")
+
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    np.save(directory / "records.npy", records)
+    for name, builder in tables.items():
+        builder.save(directory, name)
+
+    meta = {"version": FORMAT_VERSION, "records": int(len(records)), "tables": list(STRING_TABLES)}
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return len(records)
+
+
+def convert(ndjson_path, directory):
+    """Convert a time_record elasticdump NDJSON file, streaming it line by line"""
+    def hits():
+        with open(ndjson_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    return write_fixture(hits(), directory)
+
+
+class TimeRecordFixture:
+    """Memory-mapped view of a fixture directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported fixture version {meta.get('version')} in {self.directory}")
+        self.records = np.load(self.directory / "records.npy", mmap_mode="r")
+        self.tables = {name: StringTable(self.directory, name) for name in meta["tables"]}
+
+    def __len__(self):
+        return len(self.records)
+
+    def shift_type_code(self, shift_type):
+        return self.tables["shift_type"].lookup(shift_type)
+
+    def change_log(self, i):
+        record = self.records[i]
+        return self.tables["change_log"].slice(int(record["change_log_start"]), int(record["change_log_count"]))
+
+    def iter_hits(self, start=0, stop=None, chunk_size=65536):
+        """Rebuild elasticdump-style hits, decoding chunk_size records at a time"""
+        stop = len(self.records) if stop is None else min(stop, len(self.records))
+        tables = self.tables
+        for chunk_start in range(start, stop, chunk_size):
+            chunk = np.asarray(self.records[chunk_start:min(chunk_start + chunk_size, stop)])
+            dates = np.datetime_as_string(chunk["date"], unit="D")
+            start_shift = _from_ms(chunk["start_shift_time"])
+            start_ts = _from_ms(chunk["start_timestamp"])
+            end_shift = _from_ms(chunk["end_shift_time"])
+            end_ts = _from_ms(chunk["end_timestamp"])
+
+            for j, record in enumerate(chunk):
+                source = {
+                    "date": dates[j],
+                    "reason": tables["reason"][record["reason"]],
+                    "start_time": {
+                        "image_url": tables["image_url"][record["start_image_url"]],
+                        "lon": float(record["start_lon"]),
+                        "lat": float(record["start_lat"]),
+                        "shift_time": start_shift[j],
+                        "timestamp": start_ts[j],
+                    },
+                    "shift_type": tables["shift_type"][record["shift_type"]],
+                    "user_id": tables["user_id"][record["user_id"]],
+                    "org_id": tables["org_id"][record["org_id"]],
+                    "change_log": tables["change_log"].slice(int(record["change_log_start"]),
+                                                            int(record["change_log_count"])),
+                    "end_time": {
+                        "image_url": tables["image_url"][record["end_image_url"]],
+                        "lon": float(record["end_lon"]),
+                        "lat": float(record["end_lat"]),
+                        "shift_time": end_shift[j],
+                        "timestamp": end_ts[j],
+                    } if record["has_end"] else None,
+                    "is_complete": bool(record["is_complete"]),
+                }
+                if record["extra"] != NO_INDEX:
+                    source.update(json.loads(tables["extra"][record["extra"]]))
+                yield {"_index": "time_record", "_id": tables["doc_id"][record["doc_id"]], "_source": source}
+
+    def to_hits(self):
+        return list(self.iter_hits())
+
+    def iter_sources(self):
+        """(doc_id, _source) pairs, e.g. for shift_corrections or seeders"""
+        for hit in self.iter_hits():
+            yield hit["_id"], hit["_source"]
+
+
+def load_hits(path):
+    """Hits from either an elasticdump NDJSON file or a fixture directory"""
+    path = Path(path)
+    if path.is_dir():
+        return TimeRecordFixture(path).to_hits()
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert and inspect columnar time_record fixtures')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert elasticdump NDJSON to a fixture directory')
+    convert_parser.add_argument('input_path', help='time_record elasticdump NDJSON file')
+    convert_parser.add_argument('output_dir', help='Fixture directory to write')
+    convert_parser.add_argument('--users', type=int, default=1, help='Copies of each user (see bench_export.py)')
+    convert_parser.add_argument('--periods', type=int, default=1, help='Copies of the date range')
+
+    info_parser = subparsers.add_parser('info', help='Open a fixture and report its size and load time')
+    info_parser.add_argument('fixture_dir')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        started = time.perf_counter()
+        if args.users > 1 or args.periods > 1:
+            from bench_export import scale_hits
+            with open(args.input_path, "r", encoding="utf-8") as f:
+                hits = [json.loads(line) for line in f if line.strip()]
+            count = write_fixture(scale_hits(hits, args.users, args.periods), args.output_dir)
+        else:
+            count = convert(args.input_path, args.output_dir)
+        print(f"Wrote {count} records to {args.output_dir} in {time.perf_counter() - started:.2f}s")
+    else:
+        started = time.perf_counter()
+        fixture = TimeRecordFixture(args.fixture_dir)
+        opened = time.perf_counter() - started
+        size = sum(p.stat().st_size for p in Path(args.fixture_dir).iterdir())
+        print(f"{len(fixture)} records, {size / 1024 / 1024:.1f} MiB on disk, opened in {opened * 1000:.2f} ms")
+        for name, table in fixture.tables.items():
+            print(f"  {name}: {len(table)} strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Load test for the clock-in photo upload path.
+
+A real clock-in first uploads the camera capture (src/app/page.tsx uploadImage):
+
+    1. POST /api/upload {fileKey, contentType, contentSize}  -> presigned PUT URL
+    2. PUT <signedUrl> with the image bytes (S3-compatible bucket "tokbud", key time-record/<fileKey>)
+    3. clock-in with image_url = the object URL
+
+The seeder skips all of that and sends a placeholder URL. This script runs the upload with
+bounded concurrency, either through the app (--via app, steps 1-2, optionally 3 with
+--clock-in) or straight to the bucket (--via s3, SigV4-signed when AWS_ACCESS_KEY_ID and
+AWS_SECRET_ACCESS_KEY are set). Payloads are testdata/images/clock-in*.jpeg or generated
+JPEGs of a given size (--generate-kb). Each PUT's ETag is checked against the MD5 of what was
+sent.
+
+Reports throughput (MB/s, uploads/s), per-phase latency percentiles and errors by status.
+
+Usage:
+    python upload_load.py --stub --count 500 --concurrency 16
+    python upload_load.py --stub --generate-kb 800 --count 200 --concurrency 32 --clock-in
+    python upload_load.py --via s3 --s3-url http://localhost:8333 --count 1000
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from collections import defaultdict
+from pathlib import Path
+import threading
+import tempfile
+import argparse
+import hashlib
+import random
+import secrets
+import time
+import sys
+import io
+
+from insert_test_shift import SessionPool, create_session, generate_location_pairs
+from soak_test import LatencyHistogram
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+EXTERNAL_SERVICE_DIR = SCRIPT_DIR.parent / "src" / "elysia" / "external_service"
+sys.path.insert(0, str(EXTERNAL_SERVICE_DIR))
+
+from thumbnails import S3ImageStore  # noqa: E402
+
+IMAGES_DIR = SCRIPT_DIR / "images"
+BUCKET = "tokbud"
+KEY_PREFIX = "time-record/"
+
+
+class Payload:
+    def __init__(self, name, data, content_type="image/jpeg"):
+        self.name = name
+        self.data = data
+        self.content_type = content_type
+        self.md5 = hashlib.md5(data).hexdigest()
+
+
+def load_images(pattern="clock-in*.jpeg"):
+    return [Payload(path.name, path.read_bytes()) for path in sorted(IMAGES_DIR.glob(pattern))]
+
+
+def generate_image(target_kb, seed=0):
+    """
+    A JPEG of roughly `target_kb` KB. Noise doesn't compress, so the size follows the pixel
+    count; the side is corrected a few times towards the target.
+    """
+    from PIL import Image
+
+    rng = random.Random(seed)
+    target = target_kb * 1024
+    width = max(16, int((target / 1.2) ** 0.5))
+    data = b""
+    for _ in range(4):
+        height = width * 3 // 4
+        image = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=85)
+        data = out.getvalue()
+        if abs(len(data) - target) < target * 0.05:
+            break
+        width = max(16, int(width * (target / len(data)) ** 0.5))
+    return data
+
+
+def generate_images(target_kb, variants=4):
+    return [Payload(f"generated-{target_kb}kb-{i}.jpg", generate_image(target_kb, seed=i)) for i in range(variants)]
+
+
+class UploadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = defaultdict(LatencyHistogram)
+        self.errors = defaultdict(int)
+        self.uploads = 0
+        self.bytes = 0
+        self.etag_mismatches = 0
+
+    def record(self, timings, size=0, error=None, etag_ok=True):
+        with self.lock:
+            for phase, seconds in timings.items():
+                self.phases[phase].record(seconds * 1000)
+            if error:
+                self.errors[error] += 1
+                return
+            self.uploads += 1
+            self.bytes += size
+            if not etag_ok:
+                self.etag_mismatches += 1
+
+
+class UploadError(Exception):
+    def __init__(self, phase, status):
+        super().__init__(f"{phase}:{status}")
+
+
+class UploadLoad:
+    """
+    Sends `count` uploads with at most `concurrency` in flight. In app mode each upload is
+    attributed to one of the pool's users in turn; their sessions carry the auth cookie.
+    """
+
+    def __init__(self, payloads, via="app", pool=None, s3_url=None, concurrency=16, clock_in=False):
+        self.payloads = payloads
+        self.via = via
+        self.pool = pool
+        self.s3_url = (s3_url or "").rstrip("/")
+        self.concurrency = concurrency
+        self.clock_in = clock_in
+        self.s3 = S3ImageStore()
+        self.s3_session = create_session(pool_maxsize=concurrency, retries=0)
+        self.locations = generate_location_pairs()
+        self.stats = UploadStats()
+
+    def put(self, url, payload, sign=False):
+        headers = {"Content-Type": payload.content_type}
+        if sign and self.s3.access_key and self.s3.secret_key:
+            headers.update(self.s3.sign(url, method="PUT"))
+        response = self.s3_session.put(url, data=payload.data, headers=headers)
+        if response.status_code != 200:
+            raise UploadError("put", response.status_code)
+        return response.headers.get("ETag", "").strip('"')
+
+    def upload_one(self, index):
+        payload = self.payloads[index % len(self.payloads)]
+        file_key = secrets.token_hex(32)
+        timings = {}
+        started = time.perf_counter()
+        try:
+            if self.via == "s3":
+                url = f"{self.s3_url}/{BUCKET}/{KEY_PREFIX}{file_key}"
+                etag = self.put(url, payload, sign=True)
+                timings["put"] = time.perf_counter() - started
+            else:
+                api = self.pool.apis[self.pool.user_ids[index % len(self.pool.user_ids)]]
+                response = api.session.post(f"{api.base_url}/upload", json={
+                    "fileKey": file_key,
+                    "contentType": payload.content_type,
+                    "contentSize": len(payload.data),
+                })
+                timings["presign"] = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise UploadError("presign", response.status_code)
+                signed_url = response.json()["signedUrl"]
+
+                put_started = time.perf_counter()
+                etag = self.put(signed_url, payload)
+                timings["put"] = time.perf_counter() - put_started
+                url = signed_url.split("?", 1)[0]
+
+                if self.clock_in:
+                    (lat, lon), _ = self.locations[index % len(self.locations)]
+                    shift_time = datetime.now(timezone.utc)
+                    clock_in_started = time.perf_counter()
+                    api.clock_in("on-site", shift_time.strftime("%Y-%m-%dT%H:%M:%S.")
+                                 + f"{shift_time.microsecond // 1000:03d}Z", lat, lon, image_url=url)
+                    timings["clock-in"] = time.perf_counter() - clock_in_started
+        except UploadError as e:
+            timings["total"] = time.perf_counter() - started
+            self.stats.record(timings, error=str(e))
+            return
+        except Exception as e:
+            timings["total"] = time.perf_counter() - started
+            self.stats.record(timings, error=type(e).__name__)
+            return
+
+        timings["total"] = time.perf_counter() - started
+        self.stats.record(timings, len(payload.data), etag_ok=not etag or etag == payload.md5)
+
+    def run(self, count):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upload") as executor:
+            list(executor.map(self.upload_one, range(count)))
+        self.s3_session.close()
+        return time.perf_counter() - started
+
+
+def print_report(stats, elapsed, count):
+    mb = stats.bytes / (1024 * 1024)
+    errors = sum(stats.errors.values())
+    print(f"Uploads: {stats.uploads}/{count} ok, {errors} failed {dict(stats.errors)}")
+    print(f"Transferred {mb:.1f} MB in {elapsed:.2f}s: {mb / elapsed:.2f} MB/s, "
+          f"{stats.uploads / elapsed:.1f} uploads/s")
+    if stats.etag_mismatches:
+        print(f"ETag mismatches: {stats.etag_mismatches}")
+    for phase in ("presign", "put", "clock-in", "total"):
+        if phase in stats.phases:
+            print(f"  {phase:<9} ms {stats.phases[phase].summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the clock-in photo upload path')
+    parser.add_argument('--via', choices=['app', 's3'], default='app',
+                        help='Presign through POST /api/upload (app) or PUT straight to the bucket (s3)')
+    parser.add_argument('--base-url', default="http://localhost:3000/api", help='Base URL of the app API')
+    parser.add_argument('--s3-url', default="http://localhost:8333", help='S3 endpoint for --via s3')
+    parser.add_argument('--stub', action='store_true',
+                        help='Run against in-process app and S3 stubs instead of the real services')
+    parser.add_argument('--stub-latency', type=float, default=0.0, help='Latency per stub request in seconds')
+    parser.add_argument('--count', type=int, default=200, help='Number of uploads')
+    parser.add_argument('--concurrency', type=int, default=16, help='Uploads in flight at once')
+    parser.add_argument('--users', type=int, default=20, help='Simulated users for --via app')
+    parser.add_argument('--images', default="clock-in*.jpeg", help='Glob of testdata/images to upload')
+    parser.add_argument('--generate-kb', type=int, default=None,
+                        help='Upload generated JPEGs of about this many KB instead of the test images')
+    parser.add_argument('--clock-in', action='store_true', help='Clock in with each uploaded image (--via app)')
+    args = parser.parse_args()
+
+    payloads = generate_images(args.generate_kb) if args.generate_kb else load_images(args.images)
+    if not payloads:
+        parser.error(f"No images match {args.images} in {IMAGES_DIR}")
+    sizes = sorted(len(payload.data) for payload in payloads)
+    print(f"{len(payloads)} payload(s), {sizes[0] / 1024:.0f}-{sizes[-1] / 1024:.0f} KB")
+
+    def run(base_url, s3_url):
+        if args.via == "s3":
+            load = UploadLoad(payloads, "s3", s3_url=s3_url, concurrency=args.concurrency)
+            elapsed = load.run(args.count)
+        else:
+            user_ids = [f"user_upload_{i:05d}" for i in range(args.users)]
+            with SessionPool(user_ids, base_url=base_url, max_workers=min(32, args.users), retries=0) as pool:
+                load = UploadLoad(payloads, "app", pool, concurrency=args.concurrency, clock_in=args.clock_in)
+                elapsed = load.run(args.count)
+        print_report(load.stats, elapsed, args.count)
+
+    if args.stub:
+        from stub_server import StubServer
+        from s3_stub import S3Stub
+        with tempfile.TemporaryDirectory(prefix="s3_stub_") as root, \
+                S3Stub(root, latency=args.stub_latency) as s3, \
+                StubServer(latency=args.stub_latency, upload_url=s3.url) as stub:
+            run(stub.api_url, s3.url)
+            print("S3 stub stats:", s3.stats.snapshot())
+            print("Stub stats:", stub.stats.snapshot())
+    else:
+        run(args.base_url, args.s3_url)
+
+
+if __name__ == "__main__":
+    main()